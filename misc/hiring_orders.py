@@ -10,6 +10,7 @@ __status__ = "Development"
 
 import numpy as np
 import cPickle as pickle
+from faculty_hiring.misc.sum_tree import SumTree
 
 
 def prepare_hiring_orders(job_pools, job_ranks, num_orders):
@@ -19,10 +20,11 @@ def prepare_hiring_orders(job_pools, job_ranks, num_orders):
         Returns:
           - A list of numpy matrices (|h|*num_orders), where |h| is the size of the
             job_pool for each year.
-          - A list of lists containing the probability of each hiring order.
+          - A list of arrays containing the log-probability of each hiring order.
+            (The probability of a full order is far too small for a float.)
     """
     hiring_orders = [np.zeros((num_orders, len(pool)), dtype=int) for pool in job_pools]
-    hiring_probs = [np.zeros(num_orders, dtype=float) for pool in job_pools]
+    hiring_log_probs = [np.zeros(num_orders, dtype=float) for pool in job_pools]
 
     # Populate the orders and the probabilities
     for i, pool in enumerate(job_pools):
@@ -31,37 +33,41 @@ def prepare_hiring_orders(job_pools, job_ranks, num_orders):
         num_jobs = len(job_probs)
 
         for j in xrange(num_orders):
-            prob = 1.
-            job_p = job_probs.copy()
+            log_prob = 0.
+            job_tree = SumTree(job_probs)
             for k in xrange(num_jobs-1):
-                job_p /= job_p.sum()
-                selected = np.random.multinomial(1, job_p).argmax()
+                selected = job_tree.sample()
                 hiring_orders[i][j][k] = selected
-                prob *= job_p[selected]  # update order probability
-                job_p[selected] = 0.  # mark as unavailable
-            selected = job_p.argmax()
+                log_prob += np.log(job_tree.weights[selected] / job_tree.total())  # update order log-probability
+                job_tree.remove(selected)  # mark as unavailable
+            selected = job_tree.weights.argmax()
             hiring_orders[i][j][num_jobs-1] = selected  # last available 
-            hiring_probs[i][j] = prob
+            hiring_log_probs[i][j] = log_prob
 
         #print ' --> '.join([pool[ind] for ind in hiring_orders[i][0]]) + '\n'
     
-    return hiring_orders, hiring_probs
+    return hiring_orders, hiring_log_probs
 
 
 def create_hiring_order_set(output_file, job_pools, job_ranks, num_orders):
     """ Create and write out a hiring set to file """
-    hiring_orders, hiring_probs = prepare_hiring_orders(job_pools, job_ranks, num_orders)
-    hiring_dict = {'orders':hiring_orders, 'probs':hiring_probs}
+    hiring_orders, hiring_log_probs = prepare_hiring_orders(job_pools, job_ranks, num_orders)
+    hiring_dict = {'orders':hiring_orders, 'log_probs':hiring_log_probs}
     with open(output_file, 'wb') as handle:
         pickle.dump(hiring_dict, handle)
-    return hiring_orders, hiring_probs
+    return hiring_orders, hiring_log_probs
 
 
 def load_hiring_order_set(input_file):
-    """ Load a previously created hiring set from file """ 
+    """ Load a previously created hiring set from file.  Older sets stored
+        (underflowed) probabilities rather than log-probabilities. """ 
     with open(input_file, 'rb') as handle:
         hiring_dict  = pickle.load(handle)
     hiring_orders = hiring_dict['orders']
-    hiring_probs = hiring_dict['probs']
-    return hiring_orders, hiring_probs
+    if 'log_probs' in hiring_dict:
+        hiring_log_probs = hiring_dict['log_probs']
+    else:
+        with np.errstate(divide='ignore'):
+            hiring_log_probs = [np.log(probs) for probs in hiring_dict['probs']]
+    return hiring_orders, hiring_log_probs
     
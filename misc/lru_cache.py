@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Bounded, least-recently-used mapping.
+
+    Example:
+        >>> cache = LRUCache(max_size=1000)
+        >>> if key not in cache:
+        ...     cache[key] = compute(key)
+        >>> value = cache[key]
+"""
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def __contains__(self, key):
+        if key in self.entries:
+            return True
+        self.misses += 1
+        return False
+
+
+    def __getitem__(self, key):
+        value = self.entries.pop(key)
+        self.entries[key] = value  # Most recently used goes last
+        self.hits += 1
+        return value
+
+
+    def __setitem__(self, key, value):
+        self.add(key, value)
+
+
+    def add(self, key, value):
+        """ Insert, evicting the least recently used entries """ 
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Memoization of (expensive) objective function evaluations.
+
+    An ObjectiveCache is a bounded, least-recently-used mapping (an LRUCache)
+    from keys (e.g., weights + settings + data fingerprint) to objective
+    values.  If a filename is given, every new entry is appended to that file
+    as it is computed, and entries already in the file are loaded on
+    construction, so a resumed optimization does not redo finished work.
+
+    Example:
+        >>> cache = ObjectiveCache(max_size=10000, filename='evals.pkl')
+        >>> simulator = SimulationEngine(..., cache=cache)
+"""
+
+import os
+from faculty_hiring.misc.lru_cache import LRUCache
+try:
+   import cPickle as pickle
+except:
+   import pickle
+
+
+class ObjectiveCache(LRUCache):
+    def __init__(self, max_size=100000, filename=None):
+        LRUCache.__init__(self, max_size)
+        self.filename = filename
+        self.fp = None
+
+        if filename is not None:
+            if os.path.exists(filename):
+                self.load(filename)
+                self.compact()  # Drops evicted entries and any truncated record
+            self.fp = open(filename, 'ab')
+
+
+    def __setitem__(self, key, value):
+        self.add(key, value)
+        if self.fp is not None:
+            pickle.dump((key, value), self.fp, pickle.HIGHEST_PROTOCOL)
+            self.fp.flush()
+
+
+    def load(self, filename):
+        """ Read (key, value) records from file """ 
+        with open(filename, 'rb') as fp:
+            while True:
+                try:
+                    key, value = pickle.load(fp)
+                except EOFError:
+                    break
+                except (pickle.UnpicklingError, ValueError, AttributeError, IndexError):
+                    break  # A partially written record from an interrupted run
+                self.add(key, value)
+
+
+    def compact(self):
+        """ Rewrite the backing file with only the entries currently held """ 
+        temp_filename = self.filename + '.tmp'
+        with open(temp_filename, 'wb') as fp:
+            for key, value in self.entries.iteritems():
+                pickle.dump((key, value), fp, pickle.HIGHEST_PROTOCOL)
+        os.rename(temp_filename, self.filename)
+
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
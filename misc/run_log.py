@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Append-only, structured log of an optimization run.
+
+    Every record is a dictionary with a 'type' -- e.g., 'run' (settings and
+    starting weights), 'eval' (weights and objective value), 'local' (result
+    of a local search) -- pickled to the end of the file as soon as it is
+    created.  Each record goes out in a single write to a file opened for
+    appending, so forked worker processes can share one log, and a killed
+    run loses at most the record being written.  Reopening the log reads
+    back everything written so far, which is what resuming a run needs.
+
+    Records are framed -- a marker, the pickle's length and its CRC -- so a
+    damaged record can be told apart from a torn last write.  Damaged
+    records in the middle of the log are skipped (and reported) but stay
+    in the file; only an unreadable tail with no good record after it is
+    cut off.
+
+    Example:
+        >>> log = RunLog('optimize.log')
+        >>> log.append({'type': 'eval', 'weights': w, 'value': 3.2})
+        >>> for record in log.best(10):
+        ...     print record['value'], record['weights']
+"""
+
+import os
+import struct
+import warnings
+import zlib
+import numpy as np
+try:
+   import cPickle as pickle
+except:
+   import pickle
+
+RECORD_MARK = 'RLOG'
+RECORD_HEADER = struct.Struct('<4sII')  # Marker, pickle length, CRC32 of the pickle
+
+
+class RunLog:
+    def __init__(self, filename, load=True, readonly=False):
+        self.filename = filename
+        self.records = []
+        self.index = {}  # Record type -> list of records
+        self.fd = None
+        self.skipped = []  # (start, stop) byte spans of unreadable records
+        if load and os.path.exists(filename):
+            self.load(repair=not readonly)
+        if not readonly:
+            self.fd = os.open(filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0644)
+
+
+    def __len__(self):
+        return len(self.records)
+
+
+    def load(self, repair=True):
+        """ Read every intact record.  Damaged records followed by good ones
+            are skipped and listed in self.skipped, never removed.  An
+            unreadable tail (the record an interrupted run was writing) is
+            cut off the file if repair is set. """
+        with open(self.filename, 'rb') as fp:
+            data = fp.read()
+        pos = end = 0
+        while pos < len(data):
+            record, stop = read_record(data, pos)
+            if stop is None:
+                stop = next_record(data, pos)
+                if stop is None:
+                    break  # Torn last record
+                self.skipped.append((pos, stop))
+            else:
+                self.add(record)
+                end = stop
+            pos = stop
+        if self.skipped:
+            warnings.warn('%s: skipped %d damaged record(s)' % (self.filename, len(self.skipped)))
+        if repair and end < len(data):
+            with open(self.filename, 'r+b') as fp:
+                fp.truncate(end)
+
+
+    def add(self, record):
+        """ Index a record without writing it """
+        self.records.append(record)
+        self.index.setdefault(record['type'], []).append(record)
+
+
+    def append(self, record):
+        """ Add a record and write it to the end of the file """
+        self.add(record)
+        os.write(self.fd, frame_record(record))
+
+
+    def query(self, record_type, **fields):
+        """ Records of a type whose fields equal the given values """
+        return [r for r in self.index.get(record_type, [])
+                if all(r.get(k) == v for k, v in fields.iteritems())]
+
+
+    def last(self, record_type):
+        """ Most recent record of a type (None if there is none) """
+        records = self.index.get(record_type)
+        return records[-1] if records else None
+
+
+    def best(self, how_many=1, record_type='eval', **fields):
+        """ The how_many records (of a type) with the lowest values """
+        records = self.query(record_type, **fields)
+        values = np.array([r['value'] for r in records], dtype=float)
+        return [records[k] for k in np.argsort(values, kind='mergesort')[:how_many]]
+
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def frame_record(record):
+    """ Header and pickle of a record, ready to write """
+    payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+    return RECORD_HEADER.pack(RECORD_MARK, len(payload), zlib.crc32(payload) & 0xffffffff) + payload
+
+
+def read_record(data, pos):
+    """ The record framed at data[pos:] and where it stops, or
+        (None, None) if there isn't an intact one there """
+    start = pos + RECORD_HEADER.size
+    if start > len(data):
+        return None, None
+    mark, length, crc = RECORD_HEADER.unpack_from(data, pos)
+    payload = data[start:start + length]
+    if mark != RECORD_MARK or len(payload) != length or zlib.crc32(payload) & 0xffffffff != crc:
+        return None, None
+    try:
+        record = pickle.loads(payload)
+    except Exception:
+        return None, None
+    if not isinstance(record, dict) or 'type' not in record:
+        return None, None
+    return record, start + length
+
+
+def next_record(data, pos):
+    """ Start of the first intact record after pos (None if there is none) """
+    pos = data.find(RECORD_MARK, pos + 1)
+    while pos >= 0:
+        if read_record(data, pos)[1] is not None:
+            return pos
+        pos = data.find(RECORD_MARK, pos + 1)
+    return None
+
+
+def is_run_log(filename):
+    """ Does the file start with a run log record? """
+    try:
+        with open(filename, 'rb') as fp:
+            header = fp.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return False
+            mark, length, crc = RECORD_HEADER.unpack(header)
+            return mark == RECORD_MARK and read_record(header + fp.read(length), 0)[1] is not None
+    except IOError:
+        return False
@@ -8,8 +8,16 @@ __email__ = "samfway@gmail.com"
 __status__ = "Development"
 
 """ How to score a hiring simulation
+
+    The *_arrays variants take a simulation's hires as two integer arrays --
+    `hired[k]' is the index (into the candidate pool) of the k-th person hired
+    and `places[k]' the institution id (see InstitutionIndex) they were placed
+    at -- together with rank arrays precomputed once per pool by
+    candidate_ranks() and rank_table().
 """
 
+import numpy as np
+
 def sse_rank_diff(hires, inst, ranking='pi'):
     """ Compute the sum of squares rank difference error """
     total = 0.0
@@ -115,3 +123,65 @@ def diffs_and_errors(hires, inst, worst_rank, rank='pi'):
         errors.append(actual_rank-sim_rank)
     
     return zip(diffs, errors)
+
+
+def rank_table(index, ranking='pi', worst_rank=None):
+    """ Ranks indexed by institution id, plus one trailing entry (for ids
+        of -1, i.e., names not in the index) set to worst_rank.  Without a
+        worst_rank, the trailing entry is UNKNOWN's rank. """ 
+    column = index.column(ranking)
+    if worst_rank is None:
+        if index.unknown is None:
+            raise ValueError('No UNKNOWN institution to rank missing names by; give a worst_rank')
+        worst_rank = column[index.unknown]
+    return np.append(column, float(worst_rank))
+
+
+def place_ids(index, places, worst_rank=None):
+    """ Institution ids for a list of names, to be used with rank_table().
+        Names not in the index map to UNKNOWN, or to the trailing -1 entry
+        if a worst_rank is used. """ 
+    return index.lookup(places, missing=None if worst_rank is None else -1)
+
+
+def candidate_ranks(candidates, index, ranking='pi', worst_rank=None):
+    """ (actual, phd) rank arrays for a pool of (faculty_record, phd_rank) candidates:
+        the ranks of where each person was actually hired and got their PhD """ 
+    table = rank_table(index, ranking, worst_rank)
+    actual = place_ids(index, [f.first_asst_prof()[0] for f, phd_rank in candidates], worst_rank)
+    phd = place_ids(index, [f.phd()[0] for f, phd_rank in candidates], worst_rank)
+    return table[actual], table[phd]
+
+
+def candidate_positions(candidates):
+    """ Map each faculty_record in a pool of candidates to its index """ 
+    return dict((c[0], k) for k, c in enumerate(candidates))
+
+
+def hire_arrays(hires, positions, index, worst_rank=None):
+    """ Convert a list of (faculty_record, place) hires to (hired, places)
+        arrays, given the pool's candidate_positions() """ 
+    hired = np.array([positions[f] for f, place in hires], dtype=int)
+    return hired, place_ids(index, [place for f, place in hires], worst_rank)
+
+
+def sse_rank_diff_arrays(hired, places, actual_ranks, place_ranks):
+    """ Sum of squares rank difference error (see sse_rank_diff) """ 
+    return np.sum((actual_ranks[hired] - place_ranks[places])**2)
+
+
+def rank_and_error_arrays(hired, places, actual_ranks, phd_ranks, place_ranks):
+    """ (phd_ranks, job_ranks, errors) arrays, as in rank_and_error """ 
+    job_ranks = actual_ranks[hired]
+    return phd_ranks[hired], job_ranks, job_ranks - place_ranks[places]
+
+
+def places_and_errors_arrays(hired, places, actual_ranks, phd_places, place_ranks):
+    """ (phd place ids, errors) arrays, as in places_and_errors """ 
+    return phd_places[hired], actual_ranks[hired] - place_ranks[places]
+
+
+def diffs_and_errors_arrays(hired, places, actual_ranks, phd_ranks, place_ranks):
+    """ (rank differences, errors) arrays, as in diffs_and_errors """ 
+    job_ranks = actual_ranks[hired]
+    return phd_ranks[hired] - job_ranks, job_ranks - place_ranks[places]
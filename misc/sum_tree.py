@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Weighted sampling without replacement.
+
+    A sum tree (Fenwick / binary indexed tree) keeps prefix sums of a set of
+    non-negative weights, so drawing an item proportional to its weight and
+    removing it (setting its weight to zero) both take O(log n) time, instead
+    of renormalizing an n-vector after every draw.
+
+    Example:
+        >>> tree = SumTree([0.5, 0.2, 0.3])
+        >>> i = tree.sample()   # 0 with prob. 0.5, 1 with 0.2, 2 with 0.3
+        >>> tree.remove(i)      # i can't be drawn again
+"""
+
+import numpy as np
+
+
+class SumTree:
+    def __init__(self, weights):
+        self.weights = np.array(weights, dtype=float)
+        self.size = len(self.weights)
+
+        # Linear-time Fenwick construction (tree is 1-indexed)
+        self.tree = [0.] + self.weights.tolist()
+        for i in xrange(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+        self.top_bit = 1
+        while self.top_bit * 2 <= self.size:
+            self.top_bit *= 2
+
+
+    def __len__(self):
+        return self.size
+
+
+    def total(self):
+        """ Sum of all (remaining) weights """ 
+        return self.prefix_sum(self.size)
+
+
+    def prefix_sum(self, n):
+        """ Sum of the first n weights """ 
+        total = 0.
+        while n > 0:
+            total += self.tree[n]
+            n -= n & -n
+        return total
+
+
+    def update(self, index, weight):
+        """ Set the weight of item `index' """ 
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+
+    def remove(self, index):
+        """ Remove an item from further draws """ 
+        self.update(index, 0.)
+
+
+    def find(self, value):
+        """ Index of the first item whose prefix sum exceeds `value' """ 
+        pos = 0
+        bit = self.top_bit
+        while bit:
+            step = pos + bit
+            if step <= self.size and self.tree[step] <= value:
+                pos = step
+                value -= self.tree[step]
+            bit >>= 1
+
+        # Round-off can run past the last non-zero weight
+        if pos >= self.size or self.weights[pos] <= 0.:
+            remaining = np.flatnonzero(self.weights)
+            if len(remaining) == 0:
+                raise ValueError('No items with positive weight left to sample!')
+            pos = remaining[-1]
+        return pos
+
+
+    def sample(self, rng=np.random):
+        """ Draw an index with probability proportional to its weight """ 
+        return self.find(rng.random_sample() * self.total())
+
+
+def weighted_choice(weights, rng=np.random):
+    """ Single O(n) draw of an index proportional to `weights' """ 
+    cumulative = np.cumsum(weights)
+    index = np.searchsorted(cumulative, rng.random_sample() * cumulative[-1], side='right')
+    return min(index, len(cumulative) - 1)
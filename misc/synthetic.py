@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Synthetic institution and faculty record files.
+
+    Files are written in the same formats read by 
+    parse/institution_parser.py and parse/faculty_parser.py, at any size, so
+    the loading and modeling pipeline can be benchmarked without real data.
+    Hires flow (mostly) down the prestige hierarchy: PhD institutions are
+    drawn in favor of prestigious schools, and each person's first assistant
+    professorship is drawn a random distance further down the ranking.
+
+    Example:
+        >>> rng = np.random.RandomState(0)
+        >>> write_institution_records(open('inst.txt', 'w'), 1000, rng)
+        >>> write_faculty_records(open('faculty.txt', 'w'), 1000, 50000, rng)
+"""
+
+import numpy as np
+
+
+REGIONS = ['Northeast', 'Midwest', 'South', 'West']
+DEGREES = ['BS', 'BA', 'MS']
+FIELDS = ['Computer Science', 'Mathematics', 'Physics', 'Electrical Engineering']
+INSTITUTION_NAME = 'Synthetic University %d'
+
+FACULTY_RECORD = """>>> record %(id)d
+# facultyName : Person %(id)d
+# email       : person%(id)d@example.edu
+# sex         : %(sex)s
+# department  : Computer Science
+# place       : %(place)s
+# current     : %(current)s
+# dblp_z      : %(dblp_z).4f
+# [Education]
+# degree      : %(degree)s
+# place       : %(undergrad)s
+# field       : %(field)s
+# years       : ????-%(undergrad_year)d
+# [Education]
+# degree      : PhD
+# place       : %(phd)s
+# field       : Computer Science
+# years       : ????-%(phd_year)d
+%(postdoc)s# [Faculty]
+# rank        : Assistant Professor
+# place       : %(job)s
+# years       : %(job_year)d-%(tenure_year)d
+%(tenure)s# recordDate  : 1/1/2012
+
+"""
+
+POSTDOC_RECORD = """# [Faculty]
+# rank        : PostDoc
+# place       : %s
+# years       : %d-%d
+"""
+
+TENURE_RECORD = """# [Faculty]
+# rank        : Associate Professor
+# place       : %s
+# years       : %d-%d
+"""
+
+
+def write_institution_records(fp, num_institutions, rng=np.random):
+    """ Write an institution records file with `num_institutions' schools.
+        The prestige score `pi' increases (gets worse) with the index. """
+    fp.write('# u\tpi\tUSN2010\tNRC95\tRegion\tinstitution\n')
+    pi = np.sort(rng.gamma(2., 2., num_institutions)) + 1.
+    for i in xrange(num_institutions):
+        fp.write('%d\t%.4f\t%d\t%d\t%s\t%s\n' % (i + 1, pi[i], i + 1, i + 1, 
+                                                 REGIONS[rng.randint(len(REGIONS))], 
+                                                 INSTITUTION_NAME % i))
+
+
+def prestige_draw(num_institutions, size, rng=np.random):
+    """ Institution indices drawn in favor of the top of the ranking """ 
+    return np.minimum((rng.exponential(0.2, size) * num_institutions).astype(int), num_institutions - 1)
+
+
+def write_faculty_records(fp, num_institutions, num_faculty, rng=np.random, 
+                          year_start=1970, year_stop=2012):
+    """ Write `num_faculty' faculty records spread over `num_institutions' 
+        schools (named as in write_institution_records). """ 
+    phd = prestige_draw(num_institutions, num_faculty, rng)
+    job = np.minimum(phd + np.abs(rng.normal(0., 0.1 * num_institutions, num_faculty)).astype(int), 
+                     num_institutions - 1)
+    undergrad = rng.randint(num_institutions, size=num_faculty)
+    job_year = rng.randint(year_start, year_stop, size=num_faculty)
+    phd_year = job_year - rng.randint(0, 4, size=num_faculty)
+    has_postdoc = rng.random_sample(num_faculty) < 0.4
+    tenured = rng.random_sample(num_faculty) < 0.5
+    is_female = rng.random_sample(num_faculty) < 0.2
+    dblp_z = rng.normal(size=num_faculty)
+
+    for k in xrange(num_faculty):
+        phd_place = INSTITUTION_NAME % phd[k]
+        job_place = INSTITUTION_NAME % job[k]
+        tenure_year = min(job_year[k] + 6, year_stop)
+        postdoc = ''
+        if has_postdoc[k]:
+            postdoc = POSTDOC_RECORD % (INSTITUTION_NAME % rng.randint(num_institutions), 
+                                        phd_year[k], job_year[k])
+        tenure = ''
+        if tenured[k]:
+            tenure = TENURE_RECORD % (job_place, tenure_year, year_stop)
+
+        fp.write(FACULTY_RECORD % {'id': k + 1,
+                                   'sex': 'F' if is_female[k] else 'M',
+                                   'place': job_place,
+                                   'current': 'Associate Professor' if tenured[k] else 'Assistant Professor',
+                                   'dblp_z': dblp_z[k],
+                                   'degree': DEGREES[k % len(DEGREES)],
+                                   'undergrad': INSTITUTION_NAME % undergrad[k],
+                                   'field': FIELDS[k % len(FIELDS)],
+                                   'undergrad_year': phd_year[k] - 5,
+                                   'phd': phd_place,
+                                   'phd_year': phd_year[k],
+                                   'postdoc': postdoc,
+                                   'job': job_place,
+                                   'job_year': job_year[k],
+                                   'tenure_year': tenure_year,
+                                   'tenure': tenure})
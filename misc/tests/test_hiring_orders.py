@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for sampled hiring orders. """
+
+from faculty_hiring.misc.hiring_orders import prepare_hiring_orders, load_hiring_order_set
+from unittest import TestCase, main
+import cPickle as pickle
+import numpy as np
+import tempfile
+import os
+
+
+class tests(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.job_ranks = [np.arange(1., 301.), np.array([1., 2., 3.])]
+        self.job_pools = [['job%d' % k for k in xrange(len(ranks))] for ranks in self.job_ranks]
+
+    def test_log_probs(self):
+        orders, log_probs = prepare_hiring_orders(self.job_pools, self.job_ranks, 3)
+        for ranks, pool_orders, pool_log_probs in zip(self.job_ranks, orders, log_probs):
+            weights = ranks / ranks.sum()
+            for order, log_prob in zip(pool_orders, pool_log_probs):
+                self.assertEqual(sorted(order), range(len(ranks)))
+                remaining = weights[order][::-1].cumsum()[::-1]
+                expected = np.log(weights[order] / remaining)[:-1].sum()
+                self.assertAlmostEqual(log_prob, expected, places=8)
+        self.assertTrue(np.all(np.isfinite(log_probs[0])))
+        self.assertTrue(np.all(np.exp(log_probs[0]) == 0.))  # Far below what a probability can hold
+
+    def test_load_old_set(self):
+        orders, log_probs = prepare_hiring_orders(self.job_pools, self.job_ranks, 2)
+        fd, filename = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as handle:
+            pickle.dump({'orders': orders, 'probs': [np.exp(p) for p in log_probs]}, handle)
+        try:
+            loaded_orders, loaded_log_probs = load_hiring_order_set(filename)
+        finally:
+            os.remove(filename)
+        np.testing.assert_allclose(loaded_log_probs[1], log_probs[1])
+        self.assertTrue(np.all(np.isneginf(loaded_log_probs[0])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for the objective cache. """
+
+from faculty_hiring.misc.objective_cache import ObjectiveCache
+from unittest import TestCase, main
+import tempfile
+import shutil
+import os
+
+
+class tests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'evals.pkl')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_lru_eviction(self):
+        cache = ObjectiveCache(max_size=2)
+        cache['a'] = 1.
+        cache['b'] = 2.
+        cache['a']  # 'b' is now least recently used
+        cache['c'] = 3.
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_persistence(self):
+        cache = ObjectiveCache(max_size=2, filename=self.filename)
+        for k in xrange(4):
+            cache[('simulate', (float(k),))] = k * 10.
+        cache.close()
+        with open(self.filename, 'ab') as fp:
+            fp.write('\x80\x02(')  # Truncated record from an interrupted run
+
+        cache = ObjectiveCache(max_size=2, filename=self.filename)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache[('simulate', (3.,))], 30.)
+        self.assertFalse(('simulate', (0.,)) in cache)
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for optimization run logs. """
+
+from faculty_hiring.misc.run_log import RunLog, is_run_log
+from unittest import TestCase, main
+import numpy as np
+import tempfile
+import warnings
+import os
+
+
+class tests(TestCase):
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.filename)
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_query(self):
+        log = RunLog(self.filename)
+        log.append({'type': 'run', 'starts': np.zeros((3, 2))})
+        for k, value in enumerate([3., 1., 2., 0.5]):
+            log.append({'type': 'eval', 'stage': 'local' if k % 2 else 'start', 'value': value, 
+                        'weights': np.array([k, value])})
+        log.close()
+
+        log = RunLog(self.filename, readonly=True)
+        self.assertEqual(len(log), 5)
+        self.assertTrue(is_run_log(self.filename))
+        self.assertEqual([r['value'] for r in log.best(3)], [0.5, 1., 2.])
+        self.assertEqual([r['value'] for r in log.best(5, stage='start')], [2., 3.])
+        self.assertEqual(len(log.query('eval', stage='local')), 2)
+        self.assertEqual(log.last('run')['starts'].shape, (3, 2))
+        self.assertEqual(log.last('local'), None)
+
+    def test_truncated_record(self):
+        log = RunLog(self.filename)
+        log.append({'type': 'eval', 'value': 1.})
+        log.append({'type': 'eval', 'value': 2.})
+        log.close()
+        size = os.path.getsize(self.filename)
+        with open(self.filename, 'r+b') as fp:
+            fp.truncate(size - 3)
+
+        self.assertEqual(len(RunLog(self.filename, readonly=True)), 1)
+        self.assertEqual(os.path.getsize(self.filename), size - 3)  # Untouched when read only
+        log = RunLog(self.filename)
+        log.append({'type': 'eval', 'value': 3.})
+        log.close()
+        self.assertEqual([r['value'] for r in RunLog(self.filename).records], [1., 3.])
+        self.assertFalse(is_run_log(__file__))
+
+    def test_damaged_middle_record(self):
+        log = RunLog(self.filename)
+        for value in [1., 2., 3.]:
+            log.append({'type': 'eval', 'value': value})
+        log.close()
+        size = os.path.getsize(self.filename)
+        with open(self.filename, 'r+b') as fp:
+            data = fp.read()
+            second = data.index('RLOG', 1)
+            fp.seek(second + 20)
+            fp.write('\xff\xff')  # Garble the second record's pickle
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            log = RunLog(self.filename)
+        self.assertEqual(len(caught), 1)
+        self.assertEqual([r['value'] for r in log.records], [1., 3.])
+        self.assertEqual(len(log.skipped), 1)
+        log.append({'type': 'eval', 'value': 4.})
+        log.close()
+        self.assertTrue(os.path.getsize(self.filename) > size)  # Nothing cut off
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter('always')
+            self.assertEqual([r['value'] for r in RunLog(self.filename).records], [1., 3., 4.])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for scoring hiring simulations. """
+
+from faculty_hiring.misc.scoring import sse_rank_diff, rank_and_error, places_and_errors, \
+    diffs_and_errors, sse_rank_diff_arrays, rank_and_error_arrays, places_and_errors_arrays, \
+    diffs_and_errors_arrays, candidate_ranks, candidate_positions, hire_arrays, rank_table, place_ids
+from faculty_hiring.parse.institution_parser import InstitutionIndex
+from faculty_hiring.misc.util import Struct
+from unittest import TestCase, main
+import numpy as np
+
+
+class test_record(Struct):
+    def phd(self):
+        return self.phd_location, 1990
+
+    def first_asst_prof(self):
+        return self.first_asst_job_location, 1995
+
+
+class tests(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.inst = dict(('U%d' % k, {'pi': k + 1.}) for k in xrange(10))
+        self.inst['UNKNOWN'] = {'pi': 10.}
+        self.index = InstitutionIndex(self.inst)
+        names = sorted(self.inst) + ['Elsewhere']  # One place not in inst
+        self.candidates = [(test_record(phd_location=rng.choice(names), 
+                                        first_asst_job_location=rng.choice(names)), 0.) 
+                           for k in xrange(30)]
+        self.hires = [(self.candidates[k][0], rng.choice(names)) for k in rng.permutation(30)[:20]]
+
+    def test_sse_rank_diff(self):
+        actual, phd = candidate_ranks(self.candidates, self.index)
+        hired, places = hire_arrays(self.hires, candidate_positions(self.candidates), self.index)
+        self.assertAlmostEqual(sse_rank_diff_arrays(hired, places, actual, rank_table(self.index)),
+                               sse_rank_diff(self.hires, self.inst))
+
+    def test_error_splits(self):
+        worst = 12.
+        actual, phd = candidate_ranks(self.candidates, self.index, worst_rank=worst)
+        hired, places = hire_arrays(self.hires, candidate_positions(self.candidates), self.index, worst)
+        table = rank_table(self.index, worst_rank=worst)
+
+        expected = rank_and_error(self.hires, self.inst, worst)
+        for values, expect in zip(rank_and_error_arrays(hired, places, actual, phd, table), expected):
+            self.assertTrue(np.allclose(values, expect))
+
+        diffs, errors = diffs_and_errors_arrays(hired, places, actual, phd, table)
+        self.assertTrue(np.allclose(zip(diffs, errors), diffs_and_errors(self.hires, self.inst, worst)))
+
+        phd_places = place_ids(self.index, [f.phd()[0] for f, r in self.candidates], worst)
+        ids, errors = places_and_errors_arrays(hired, places, actual, phd_places, table)
+        expected = places_and_errors(self.hires, self.inst, worst)
+        self.assertEqual([self.index.names[k] if k >= 0 else p for k, (p, e) in zip(ids, expected)],
+                         [p for p, e in expected])
+        self.assertTrue(np.allclose(errors, [e for p, e in expected]))
+
+
+if __name__ == '__main__':
+    main()
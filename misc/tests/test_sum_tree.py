@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for weighted sampling without replacement. """
+
+from faculty_hiring.misc.sum_tree import SumTree
+from unittest import TestCase, main
+import numpy as np
+
+
+class tests(TestCase):
+    def setUp(self):
+        self.weights = np.array([0.5, 0., 2., 1., 0.25, 0., 3.])
+        self.rng = np.random.RandomState(0)
+
+    def test_prefix_sums(self):
+        tree = SumTree(self.weights)
+        for n in xrange(len(self.weights) + 1):
+            self.assertAlmostEqual(tree.prefix_sum(n), self.weights[:n].sum())
+        tree.update(2, 0.75)
+        self.assertAlmostEqual(tree.total(), self.weights.sum() - 1.25)
+
+    def test_find(self):
+        tree = SumTree(self.weights)
+        self.assertEqual(tree.find(0.), 0)
+        self.assertEqual(tree.find(0.5), 2)  # skips the zero-weight item
+        self.assertEqual(tree.find(3.6), 4)
+
+    def test_sample_without_replacement(self):
+        tree = SumTree(self.weights)
+        drawn = []
+        for k in xrange(np.count_nonzero(self.weights)):
+            i = tree.sample(self.rng)
+            drawn.append(i)
+            tree.remove(i)
+        self.assertEqual(sorted(drawn), list(np.flatnonzero(self.weights)))
+        self.assertRaises(ValueError, tree.sample, self.rng)
+
+    def test_sample_frequencies(self):
+        tree = SumTree(self.weights)
+        counts = np.bincount([tree.sample(self.rng) for k in xrange(20000)], minlength=len(self.weights))
+        self.assertTrue(np.allclose(counts / 20000., self.weights / self.weights.sum(), atol=0.02))
+
+
+if __name__ == '__main__':
+    main()
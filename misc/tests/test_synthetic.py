@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for the synthetic data generator. """
+
+from faculty_hiring.misc.synthetic import write_institution_records, write_faculty_records
+from faculty_hiring.parse.institution_parser import parse_institution_records
+from faculty_hiring.parse.load import load_assistant_prof_pools
+from StringIO import StringIO
+from unittest import TestCase, main
+import numpy as np
+
+
+class tests(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.inst_fp = StringIO()
+        self.fac_fp = StringIO()
+        write_institution_records(self.inst_fp, 30, rng)
+        write_faculty_records(self.fac_fp, 30, 200, rng)
+        self.inst_fp.seek(0)
+        self.fac_fp.seek(0)
+
+    def test_round_trip(self):
+        inst = parse_institution_records(self.inst_fp)
+        self.assertEqual(len(inst), 31)  # Plus UNKNOWN
+        candidate_pools, job_pools, job_ranks, year_range = load_assistant_prof_pools(self.fac_fp, inst)
+        self.assertEqual(sum(len(pool) for pool in job_pools), 200)
+        for pool in candidate_pools:
+            for f, phd_rank in pool:
+                self.assertTrue(f.first_asst_job_year >= f.phd_year)
+                self.assertEqual(f.phd_rank, inst[f.phd_location]['pi_rescaled'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" K-fold cross-validation over years.
+
+    The year pools already held by a SimulationEngine are split into k folds
+    of years.  Each fold's training and test sets are engine.subset() views of
+    the same pools (nothing is copied or recomputed), the model is fit on the
+    training years with MultiStartOptimizer and scored on the held-out ones.
+    Folds are fit in parallel, one per worker process.
+
+    Example:
+        >>> engine = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, iters=50, batch=True)
+        >>> folds = year_folds(year_range, 5)
+        >>> results = cross_validate(engine, folds, normal_starts(20, model.num_weights()), processes=5)
+        >>> print summarize(results)
+"""
+
+import multiprocessing
+import numpy as np
+import pandas as pd
+from faculty_hiring.models.optimizer import MultiStartOptimizer, evaluate
+
+
+FOLD_COLUMNS = ['fold', 'test_years', 'train_error', 'test_error', 'test_jobs', 'weights']
+
+_worker_args = None  # Set by _init_worker in each worker process
+
+
+def year_folds(year_range, k, shuffle=False, rng=np.random):
+    """ Split pool indices into k folds (arrays of indices into year_range).
+        Folds are blocks of consecutive years unless shuffle is set. """
+    indices = np.arange(len(year_range))
+    if shuffle:
+        indices = rng.permutation(indices)
+    return [np.sort(fold) for fold in np.array_split(indices, k)]
+
+
+def held_out_fold(year_range, years):
+    """ A single fold holding out the given years (e.g., tuning.py's -v) """
+    return [np.flatnonzero(np.in1d(year_range, years))]
+
+
+def fit_fold(engine, test_pools, starts, objective='simulate', test_objective=None, num_local=1,
+             method='Nelder-Mead', options=None, tol=None, screen_iters=None, screen_objective=None):
+    """ Fit on every pool but test_pools and score the fit on test_pools.
+        Returns (train_error, test_error, weights).  The test error is
+        unregularized; it's test_objective (default: objective) at the fitted weights. """
+    test_pools = set(test_pools)
+    train = engine.subset([i for i in xrange(engine.num_pools) if i not in test_pools])
+    test = engine.subset(sorted(test_pools), reg=0.)
+    screen = None if screen_iters is None else train.subset(xrange(train.num_pools), iters=screen_iters)
+
+    try:
+        optimizer = MultiStartOptimizer(train, objective, screen_engine=screen, method=method, options=options,
+                                        tol=tol, screen_objective=screen_objective)
+        results = optimizer.run(starts, num_local)
+        best = results[results['stage'] == 'local'].iloc[0]
+        test_error = evaluate(test, objective if test_objective is None else test_objective, best['weights'])
+    finally:
+        for view in [train, test, screen]:
+            if view is not None:
+                view.close()  # Multi-process engines' views have their own workers
+    return best['value'], test_error, best['weights']
+
+
+def _init_worker(engine, kwargs):
+    global _worker_args
+    np.random.seed()  # Forked workers would otherwise share one random stream
+    engine.processes = 1  # No nested worker pools
+    engine.backend = None
+    engine.cache = None
+    _worker_args = (engine, kwargs)
+
+
+def _fit_fold(unit):
+    engine, kwargs = _worker_args
+    k, test_pools, starts = unit
+    return k, fit_fold(engine, test_pools, starts, **kwargs)
+
+
+def cross_validate(engine, folds, starts, processes=1, year_range=None, **kwargs):
+    """ Fit and test every fold (see fit_fold for the keyword arguments).
+        Returns a DataFrame with one row per fold. """
+    units = [(k, fold, starts) for k, fold in enumerate(folds)]
+    processes = min(processes or multiprocessing.cpu_count(), len(units))
+    if processes > 1:
+        worker_pool = multiprocessing.Pool(processes, _init_worker, (engine, kwargs))
+        try:
+            fits = worker_pool.map(_fit_fold, units, chunksize=1)
+        finally:
+            worker_pool.terminate()
+            worker_pool.join()
+    else:
+        fits = [(k, fit_fold(engine, fold, starts, **kwargs)) for k, fold, starts in units]
+
+    rows = []
+    for k, (train_error, test_error, weights) in sorted(fits):
+        fold = folds[k]
+        test_years = list(fold) if year_range is None else [year_range[i] for i in fold]
+        test_jobs = sum(len(engine.job_pools[i]) for i in fold)
+        rows.append((k, test_years, train_error, test_error, test_jobs, weights))
+    return pd.DataFrame(rows, columns=FOLD_COLUMNS)
+
+
+def summarize(results):
+    """ Mean, standard deviation and standard error of the per-fold errors """
+    summary = {}
+    for column in ['train_error', 'test_error']:
+        values = np.asarray(results[column], dtype=float)
+        summary[column] = values.mean()
+        summary[column + '_std'] = values.std(ddof=1) if len(values) > 1 else 0.
+        summary[column + '_sem'] = summary[column + '_std'] / np.sqrt(len(values))
+    return pd.Series(summary)
@@ -38,7 +38,8 @@ class ConfigurationModel:
 
     def simulate_hiring(self, candidates, positions, position_ranks, school_info, **kwargs):
         """ All candidates have an equal chance of being hired to each job """ 
-        candidates_without_ranks = np.random.permutation([f[0] for f in candidates])
+        rng = kwargs.get('random_state', np.random)
+        candidates_without_ranks = rng.permutation([f[0] for f in candidates])
         return zip(candidates_without_ranks, positions)
 
 
@@ -67,15 +68,16 @@ class BestFirstModel:
             and you get no bonus points for prestige.
         """
         # Populate list of available candidates
+        rng = kwargs.get('random_state', np.random)
         candidate_pool = []
-        noise = NOISE_LEVEL * np.random.randn(len(candidates))
+        noise = NOISE_LEVEL * rng.randn(len(candidates))
         for i, f in enumerate(candidates):
             # candidates are tuples (faculty_profile, phd_rank)
             candidate_pool.append((f[1]+noise[i], f[0]))
 
         # Populate list of open jobs
         job_pool = []
-        noise = 0.1 * np.random.randn(len(positions))
+        noise = 0.1 * rng.randn(len(positions))
         for i, s in enumerate(positions):
             job_pool.append((position_ranks[i]+noise[i], s))
 
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Multi-start optimization of the hiring models.
+
+    Random starting weights are scored (in parallel) with a cheap "screening"
+    engine or objective, e.g., few Monte Carlo iterations, and local searches
+    (scipy.optimize.minimize) are then run at once from the best few starts
+    with the full engine.  Every start and every local search ends up in one
+    table, ranked by objective value.
+
+    Worker processes are forked with their own copy of the engines, so only
+    weights and results travel between processes.  Engines should be created
+    with processes=1 -- the driver supplies the parallelism.
+
+    Example:
+        >>> screen = SimulationEngine(..., iters=20)
+        >>> engine = SimulationEngine(..., iters=150)
+        >>> optimizer = MultiStartOptimizer(engine, 'simulate', screen_engine=screen, processes=8,
+        ...                                 options={'maxiter': 100})
+        >>> results = optimizer.run(uniform_starts(100, model.num_weights()), num_local=8)
+        >>> best_weights = results['weights'][0]
+"""
+
+import multiprocessing
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from faculty_hiring.misc.run_log import RunLog
+from faculty_hiring.models.stochastic_optimizer import spsa_search
+
+
+# Keyword arguments that silence each engine objective
+OBJECTIVE_ARGS = {'simulate': {'quiet': True},
+                  'calculate_neg_log_likelihood': {'verbose': False},
+                  'calculate_neg_log_likelihood_and_gradient': {'verbose': False},
+                  'calculate_regvec_neg_log_likelihood': {'verbose': False}}
+GRADIENT_OBJECTIVES = ('calculate_neg_log_likelihood_and_gradient',)
+BATCH_OBJECTIVES = {'calculate_neg_log_likelihood': 'calculate_neg_log_likelihood_batch'}
+# Engine methods that can't be minimized (the likelihood underflows to -0.0 on real data)
+UNUSABLE_OBJECTIVES = ('calculate_neg_likelihood',)
+STOCHASTIC_METHODS = ('SPSA',)
+RESULT_COLUMNS = ['value', 'stage', 'start', 'weights', 'evaluations', 'success', 'message']
+
+_worker_args = None  # Set by _init_worker in each worker process
+
+
+def uniform_starts(num_starts, num_weights, low=-100., high=100., rng=np.random):
+    """ Starting weights drawn uniformly from [low, high) """
+    return low + (high - low) * rng.random_sample((num_starts, num_weights))
+
+
+def normal_starts(num_starts, num_weights, scale=1., rng=np.random):
+    """ Starting weights drawn from N(0, scale^2) """
+    return scale * rng.randn(num_starts, num_weights)
+
+
+def objective_function(engine, objective):
+    """ engine.<objective> as a function of the weights alone """
+    if objective in UNUSABLE_OBJECTIVES:
+        raise ValueError('%s is not a usable objective; use calculate_neg_log_likelihood' % objective)
+    method = getattr(engine, objective)
+    kwargs = OBJECTIVE_ARGS.get(objective, {})
+    return lambda weights: method(weights=np.array(weights, dtype=float), **kwargs)
+
+
+def logged_objective(engine, objective, log=None, **fields):
+    """ objective_function that also appends an 'eval' record (with the
+        given extra fields) to the RunLog for every evaluation """
+    function = objective_function(engine, objective)
+    if log is None:
+        return function
+    def logged(weights):
+        result = function(weights)
+        value = result[0] if objective in GRADIENT_OBJECTIVES else result
+        log.append(dict(fields, type='eval', objective=objective, weights=np.array(weights, dtype=float),
+                        value=float(value)))
+        return result
+    return logged
+
+
+def evaluate(engine, objective, weights, log=None, **fields):
+    """ Objective value at weights (without the gradient, if any) """
+    value = logged_objective(engine, objective, log, **fields)(weights)
+    if objective in GRADIENT_OBJECTIVES:
+        value = value[0]
+    return float(value)
+
+
+def local_search(engine, objective, w0, method='Nelder-Mead', options=None, tol=None, log=None, **fields):
+    """ scipy.optimize.minimize from w0 or, with method 'SPSA' (simulate
+        only), the noise-aware SPSA of stochastic_optimizer.
+        Returns (weights, value, evaluations, success, message). """
+    if method in STOCHASTIC_METHODS:
+        if objective != 'simulate':
+            raise ValueError('%s only optimizes simulate, not %s' % (method, objective))
+        return spsa_search(engine, w0, options, log, **fields)
+    res = minimize(logged_objective(engine, objective, log, **fields), w0, method=method, options=options, 
+                   tol=tol, jac=objective in GRADIENT_OBJECTIVES)
+    return np.asarray(res.x, dtype=float), float(res.fun), res.nfev, bool(res.success), str(res.message)
+
+
+def _init_worker(engine, screen_engine, objective, screen_objective, log_filename):
+    global _worker_args
+    np.random.seed()  # Forked workers would otherwise share one random stream
+    for e in set([engine, screen_engine]):
+        e.processes = 1   # No nested worker pools
+        e.backend = None
+        e.cache = None    # Appending to a shared cache file isn't safe across processes
+    log = None if log_filename is None else RunLog(log_filename, load=False)
+    _worker_args = (engine, screen_engine, objective, screen_objective, log)
+
+
+def _evaluate_start(unit):
+    engine, screen_engine, objective, screen_objective, log = _worker_args
+    k, weights = unit
+    return k, evaluate(screen_engine, screen_objective, weights, log, stage='start', start=k)
+
+
+def _local_search(unit):
+    engine, screen_engine, objective, screen_objective, log = _worker_args
+    k = unit[0]
+    return k, local_search(engine, objective, *unit[1:], log=log, stage='local', start=k)
+
+
+class MultiStartOptimizer:
+    def __init__(self, engine, objective='simulate', screen_engine=None, processes=1,
+                 method='Nelder-Mead', options=None, tol=None, screen_objective=None, log=None):
+        self.engine = engine
+        self.objective = objective
+        self.screen_engine = engine if screen_engine is None else screen_engine
+        self.screen_objective = objective if screen_objective is None else screen_objective
+        self.processes = processes or multiprocessing.cpu_count()
+        self.method = method
+        self.options = options
+        self.tol = tol
+        self.log = log
+        self.worker_pool = None
+
+
+    def start(self):
+        """ Fork the workers (with copies of the engines) """
+        if self.worker_pool is None:
+            log_filename = None if self.log is None else self.log.filename
+            self.worker_pool = multiprocessing.Pool(self.processes, _init_worker, 
+                                                    self.worker_args()[:-1] + (log_filename,))
+
+
+    def worker_args(self):
+        return self.engine, self.screen_engine, self.objective, self.screen_objective, self.log
+
+
+    def close(self):
+        """ Shut down the worker processes """
+        if self.worker_pool is not None:
+            self.worker_pool.terminate()
+            self.worker_pool.join()
+            self.worker_pool = None
+
+
+    def map(self, function, units):
+        """ Iterator of function(unit) results, in order of completion """
+        if self.processes > 1:
+            self.start()
+            return self.worker_pool.imap_unordered(function, units, chunksize=1)
+        global _worker_args
+        _worker_args = self.worker_args()
+        return (function(unit) for unit in units)
+
+
+    def screen(self, starts, indices=None):
+        """ Screening-objective value of every start (or of starts[indices]).
+            In this process, objectives with a batch form (BATCH_OBJECTIVES)
+            score all the starts in one call. """
+        if indices is None:
+            indices = xrange(len(starts))
+        if self.processes == 1 and self.screen_objective in BATCH_OBJECTIVES:
+            return self.screen_batch(starts, list(indices))
+        values = dict(self.map(_evaluate_start, [(k, np.asarray(starts[k], dtype=float)) for k in indices]))
+        return np.array([values[k] for k in indices])
+
+
+    def screen_batch(self, starts, indices):
+        """ screen() with the batch form of the screening objective """
+        weights = np.array([starts[k] for k in indices], dtype=float).reshape(len(indices), -1)
+        values = getattr(self.screen_engine, BATCH_OBJECTIVES[self.screen_objective])(weights)
+        if self.log is not None:
+            for k, w, value in zip(indices, weights, values):
+                self.log.append({'type': 'eval', 'objective': self.screen_objective, 'weights': w, 
+                                 'value': float(value), 'stage': 'start', 'start': k})
+        return values
+
+
+    def search(self, starts, indices=None):
+        """ Local searches from every start (or from starts[indices]).
+            Yields (index, (weights, value, evaluations, success, message))
+            as searches finish. """
+        if indices is None:
+            indices = xrange(len(starts))
+        units = [(k, np.asarray(starts[k], dtype=float), self.method, self.options, self.tol) for k in indices]
+        return self.map(_local_search, units)
+
+
+    def run_settings(self):
+        """ What a logged run must match to be resumed """
+        model = self.engine.model
+        return {'model': getattr(model, 'prob_function_name', model.__class__.__name__),
+                'objective': self.objective, 'screen_objective': self.screen_objective, 
+                'method': self.method, 'options': self.options, 'tol': self.tol}
+
+
+    def resume(self, starts):
+        """ Check the log against this run, or start it.  Returns the starts
+            to use (those of the logged run, when resuming).  Raises
+            ValueError if the logged run had other settings or starts of
+            another shape (e.g., another number of weights). """
+        settings = self.run_settings()
+        run = self.log.last('run')
+        if run is None:
+            self.log.append(dict(settings, type='run', starts=starts))
+            return starts
+        different = sorted(k for k, v in settings.iteritems() if run.get(k) != v)
+        if np.shape(run['starts']) != np.shape(starts):
+            different.append('starts %s' % (np.shape(run['starts']),))
+        if different:
+            raise ValueError('Log %s is for a different run (%s)' % (self.log.filename, ', '.join(
+                             '%s=%r' % (k, run.get(k)) if k in settings else k for k in different)))
+        return run['starts']
+
+
+    def run(self, starts, num_local=1):
+        """ Screen all starts, then search locally from the best num_local.
+            Returns a DataFrame of every start ('start' stage) and local
+            search result ('local' stage), ranked by objective value.
+            Column `start' is the index of the start each row came from. 
+
+            With a RunLog, every evaluation and finished search is logged as
+            it happens and a rerun with the same log resumes: logged starts
+            aren't screened again, finished searches aren't repeated and
+            unfinished ones restart from their best logged weights. """
+        starts = np.atleast_2d(np.asarray(starts, dtype=float))
+        if self.log is not None:
+            starts = self.resume(starts)
+        values = np.empty(len(starts))
+        done, w0 = {}, starts.copy()
+        if self.log is not None:
+            values.fill(np.nan)
+            for record in self.log.query('eval', stage='start'):
+                values[record['start']] = record['value']
+            for record in self.log.query('local'):
+                done[record['start']] = record
+            for record in self.log.best(len(self.log), stage='local')[::-1]:
+                w0[record['start']] = record['weights']  # Best evaluation of each search wins
+            to_screen = list(np.flatnonzero(np.isnan(values)))
+        else:
+            to_screen = range(len(starts))
+        values[to_screen] = self.screen(starts, to_screen)
+        rows = [(values[k], 'start', k, starts[k], 1, True, '') for k in xrange(len(starts))]
+
+        best = np.argsort(values, kind='mergesort')[:num_local]
+        for k, (weights, value, evaluations, success, message) in \
+                self.search(w0, [k for k in best if k not in done]):
+            done[k] = {'type': 'local', 'start': k, 'weights': weights, 'value': value, 
+                       'evaluations': evaluations, 'success': success, 'message': message}
+            if self.log is not None:
+                self.log.append(done[k])
+        for k in best:
+            r = done[k]
+            rows.append((r['value'], 'local', k, r['weights'], r['evaluations'], r['success'], r['message']))
+
+        results = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+        return results.sort_values('value', kind='mergesort').reset_index(drop=True)
+
+
+def print_results(results):
+    """ Print a results table, then each local search's value and weights
+        (and message, e.g., SPSA's confidence interval) in the 
+        "fun: ... x: array([...])" form of scipy's results """
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print results[RESULT_COLUMNS[:3] + RESULT_COLUMNS[4:6]]
+    for k, row in results[results['stage'] == 'local'].iterrows():
+        print '     fun: %r' % row['value']
+        print '       x: %r' % row['weights']
+        print ' message: %s' % row['message']
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Multi-process backend for the simulation engine.
+
+    Pool data (candidate features, job ranks, job region codes) is copied into
+    shared memory once, before the worker processes are forked.  Workers read
+    those arrays in place instead of receiving pickled faculty records with
+    every call; only the weights travel with each work unit.
+
+    Work is split into (pool, block of iterations) units.  Replicate t of pool
+    i always draws from RandomState([seed, t, i]) (see replicate_streams), so
+    the results depend only on the seed -- not on the number of workers, how
+    the work was split or whether a block's replicates are sampled as a batch.
+    With one process the same units run in-process; SimulationEngine uses
+    this backend for every simulation of a SigmoidModel.
+"""
+
+import multiprocessing
+import numpy as np
+from multiprocessing.sharedctypes import RawArray
+from faculty_hiring.models.sigmoid_prob_functions import features_from_arrays, pool_scores
+from faculty_hiring.models.sigmoid_models import job_probabilities, sample_hires, replicate_streams
+
+
+FEATURE_COLUMNS = ['rank', 'dblp_z', 'has_postdoc', 'is_female']
+UNITS_PER_PROCESS = 4  # Work units per worker (per call), for load balancing
+SAMPLER = 'gumbel-replicate-streams-1'  # Change when the sampler or its streams change (cached objectives)
+
+_worker_pools = None  # Set by _init_worker in each worker process
+
+
+def share_array(x):
+    """ Copy a numpy array into shared memory.
+        Returns a picklable (raw_buffer, dtype, shape) triple. """ 
+    x = np.ascontiguousarray(x)
+    raw = RawArray('b', x.nbytes)
+    np.frombuffer(raw, dtype=x.dtype)[:] = x.ravel()
+    return raw, x.dtype.str, x.shape
+
+
+def attach_array(shared):
+    """ View a shared (raw_buffer, dtype, shape) triple as a numpy array (no copy) """ 
+    raw, dtype, shape = shared
+    return np.frombuffer(raw, dtype=np.dtype(dtype)).reshape(shape)
+
+
+def pool_arrays(features, job_ranks, job_region_codes):
+    """ Everything a worker needs to simulate one pool, as plain arrays.
+        Feature columns the candidates don't have are left out. """ 
+    arrays = {'region': features.region,
+              'job_ranks': np.array(job_ranks, dtype=float),
+              'job_region_codes': np.asarray(job_region_codes, dtype=int)}
+    for c in FEATURE_COLUMNS:
+        column = features.get(c)
+        if column is not None:
+            arrays['feature_' + c] = column
+    return arrays
+
+
+def pool_from_arrays(arrays):
+    """ Rebuild pool features and job arrays from `pool_arrays' output """ 
+    columns = dict((c, arrays['feature_' + c]) for c in FEATURE_COLUMNS if 'feature_' + c in arrays)
+    return features_from_arrays(columns, arrays['region']), arrays['job_ranks'], arrays['job_region_codes']
+
+
+def simulate_block(pool, pool_index, t_start, t_stop, seed, prob_function_name, weights, power, batch=True):
+    """ Simulate replicates [t_start, t_stop) of one pool, as one batch or
+        one replicate at a time (same hires either way).
+        Returns a (t_stop - t_start) x num_jobs array of hired candidate indices. """ 
+    features, job_ranks, region_codes = pool
+    with np.errstate(divide='ignore'):
+        log_job_p = np.log(job_probabilities(job_ranks, power))
+        log_scores = np.log(pool_scores(prob_function_name, features, job_ranks, region_codes, weights))
+
+    streams = replicate_streams(seed, pool_index, t_start, t_stop)
+    if batch:
+        return sample_hires(log_job_p, log_scores, streams)
+    hired = np.empty((t_stop - t_start, len(job_ranks)), dtype=int)
+    for t, rng in enumerate(streams):
+        hired[t] = sample_hires(log_job_p, log_scores, [rng])[0]
+    return hired
+
+
+def _init_worker(shared_pools):
+    global _worker_pools
+    _worker_pools = [pool_from_arrays(dict((k, attach_array(v)) for k, v in pool.items()))
+                     for pool in shared_pools]
+
+
+def _simulate_unit(unit):
+    i, t_start, t_stop = unit[:3]
+    return i, t_start, simulate_block(_worker_pools[i], i, t_start, t_stop, *unit[3:])
+
+
+class ParallelBackend:
+    """ Runs hiring simulations for a set of pools across worker processes """ 
+    def __init__(self, pool_features, job_ranks, job_region_codes, processes=None):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.num_pools = len(pool_features)
+        self.num_jobs = [len(ranks) for ranks in job_ranks]
+        self.pools = [pool_arrays(pool_features[i], job_ranks[i], job_region_codes[i]) 
+                      for i in xrange(self.num_pools)]
+        self.local_pools = None
+        self.worker_pool = None
+
+
+    def start(self):
+        """ Move pool data into shared memory and fork the workers """ 
+        if self.worker_pool is None:
+            shared = [dict((k, share_array(v)) for k, v in pool.items()) for pool in self.pools]
+            self.worker_pool = multiprocessing.Pool(self.processes, _init_worker, (shared,))
+
+
+    def close(self):
+        """ Shut down the worker processes """ 
+        if self.worker_pool is not None:
+            self.worker_pool.terminate()
+            self.worker_pool.join()
+            self.worker_pool = None
+
+
+    def work_units(self, iterations, seed, prob_function_name, weights, power, batch=True):
+        """ Split (iteration, pool) pairs into blocks of iterations """ 
+        target = UNITS_PER_PROCESS * self.processes
+        block = max(1, (iterations * self.num_pools) // target)
+        weights = np.asarray(weights, dtype=float)
+        units = []
+        for i in xrange(self.num_pools):
+            for t in xrange(0, iterations, block):
+                units.append((i, t, min(t + block, iterations), seed, prob_function_name, weights, power, 
+                              batch))
+        return units
+
+
+    def simulate(self, iterations, seed, prob_function_name, weights, power=1.0, batch=True):
+        """ Returns a list (one entry per pool) of iterations x num_jobs 
+            arrays of hired candidate indices.  batch: sample each work unit's
+            replicates together (faster, more memory) or one at a time. """ 
+        units = self.work_units(iterations, seed, prob_function_name, weights, power, batch)
+        if self.processes > 1:
+            self.start()
+            results = self.worker_pool.map(_simulate_unit, units)
+        else:
+            if self.local_pools is None:
+                self.local_pools = [pool_from_arrays(pool) for pool in self.pools]
+            results = [(u[0], u[1], simulate_block(self.local_pools[u[0]], *u)) for u in units]
+
+        hired = [np.empty((iterations, m), dtype=int) for m in self.num_jobs]
+        for i, t_start, block in results:
+            hired[i][t_start:t_start + len(block)] = block
+        return hired
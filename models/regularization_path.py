@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Warm-started regularization path.
+
+    Fits a model for every L2 strength of a grid in one process, instead of
+    one cold-started optimization per --reg value.  Solves go from the
+    strongest regularization to the weakest, each starting from the previous
+    solution.  The unpenalized objective (log-likelihood or placement error)
+    is evaluated by a reg=0 view of the engine, so pools, features and hiring
+    orders are prepared once, and every evaluation is memoized by weights; the
+    penalty is added here.  Evaluations repeated across grid points (the warm
+    start itself, the simplex around it, ...) are therefore free.
+
+    Example:
+        >>> engine = SimulationEngine(..., hiring_orders=orders, hiring_log_probs=log_probs)
+        >>> path = RegularizationPath(engine, 'calculate_neg_log_likelihood_and_gradient', method='BFGS')
+        >>> results = path.solve(reg_grid(1e-4, 10., 20), test_engine=held_out)
+        >>> path.close()
+        >>> W = path_weights(results)  # The coefficient path, one row per reg
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from faculty_hiring.models.optimizer import objective_function, evaluate, GRADIENT_OBJECTIVES
+from faculty_hiring.misc.objective_cache import ObjectiveCache
+
+
+PATH_COLUMNS = ['reg', 'value', 'data_value', 'penalty', 'test_value', 'weights', 'evaluations',
+                'success', 'message']
+
+
+def reg_grid(low, high, num):
+    """ num regularization strengths, log-spaced from high down to low """
+    return np.logspace(np.log10(high), np.log10(low), num)
+
+
+def path_weights(results):
+    """ The coefficient path as an array (one row per regularization strength) """
+    return np.vstack(results['weights'])
+
+
+class RegularizationPath:
+    def __init__(self, engine, objective='calculate_neg_log_likelihood', method='Nelder-Mead',
+                 options=None, tol=None, cache_size=100000):
+        self.engine = engine.subset(xrange(engine.num_pools), reg=0.)
+        if self.engine.cache is None:
+            self.engine.cache = ObjectiveCache(max_size=cache_size)
+        self.objective = objective
+        self.data_objective = objective_function(self.engine, objective)
+        self.method = method
+        self.options = options
+        self.tol = tol
+
+
+    def close(self):
+        """ Release the worker processes of the engine view, if any """
+        self.engine.close()
+
+
+    def penalized_objective(self, reg):
+        """ Data term plus reg * ||w[1:]||^2 (the engines' L2 penalty) """
+        def function(weights):
+            weights = np.asarray(weights, dtype=float)
+            result = self.data_objective(weights)
+            penalty = reg * np.dot(weights[1:], weights[1:])
+            if self.objective in GRADIENT_OBJECTIVES:
+                value, gradient = result
+                gradient = np.array(gradient, dtype=float)
+                gradient[1:] += 2. * reg * weights[1:]
+                return value + penalty, gradient
+            return result + penalty
+        return function
+
+
+    def fit(self, reg, w0):
+        """ Minimize the objective at one regularization strength from w0.
+            Returns (weights, value, evaluations, success, message). """
+        res = minimize(self.penalized_objective(reg), w0, method=self.method, options=self.options,
+                       tol=self.tol, jac=self.objective in GRADIENT_OBJECTIVES)
+        return np.asarray(res.x, dtype=float), float(res.fun), res.nfev, bool(res.success), str(res.message)
+
+
+    def solve(self, regs, w0=None, test_engine=None, test_objective=None, verbose=False):
+        """ Fit every regularization strength in regs, strongest first, each
+            warm-started from the previous solution (the first from w0,
+            default zeros).  If a test_engine is given, each solution is also
+            scored on it (test_objective, default: the fitted objective).
+            Returns a DataFrame with one row per strength, in solve order. """
+        regs = sorted(regs, reverse=True)
+        weights = np.zeros(self.engine.model.num_weights()) if w0 is None else np.asarray(w0, dtype=float)
+        if test_objective is None:
+            test_objective = self.objective
+
+        rows = []
+        for reg in regs:
+            weights, value, evaluations, success, message = self.fit(reg, weights)
+            penalty = reg * np.dot(weights[1:], weights[1:])
+            test_value = np.nan if test_engine is None else evaluate(test_engine, test_objective, weights)
+            rows.append((reg, value, value - penalty, penalty, test_value, weights, evaluations, success,
+                         message))
+            if verbose:
+                print '%g\t%.6f\t%.6f\t%d' % (reg, value, test_value, evaluations), weights
+        return pd.DataFrame(rows, columns=PATH_COLUMNS)
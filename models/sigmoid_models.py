@@ -11,6 +11,7 @@ __status__ = "Development"
 import numpy as np
 from scipy.special import expit as sigmoid
 from faculty_hiring.models.sigmoid_prob_functions import *  # All prob. function definitions
+from faculty_hiring.misc.sum_tree import SumTree, weighted_choice
 
 
 class SigmoidModel:
@@ -19,6 +20,10 @@ class SigmoidModel:
         self.prob_function = prob_functions[self.prob_function_name]
         self.weights = kwargs.get('weights', default_weights[self.prob_function_name])
         self.power = kwargs.get('power', 1.0)
+
+        # Do candidate scores depend on the job? (e.g., rank difference, geography)
+        terms = getattr(self.prob_function, 'terms', None)
+        self.job_independent = terms is not None and set(terms) <= set(CANDIDATE_ONLY_TERMS)
     
 
     def get_weights(self):
@@ -34,43 +39,49 @@ class SigmoidModel:
     def simulate_hiring(self, candidates, positions, position_ranks, school_info, **kwargs):
         """ Returns a list of person-place tuples (hires) """ 
         hires = []
-        self.weights = kwargs.get('weights', self.weights)
-        self.power = kwargs.get('power', self.power)
+        self.weights = kwargs.pop('weights', self.weights)
+        self.power = kwargs.pop('power', self.power)
+        rng = kwargs.pop('random_state', np.random)
+
+        # Candidate attributes are gathered once per pool, not once per job
+        if kwargs.get('features', None) is None:
+            kwargs['features'] = CandidateFeatures(candidates)
 
         # Is the candidate available or not? 
-        cand_available = np.ones(len(candidates))
+        cand_available = np.ones(len(candidates), dtype=bool)
 
         # Prepare job rankings (used to determine order in which jobs are filled)
         num_jobs = len(positions)
         job_ranks = np.array(position_ranks, dtype=float)
-        job_p = job_ranks / job_ranks.sum()  # make probability
+        job_tree = SumTree(self.job_probabilities(job_ranks))  # select job proportional to rank
 
-        # Original model, select job proportional to rank
-        if self.power > 1:
-            job_p = job_p ** self.power
-            job_p /= job_p.sum() 
+        # If scores don't depend on the job, candidates can be drawn from one tree too
+        cand_tree = None
+        if self.job_independent:
+            cand_tree = SumTree(self.prob_function(candidates, cand_available, positions[0], job_ranks[0],
+                                                   school_info, self.weights, **kwargs))
 
         # Match candidates to jobs
         for j in xrange(num_jobs):
             # Select job to fill
-            job_ind = np.random.multinomial(1, job_p).argmax()
+            job_ind = job_tree.sample(rng)
             job_rank = job_ranks[job_ind]
-            job_p[job_ind] = 0.  # mark as unavailable
-            job_p_sum = np.sum(job_p)
-            if job_p_sum > 0.:  # jobs left?
-                job_p /= np.sum(job_p)  # renormalize
+            job_tree.remove(job_ind)  # mark as unavailable
 
             # Match candidate to job
-            cand_p = self.prob_function(candidates, cand_available, positions[job_ind], job_rank,
-                                        school_info, self.weights, **kwargs)
-            cand_p /= cand_p.sum()
-            cand_ind = np.random.multinomial(1, cand_p).argmax()
+            if cand_tree is not None:
+                cand_ind = cand_tree.sample(rng)
+                cand_tree.remove(cand_ind)
+            else:
+                cand_p = self.prob_function(candidates, cand_available, positions[job_ind], job_rank,
+                                            school_info, self.weights, **kwargs)
+                cand_ind = weighted_choice(cand_p, rng)
 
             # Log the hire
             hires.append((candidates[cand_ind][0], positions[job_ind]))
             
             # Remove the candidate from the pool
-            cand_available[cand_ind] = 0
+            cand_available[cand_ind] = False
 
         return hires
 
@@ -82,6 +93,121 @@ class SigmoidModel:
                                         school_info, self.weights, **kwargs)
 
 
+    def score_matrix(self, candidates, positions, position_ranks, school_info, **kwargs):
+        """ Score every candidate for every position.
+            Returns a (num_positions x num_candidates) matrix. """ 
+        features = get_candidate_features(candidates, **kwargs)
+        region_codes = kwargs.get('region_codes', None)
+        if region_codes is None:
+            region_codes = job_region_codes(features, positions, school_info)
+        return pool_scores(self.prob_function_name, features, position_ranks, region_codes, self.weights)
+
+
+    def score_matrix_batch(self, candidates, positions, position_ranks, school_info, weights, **kwargs):
+        """ score_matrix for every row of a stack of weight vectors.
+            Returns a (num_rows x num_positions x num_candidates) array. """ 
+        features = get_candidate_features(candidates, **kwargs)
+        region_codes = kwargs.get('region_codes', None)
+        if region_codes is None:
+            region_codes = job_region_codes(features, positions, school_info)
+        return pool_scores_batch(self.prob_function_name, features, position_ranks, region_codes, weights)
+
+
+    def score_matrix_gradients(self, candidates, positions, position_ranks, school_info, **kwargs):
+        """ Score matrix plus its derivative with respect to each weight
+            (see pool_score_gradients) """ 
+        features = get_candidate_features(candidates, **kwargs)
+        region_codes = kwargs.get('region_codes', None)
+        if region_codes is None:
+            region_codes = job_region_codes(features, positions, school_info)
+        return pool_score_gradients(self.prob_function_name, features, position_ranks, region_codes, self.weights)
+
+
+    def job_probabilities(self, position_ranks):
+        """ Probability of each position being the first one filled """ 
+        return job_probabilities(position_ranks, self.power)
+
+
+    def simulate_hiring_batch(self, candidates, positions, position_ranks, school_info, replicates, **kwargs):
+        """ Run many independent hiring simulations of one pool at once.
+
+            Jobs and candidates are drawn with the Gumbel-max trick: adding
+            Gumbel noise to log-probabilities and taking the argmax is a draw
+            from the (renormalized) distribution, so all replicates advance
+            together as (replicates x candidates) arrays.  The job order is a
+            weighted sample without replacement, i.e. a sort of the perturbed
+            log-probabilities.
+
+            random_state is either a list of per-replicate streams (see 
+            replicate_streams) or one stream the replicates' seeds are drawn from.
+
+            Returns a (replicates x num_jobs) array of candidate indices;
+            entry [r,j] is the candidate hired into positions[j] in replicate r.
+        """ 
+        self.weights = kwargs.pop('weights', self.weights)
+        self.power = kwargs.pop('power', self.power)
+        rng = kwargs.pop('random_state', np.random)
+        if isinstance(rng, list):
+            streams = rng
+        else:
+            streams = [np.random.RandomState(seed) for seed in rng.randint(2**31 - 1, size=replicates)]
+
+        with np.errstate(divide='ignore'):
+            log_job_p = np.log(self.job_probabilities(position_ranks))
+            log_scores = np.log(self.score_matrix(candidates, positions, position_ranks, school_info, **kwargs))
+
+        return sample_hires(log_job_p, log_scores, streams)
+
+
+def job_probabilities(position_ranks, power=1.0):
+    """ Select jobs proportional to rank (raised to `power', if > 1) """ 
+    job_p = np.array(position_ranks, dtype=float)
+    job_p /= job_p.sum()
+    if power > 1:
+        job_p = job_p ** power
+        job_p /= job_p.sum() 
+    return job_p
+
+
+def replicate_streams(seed, pool_index, t_start, t_stop):
+    """ Random streams of replicates [t_start, t_stop) of a pool: replicate t
+        of pool i always draws from RandomState([seed, t, i]), however the
+        replicates are grouped or spread across processes. """
+    return [np.random.RandomState([seed, t, pool_index]) for t in xrange(t_start, t_stop)]
+
+
+def gumbel_noise(streams, size):
+    """ Gumbel noise, one row of `size' per replicate, each from its own stream """
+    return np.array([rng.gumbel(size=size) for rng in streams])
+
+
+def sample_hires(log_job_p, log_scores, streams):
+    """ Gumbel-max hiring simulation given log job probabilities (num_jobs)
+        and log candidate scores (num_jobs x num_candidates), for one 
+        replicate per random stream.  A replicate's draws come from its own
+        stream only, so it is the same whether simulated alone or in a batch.
+        Returns a (replicates x num_jobs) array of hired candidate indices. """
+    num_jobs, num_candidates = log_scores.shape
+    replicates = len(streams)
+    rows = np.arange(replicates)
+
+    # Order in which jobs are filled, one row per replicate
+    job_keys = log_job_p + gumbel_noise(streams, num_jobs)
+    job_order = np.argsort(-job_keys, axis=1)
+
+    hired = np.empty((replicates, num_jobs), dtype=int)
+    taken = np.zeros((replicates, num_candidates), dtype=bool)
+    for j in xrange(num_jobs):
+        jobs = job_order[:,j]
+        keys = log_scores[jobs] + gumbel_noise(streams, num_candidates)
+        keys[taken] = -np.inf
+        cand_ind = keys.argmax(axis=1)
+        hired[rows, jobs] = cand_ind
+        taken[rows, cand_ind] = True
+
+    return hired
+
+
 
 ''' # NOTE: Hire in order according to rank:
         sorted_jobs = np.argsort(job_p)[::-1]
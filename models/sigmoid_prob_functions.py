@@ -10,247 +10,282 @@ __status__ = "Development"
 
 import numpy as np
 from scipy.special import expit as sigmoid
+from faculty_hiring.parse.institution_parser import InstitutionIndex
+
+
+""" Candidate probability functions for the sigmoid models.
+
+    Every sigmoid function scores a candidate as
+
+        sigmoid(w . [1, x_1, ..., x_k])
+
+    where the x's are the "terms" listed in `SIGMOID_TERMS'.  Terms are either
+    attributes of the candidate (prestige, productivity, gender, postdoc) or
+    attributes of the candidate/job pair (rank difference, geography).  Rather
+    than looping over candidates, the candidate attributes for a pool are
+    stored once in a `CandidateFeatures' matrix and each job is scored with a
+    single matrix-vector product and a single call to `sigmoid'.
+"""
+
+# Terms used by each of the sigmoid probability functions, in weight order.
+#   rd - rank difference (job rank - candidate rank)
+#   rh - rank of the hiring institution
+#   pr - productivity (dblp_z)
+#   pd - has a postdoc
+#   gd - gender (is_female)
+#   gg - geography (PhD region matches job region)
+SIGMOID_TERMS = {'rd'             : ('rd',),
+                 'gg'             : ('gg',),
+                 'pr'             : ('pr',),
+                 'pd'             : ('pd',),
+                 'rd_gd'          : ('rd', 'gd'),
+                 'rd_rh'          : ('rd', 'rh'),
+                 'rd_gg'          : ('rd', 'gg'),
+                 'rd_pr'          : ('rd', 'pr'),
+                 'rd_pd'          : ('rd', 'pd'),
+                 'rd_pr_rh'       : ('rd', 'pr', 'rh'),
+                 'rd_pr_pd'       : ('rd', 'pr', 'pd'),
+                 'rd_pr_gg'       : ('rd', 'pr', 'gg'),
+                 'rd_pr_gg_rh'    : ('rd', 'pr', 'gg', 'rh'),
+                 'rd_pr_gg_pd'    : ('rd', 'pr', 'gg', 'pd'),
+                 'rd_pr_rh_gg'    : ('rd', 'pr', 'rh', 'gg'),
+                 'rd_pr_rh_pd'    : ('rd', 'pr', 'rh', 'pd'),
+                 'no_gd'          : ('rd', 'rh', 'pd', 'pr', 'gg'),
+                 'all'            : ('rd', 'rh', 'pd', 'pr', 'gg', 'gd')}
+
+# Candidate-only terms and the feature column they are read from.
+CANDIDATE_COLUMNS = {'rd': 'rank',
+                     'pr': 'dblp_z',
+                     'pd': 'has_postdoc',
+                     'gd': 'is_female'}
+
+# Terms that depend only on the candidate (not on the job being filled).
+CANDIDATE_ONLY_TERMS = ('pr', 'pd', 'gd')
+
+
+class CandidateFeatures:
+    """ Column-wise attributes for a pool of candidates.
+
+        Built once per pool (a list of (faculty_record, phd_rank) tuples) and
+        reused for every job and every simulation of that pool.  Attribute
+        columns (dblp_z, ...) are read from the records when first needed, so
+        a record missing one fails loudly -- but only for models using it.
+    """
+    def __init__(self, candidates):
+        self.people = [c[0] for c in candidates]
+        self.size = len(candidates)
+        self.columns = {'rank': np.array([c[1] for c in candidates], dtype=float)}
+
+        # Regions are interned as small integers; unknown job regions map to -1.
+        self.region_codes = {}
+        self.region = np.array([self.region_codes.setdefault(f.phd_region, len(self.region_codes))
+                                for f in self.people], dtype=int)
+        self._matrices = {}
+
+
+    def __getitem__(self, column):
+        if column not in self.columns:
+            if self.people is None:  # Wraps given arrays only
+                raise KeyError(column)
+            self.columns[column] = np.array([getattr(f, column) for f in self.people], dtype=float)
+        return self.columns[column]
+
+
+    def get(self, column, default=None):
+        """ A column, or default if the candidates don't have that attribute """
+        try:
+            return self[column]
+        except (AttributeError, KeyError):
+            return default
+
+
+    def region_code(self, region):
+        """ Integer code for a region name (-1 if no candidate shares it) """
+        return self.region_codes.get(region, -1)
+
+
+    def matrix(self, terms):
+        """ Candidate feature matrix (size x k) for the candidate-only terms,
+            in the order given.  Matrices are cached per term tuple. """
+        terms = tuple(terms)
+        if terms not in self._matrices:
+            X = np.empty((self.size, len(terms)), dtype=float)
+            for k, term in enumerate(terms):
+                X[:,k] = self[CANDIDATE_COLUMNS[term]]
+            self._matrices[terms] = X
+        return self._matrices[terms]
+
+
+def get_candidate_features(candidates, **kwargs):
+    """ Use the precomputed features if supplied, otherwise build them """ 
+    features = kwargs.get('features', None)
+    if features is None:
+        features = CandidateFeatures(candidates)
+    return features
+
+
+def features_from_arrays(columns, region):
+    """ Wrap existing feature arrays (e.g., views of shared memory) """ 
+    features = CandidateFeatures([])
+    features.size = len(region)
+    features.people = None
+    features.columns = columns
+    features.region = region
+    return features
+
+
+def job_region_codes(features, positions, school_info):
+    """ Region code of each position, relative to the candidates' PhD regions """ 
+    if isinstance(school_info, InstitutionIndex):
+        # Code every institution once; positions not in the index map to the trailing -1
+        codes = np.array([features.region_code(region) for region in school_info.Region] + [-1], dtype=int)
+        return codes[school_info.lookup(positions, missing=-1)]
+    return np.array([features.region_code(school_info[p]['Region']) if p in school_info else -1 
+                     for p in positions], dtype=int)
+
+
+def sigmoid_logits(features, terms, weights, inst_rank, job_region_code=-1):
+    """ Linear predictor w . [1, x_1, ..., x_k] for every candidate in the pool.
+        If `inst_rank' and `job_region_code' are arrays (one entry per job),
+        a (num_jobs x num_candidates) matrix is returned. """ 
+    weights = np.asarray(weights, dtype=float)
+    inst_rank = np.asarray(inst_rank, dtype=float)
+    rank_weight = 0.
+    cand_terms = []
+    cand_weights = []
+    gg_weight = 0.
+
+    for w, term in zip(weights[1:], terms):
+        if term == 'rd':  # inst_rank - candidate_rank
+            rank_weight += w
+            cand_terms.append(term)
+            cand_weights.append(-w)
+        elif term == 'rh':
+            rank_weight += w
+        elif term == 'gg':
+            gg_weight += w
+        else:
+            cand_terms.append(term)
+            cand_weights.append(w)
+
+    if cand_terms:
+        cand_logits = np.dot(features.matrix(cand_terms), cand_weights)
+    else:
+        cand_logits = np.zeros(features.size, dtype=float)
+
+    logits = np.add.outer(weights[0] + rank_weight * inst_rank, cand_logits)
+    if gg_weight:
+        logits += gg_weight * np.equal.outer(job_region_code, features.region)
+
+    return logits
+
+
+def pool_scores(name, features, job_ranks, job_region_codes, weights):
+    """ Score every candidate (all available) for every job in a pool. 
+        Returns a (num_jobs x num_candidates) matrix. """ 
+    job_ranks = np.asarray(job_ranks, dtype=float)
+    if name == 'step':
+        return np.where(np.less_equal.outer(job_ranks, features['rank']), 1., 1e-9)
+    if name == 'step+':
+        return np.where(np.less.outer(job_ranks, features['rank']), 1., 1e-9)
+    return sigmoid(sigmoid_logits(features, SIGMOID_TERMS[name], weights, job_ranks, job_region_codes))
+
+
+def pool_scores_batch(name, features, job_ranks, job_region_codes, weights):
+    """ pool_scores for a stack of weight vectors (one per row), built from
+        design columns shared by all rows.
+        Returns a (num_rows x num_jobs x num_candidates) array. """ 
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    if name not in SIGMOID_TERMS:  # Step functions don't depend on the weights
+        F = pool_scores(name, features, job_ranks, job_region_codes, None)
+        return np.repeat(F[None,:,:], len(weights), axis=0)
+
+    logits = np.zeros((len(weights), len(job_ranks), features.size), dtype=float)
+    for k, term in enumerate(('bias',) + SIGMOID_TERMS[name]):
+        logits += weights[:,k,None,None] * design_column(features, term, job_ranks, job_region_codes)
+    return sigmoid(logits)
+
+
+def design_column(features, term, job_ranks, job_region_codes):
+    """ Values of one term for every (job, candidate) pair, as an array 
+        that broadcasts to (num_jobs x num_candidates). """ 
+    job_ranks = np.asarray(job_ranks, dtype=float)
+    if term == 'bias':
+        return np.ones((1, 1))
+    if term == 'rd':
+        return np.subtract.outer(job_ranks, features['rank'])
+    if term == 'rh':
+        return job_ranks[:,None]
+    if term == 'gg':
+        return np.equal.outer(job_region_codes, features.region).astype(float)
+    return features[CANDIDATE_COLUMNS[term]][None,:]
+
+
+def pool_score_gradients(name, features, job_ranks, job_region_codes, weights):
+    """ Scores for every job/candidate pair and their derivatives.
+        Returns F (num_jobs x num_candidates) and a list with dF/dw_k for 
+        each weight; for sigmoid scores, dF/dw_k = F * (1-F) * x_k. """ 
+    if name not in SIGMOID_TERMS:
+        raise ValueError('No gradient for probability function `%s\'' % name)
+
+    F = pool_scores(name, features, job_ranks, job_region_codes, weights)
+    dF_dz = F * (1. - F)
+    gradients = [dF_dz * design_column(features, term, job_ranks, job_region_codes) 
+                 for term in ('bias',) + SIGMOID_TERMS[name]]
+    return F, gradients
+
+
+def sigmoid_prob_function(name):
+    """ Build the probability function for a set of sigmoid terms """ 
+    terms = SIGMOID_TERMS[name]
+    uses_geography = 'gg' in terms
+
+    def prob_function(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
+        features = get_candidate_features(candidates, **kwargs)
+        job_region_code = features.region_code(school_info[inst]['Region']) if uses_geography else -1
+        cand_p = sigmoid(sigmoid_logits(features, terms, weights, inst_rank, job_region_code))
+        cand_p *= np.asarray(cand_available, dtype=bool)
+        return cand_p
+
+    prob_function.__name__ = 'prob_function_sigmoid_%s' % name
+    prob_function.terms = terms
+    return prob_function
 
 
 def prob_function_step_function(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    cand_p[np.where(cand_available)] = 1e-9
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if candidate_rank >= inst_rank:
-            cand_p[i] = 1.
-    #cand_p /= cand_p.sum()
+    features = get_candidate_features(candidates, **kwargs)
+    cand_p = np.zeros(features.size, dtype=float)
+    cand_p[np.asarray(cand_available, dtype=bool)] = 1e-9
+    cand_p[features['rank'] >= inst_rank] = 1.
     return cand_p
 
 
 def prob_function_step_plus(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    cand_p[np.where(cand_available)] = 1e-9
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if candidate_rank > inst_rank:
-            cand_p[i] = 1.
-    #cand_p /= cand_p.sum()
+    features = get_candidate_features(candidates, **kwargs)
+    cand_p = np.zeros(features.size, dtype=float)
+    cand_p[np.asarray(cand_available, dtype=bool)] = 1e-9
+    cand_p[features['rank'] > inst_rank] = 1.
     return cand_p
 
 
-def prob_function_sigmoid_rd(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(weights[0] + weights[1]*(inst_rank-candidate_rank))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_gg(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    job_region = school_info[inst]['Region']
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 int(job_region == candidate.phd_region)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_pr(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 candidate.dblp_z]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_pd(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 int(candidate.has_postdoc)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_gd(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 int(candidate.is_female)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_rh(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 inst_rank]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_gg(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    job_region = school_info[inst]['Region']
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 int(job_region == candidate.phd_region)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_pr(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 candidate.dblp_z]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_pd(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 int(candidate.has_postdoc)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_pr_rh(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 candidate.dblp_z,
-                                                 inst_rank]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_pr_pd(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 candidate.dblp_z,
-                                                 int(candidate.has_postdoc)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_pr_gg(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    job_region = school_info[inst]['Region']
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 candidate.dblp_z,
-                                                 int(job_region == candidate.phd_region)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_pr_rh_gg(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    job_region = school_info[inst]['Region']
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 candidate.dblp_z,
-                                                 inst_rank, 
-                                                 int(job_region == candidate.phd_region)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_pr_rh_pd(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 candidate.dblp_z,
-                                                 inst_rank, 
-                                                 int(candidate.has_postdoc)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_pr_gg_pd(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    job_region = school_info[inst]['Region']
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 candidate.dblp_z,
-                                                 int(job_region == candidate.phd_region),
-                                                 int(candidate.has_postdoc)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_rd_pr_gg_rh(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    job_region = school_info[inst]['Region']
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 candidate.dblp_z,
-                                                 int(job_region == candidate.phd_region),
-                                                 inst_rank]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_no_gd(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    """ Probability function for everything except gender """
-    job_region = school_info[inst]['Region']
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 inst_rank,
-                                                 int(candidate.has_postdoc),
-                                                 candidate.dblp_z,
-                                                 int(job_region == candidate.phd_region)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
-
-
-def prob_function_sigmoid_all(candidates, cand_available, inst, inst_rank, school_info, weights, **kwargs):
-    """ Probability function for *EVERYTHING* """ 
-    job_region = school_info[inst]['Region']
-    cand_p = np.zeros(len(candidates), dtype=float)
-    for i, (candidate, candidate_rank) in enumerate(candidates):
-        if cand_available[i]:
-            cand_p[i] = sigmoid(np.dot(weights, [1, 
-                                                 inst_rank-candidate_rank,
-                                                 inst_rank,
-                                                 int(candidate.has_postdoc),
-                                                 candidate.dblp_z,
-                                                 int(job_region == candidate.phd_region),
-                                                 int(candidate.is_female)]))
-    #cand_p /= cand_p.sum()
-    return cand_p
+prob_function_sigmoid_rd = sigmoid_prob_function('rd')
+prob_function_sigmoid_gg = sigmoid_prob_function('gg')
+prob_function_sigmoid_pr = sigmoid_prob_function('pr')
+prob_function_sigmoid_pd = sigmoid_prob_function('pd')
+prob_function_sigmoid_rd_gd = sigmoid_prob_function('rd_gd')
+prob_function_sigmoid_rd_rh = sigmoid_prob_function('rd_rh')
+prob_function_sigmoid_rd_gg = sigmoid_prob_function('rd_gg')
+prob_function_sigmoid_rd_pr = sigmoid_prob_function('rd_pr')
+prob_function_sigmoid_rd_pd = sigmoid_prob_function('rd_pd')
+prob_function_sigmoid_rd_pr_rh = sigmoid_prob_function('rd_pr_rh')
+prob_function_sigmoid_rd_pr_pd = sigmoid_prob_function('rd_pr_pd')
+prob_function_sigmoid_rd_pr_gg = sigmoid_prob_function('rd_pr_gg')
+prob_function_sigmoid_rd_pr_rh_gg = sigmoid_prob_function('rd_pr_rh_gg')
+prob_function_sigmoid_rd_pr_rh_pd = sigmoid_prob_function('rd_pr_rh_pd')
+prob_function_sigmoid_rd_pr_gg_pd = sigmoid_prob_function('rd_pr_gg_pd')
+prob_function_sigmoid_rd_pr_gg_rh = sigmoid_prob_function('rd_pr_gg_rh')
+prob_function_sigmoid_no_gd = sigmoid_prob_function('no_gd')   # Everything except gender
+prob_function_sigmoid_all = sigmoid_prob_function('all')       # *EVERYTHING*
 
 
 # Provide easy access to the functions above.
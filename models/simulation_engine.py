@@ -8,33 +8,57 @@ __email__ = "samfway@gmail.com"
 __status__ = "Development"
 
 
+import copy
+import hashlib
 import numpy as np
-from faculty_hiring.misc.scoring import sse_rank_diff
+from faculty_hiring.misc.scoring import candidate_positions, hire_arrays, sse_rank_diff_arrays
+from faculty_hiring.parse.institution_parser import institution_index
+from faculty_hiring.models.sigmoid_prob_functions import CandidateFeatures, CANDIDATE_COLUMNS, job_region_codes
+from faculty_hiring.models.parallel_engine import ParallelBackend, SAMPLER
+
+
+# Lists with one entry per pool (see SimulationEngine.subset)
+POOL_ATTRIBUTES = ['candidate_pools', 'job_pools', 'job_ranks', 'pool_features', 'pool_region_codes',
+                   'actual_ids', 'job_ids', 'candidate_positions']
 
 
 class SimulationEngine:
     def __init__(self, candidate_pools, job_pools, job_ranks, school_info, model, 
-                 iters=10, reg=0., hiring_orders=None, hiring_probs=None, **kwargs):
+                 iters=10, reg=0., hiring_orders=None, hiring_log_probs=None, batch=False, processes=1, crn_seed=None, cache=None, **kwargs):
         self.candidate_pools = candidate_pools
         self.job_pools = job_pools
         self.job_ranks = job_ranks
-        self.school_info = school_info
+        self.school_info = institution_index(school_info)
         self.model = model
         self.model_args = kwargs
         self.iterations = iters
         self.regularization = reg
+        self.batch = batch and hasattr(model, 'simulate_hiring_batch')
+        self.processes = processes if hasattr(model, 'prob_function_name') else 1
+        self.backend = None
+        self.crn_seed = crn_seed
+        self.cache = cache
+        self.fingerprint = None
         self.hiring_orders = hiring_orders
-        self.hiring_probs = hiring_probs
+        self.hiring_log_probs = hiring_log_probs
         self.num_pools = len(candidate_pools)
+        self.pool_features = [CandidateFeatures(pool) for pool in candidate_pools]
+        self.pool_ranks = {}
+        self.pool_region_codes = [None] * self.num_pools
+
+        # Institutions as integer ids: where each candidate was actually hired, and each position
+        self.actual_ids = [self.school_info.lookup([f.first_asst_prof()[0] for f, phd_rank in pool])
+                           for pool in candidate_pools]
+        self.job_ids = [self.school_info.lookup(job_pool) for job_pool in job_pools]
+        self.candidate_positions = [candidate_positions(pool) for pool in candidate_pools]
    
         if self.hiring_orders is not None:
             if len(hiring_orders) != self.num_pools:
                 raise ValueError('Hiring orders must be the same size as hiring pools')
             self.num_orders = len(self.hiring_orders[0])
             self.pool_sizes = [len(self.hiring_orders[i][0]) for i in xrange(self.num_pools)]
-            self.likelihoods = np.ones((self.num_pools, self.num_orders), dtype=np.float128)
-            self.log_pr_y_ri = np.zeros(self.num_orders, dtype=np.float128)
-            self.log_pr_ri = np.sum(np.log(self.hiring_probs), axis=0)
+            self.log_pr_y_ri = np.zeros(self.num_orders, dtype=float)
+            self.log_pr_ri = np.sum(self.hiring_log_probs, axis=0)
 
         self.num_jobs = 0.
         for job_pool in job_pools:
@@ -46,31 +70,80 @@ class SimulationEngine:
         return self.model.get_weights()
     
     
+    def subset(self, pools, reg=None, iters=None):
+        """ Engine for some of the pools (a list of pool indices), e.g., the
+            training or held-out years.  Per-pool data and precomputation are
+            shared with this engine, not copied or rebuilt.  The model is 
+            shared too.  reg and iters override this engine's settings. """ 
+        pools = list(pools)
+        engine = copy.copy(self)
+        for name in POOL_ATTRIBUTES:
+            setattr(engine, name, [getattr(self, name)[i] for i in pools])
+        engine.model_args = dict(self.model_args)
+        engine.num_pools = len(pools)
+        engine.num_jobs = float(sum(len(job_pool) for job_pool in engine.job_pools))
+        engine.pool_ranks = {}
+        engine.backend = None
+        engine.fingerprint = None
+        if reg is not None:
+            engine.regularization = reg
+        if iters is not None:
+            engine.iterations = iters
+
+        if self.hiring_orders is not None:
+            engine.hiring_orders = [self.hiring_orders[i] for i in pools]
+            engine.hiring_log_probs = [self.hiring_log_probs[i] for i in pools]
+            engine.pool_sizes = [self.pool_sizes[i] for i in pools]
+            engine.log_pr_y_ri = np.zeros(self.num_orders, dtype=float)
+            engine.log_pr_ri = np.sum(engine.hiring_log_probs, axis=0)
+        return engine
+
+
     def simulate(self, weights=None, quiet=False, ranking='pi'):
         """ Simulate hiring many times under the specified model.
             The returned error is the average squared placement error
             per individual in the dataset PLUS the L2-penalty term, 
             if the model uses weights and regularization is positive. 
+
+            If the engine was given a `crn_seed', every call reuses the same
+            random stream for each (iteration, pool) -- common random numbers
+            -- so the returned error is a deterministic function of the weights.
+
+            Sigmoid models are always simulated by the ParallelBackend (in 
+            this process when processes=1), so one sampler and one stream per
+            replicate are used whatever `processes' and `batch' are: under
+            common random numbers they don't change the error.
         """
         total_error = 0.
 
         if weights is not None:
             self.model.weights = weights
 
+        key = self.cache_key('simulate', ranking)
+        if key is not None and key in self.cache:
+            return self.cache[key]
+
         if self.regularization > 0.:
             penalty = np.dot(self.model.weights[1:], self.model.weights[1:]) * self.regularization  # L2
             #penalty = np.sum(np.abs(self.model.weights[1:]) * self.regularization)  # L1
         else:
             penalty = 0.0
 
-        for t in xrange(self.iterations):
-            for i in xrange(self.num_pools):
-                hires = self.model.simulate_hiring(self.candidate_pools[i],
-                                                   self.job_pools[i],
-                                                   self.job_ranks[i],
-                                                   self.school_info,
-                                                   **self.model_args)
-                total_error += sse_rank_diff(hires, self.school_info, ranking)
+        if hasattr(self.model, 'prob_function_name'):
+            total_error += self.simulate_parallel(ranking, self.crn_seed)
+        else:
+            for t in xrange(self.iterations):
+                for i in xrange(self.num_pools):
+                    hires = self.model.simulate_hiring(self.candidate_pools[i],
+                                                       self.job_pools[i],
+                                                       self.job_ranks[i],
+                                                       self.school_info,
+                                                       features=self.pool_features[i],
+                                                       random_state=self.random_stream(t, i),
+                                                       **self.model_args)
+                    hired, places = hire_arrays(hires, self.candidate_positions[i], self.school_info)
+                    total_error += sse_rank_diff_arrays(hired, places, self.get_pool_ranks(i, ranking)[0],
+                                                        self.school_info.column(ranking))
         total_error /= (self.iterations * self.num_jobs)
 
         if not quiet:
@@ -79,9 +152,100 @@ class SimulationEngine:
             else:
                 print weights, '%.6f \t %.6f' % (total_error, total_error + penalty)
 
+        if key is not None:
+            self.cache[key] = total_error + penalty
         return total_error + penalty 
 
 
+    def cache_key(self, objective, ranking=None):
+        """ Key for the objective at the current weights (None if not caching) """ 
+        if self.cache is None:
+            return None
+        if self.fingerprint is None:
+            self.fingerprint = self.data_fingerprint()
+        weights = tuple(np.asarray(self.model.weights, dtype=float).tolist())
+        return (objective, weights, self.regularization, ranking, self.fingerprint)
+
+
+    def data_fingerprint(self):
+        """ Hash of everything besides the weights that determines the objectives:
+            the pools, hiring orders, simulation settings and sampler.  processes
+            and batch are left out: they don't change simulated errors (see simulate). """ 
+        digest = hashlib.md5()
+        sampler = SAMPLER if hasattr(self.model, 'prob_function_name') else 'simulate_hiring'
+        settings = (getattr(self.model, 'prob_function_name', self.model.__class__.__name__),
+                    getattr(self.model, 'power', None), self.iterations, sampler,
+                    self.crn_seed, sorted(self.model_args.items()))
+        digest.update(repr(settings))
+        for i in xrange(self.num_pools):
+            for column in sorted(CANDIDATE_COLUMNS.values()):
+                values = self.pool_features[i].get(column)
+                digest.update('-' if values is None else values.tostring())
+            digest.update(repr(list(self.job_pools[i])))
+            digest.update(np.asarray(self.job_ranks[i], dtype=float).tostring())
+            digest.update(repr([(f.phd(), f.first_asst_prof()) for f, rank in self.candidate_pools[i]]))
+            if self.hiring_orders is not None:
+                digest.update(np.asarray(self.hiring_orders[i]).tostring())
+                digest.update(np.asarray(self.hiring_log_probs[i], dtype=float).tostring())
+        return digest.hexdigest()
+
+
+    def random_stream(self, t, i):
+        """ Random stream for iteration t of pool i, for models simulated in
+            this process (the backend uses replicate_streams).  Fixed streams
+            under common random numbers, numpy's global one otherwise. """ 
+        if self.crn_seed is None:
+            return np.random
+        return np.random.RandomState([self.crn_seed, t, i])
+
+
+    def get_pool_ranks(self, i, ranking='pi'):
+        """ Return (actual, placed) rank arrays for pool i.
+            actual[c] is the rank of the place candidate c was actually hired,
+            placed[j] is the rank of position j.  Cached per ranking. """ 
+        if (i, ranking) not in self.pool_ranks:
+            self.pool_ranks[(i, ranking)] = (self.school_info.rank(self.actual_ids[i], ranking),
+                                             self.school_info.rank(self.job_ids[i], ranking))
+        return self.pool_ranks[(i, ranking)]
+
+
+    def get_region_codes(self, i):
+        """ Region code of each position in pool i (see job_region_codes), computed once """ 
+        if self.pool_region_codes[i] is None:
+            self.pool_region_codes[i] = job_region_codes(self.pool_features[i], self.job_pools[i], 
+                                                         self.school_info)
+        return self.pool_region_codes[i]
+
+
+    def get_backend(self):
+        """ Simulation backend, multi-process if processes != 1 (created on first use) """ 
+        if self.backend is None:
+            region_codes = [self.get_region_codes(i) for i in xrange(self.num_pools)]
+            self.backend = ParallelBackend(self.pool_features, self.job_ranks, region_codes, self.processes)
+        return self.backend
+
+
+    def simulate_parallel(self, ranking='pi', seed=None):
+        """ Run all iterations for all pools on the backend (see get_backend).
+            Returns the sum of squared placement errors over all replicates. """ 
+        if seed is None:
+            seed = np.random.randint(2**31 - 1)
+        power = self.model_args.get('power', self.model.power)
+        all_hired = self.get_backend().simulate(self.iterations, seed, self.model.prob_function_name,
+                                                self.model.weights, power, self.batch)
+        total_error = 0.
+        for i, hired in enumerate(all_hired):
+            actual, placed = self.get_pool_ranks(i, ranking)
+            total_error += np.sum((actual[hired] - placed)**2)
+        return total_error
+
+
+    def close(self):
+        """ Release worker processes, if any """ 
+        if self.backend is not None:
+            self.backend.close()
+
+
     def generate_network(self, weights=None, one_list=True):
         """ Generate a network (list of hires) using the 
             specified hiring model """ 
@@ -95,6 +259,7 @@ class SimulationEngine:
                                                     self.job_pools[i], 
                                                     self.job_ranks[i],
                                                     self.school_info,
+                                                    features=self.pool_features[i],
                                                     **self.model_args)
             if one_list:
                 all_hires += hires
@@ -104,112 +269,67 @@ class SimulationEngine:
         return all_hires
     
     
-    def calculate_neg_likelihood(self, weights=None):
+    def calculate_neg_likelihood(self, weights=None, verbose=True):
         """ Return the ***NEGATED*** likelihood of the model given the data (the hiring 
             and candidate pools). Negated because this is getting passed into a function
             minimizer, similar to the placement error calculation. 
+
+            Computed in log space (float64) and exponentiated at the end, so 
+            it underflows to -0.0 for datasets of any real size and is then a
+            constant.  It isn't offered as an optimizer objective (see
+            optimizer.OBJECTIVE_ARGS); minimize calculate_neg_log_likelihood,
+            which has the same minimizer.
         """
         if weights is not None:
             self.model.weights = weights
 
-        likelihood = np.float128(0.)
-        self.likelihoods[:] = 1.
+        key = self.cache_key('neg_likelihood')
+        if key is not None and key in self.cache:
+            return self.cache[key]
 
-        for i in xrange(self.num_pools):
-            F = np.zeros((self.pool_sizes[i], self.pool_sizes[i]), dtype=float)
-            for j, job in enumerate(self.job_pools[i]):
-                self.model.score_candidates(F[j,:], self.candidate_pools[i], job, 
-                                            self.job_ranks[i][j], self.school_info)
-
-            """ For each hiring sequence, calculate the likelihood, building up from the "final" hire.
-                That is, start with the last school to make a hire. There was only one candidate remaining
-                in the pool, so they chose them with probability 1. Go to the second-to-last. They chose 
-                from the last two candidates, and picked their hiring with probability equal to
-                    
-                    f(actual) / [f(actual) + f(not_hired)]. 
-
-                Build up this list until all hires have been accounted for. 
-            """
-            for j in xrange(self.num_orders):
-                available = [] 
-                for k in xrange(F.shape[0]):
-                    current = self.hiring_orders[i][j][-(k+1)]
-                    available.append(current)
-                    self.likelihoods[i,j] *= np.float128(F[current][current] / np.sum(F[current][available]))
-
-        for j in xrange(self.num_orders):
-            ri_term = np.float128(1e100) 
-            for i in xrange(self.num_pools):
-                ri_term *= np.float128(self.likelihoods[i,j] * 1e100) * np.float128(self.hiring_probs[i][j] * 1e100)
-            likelihood += ri_term
+        likelihood = np.exp(log_sum_exp(self.calculate_log_pr_y_ri()))
 
-        print weights, likelihood,'\t', likelihood
+        if verbose:
+            print weights, likelihood,'\t', likelihood
 
+        if key is not None:
+            self.cache[key] = -likelihood
         return -likelihood
 
 
-    def calculate_neg_log_likelihood(self, weights=None, verbose=True):
-        if weights is not None:
-            self.model.weights = weights
+    def pool_score_matrix(self, i):
+        """ F[j,c]: score of candidate c for job j in pool i (all candidates available) """ 
+        if hasattr(self.model, 'score_matrix'):
+            return self.model.score_matrix(self.candidate_pools[i], self.job_pools[i], self.job_ranks[i],
+                                           self.school_info, features=self.pool_features[i],
+                                           region_codes=self.get_region_codes(i))
 
-        log_likelihood = 0.0
+        F = np.zeros((self.pool_sizes[i], self.pool_sizes[i]), dtype=float)
+        for j, job in enumerate(self.job_pools[i]):
+            self.model.score_candidates(F[j,:], self.candidate_pools[i], job, 
+                                        self.job_ranks[i][j], self.school_info,
+                                        features=self.pool_features[i])
+        return F
 
-        # log(Pr(Y,Ri)) = log(Pr(Y|Ri)) + log(Pr(R))
-        self.log_pr_y_ri[:] = self.log_pr_ri
 
+    def calculate_log_pr_y_ri(self):
+        """ log(Pr(Y,Ri)) = log(Pr(Y|Ri)) + log(Pr(Ri)) for every hiring order Ri,
+            summed over pools. Stored in (and returned as) self.log_pr_y_ri. """ 
+        self.log_pr_y_ri[:] = self.log_pr_ri
         for i in xrange(self.num_pools):
-            F = np.zeros((self.pool_sizes[i], self.pool_sizes[i]), dtype=float)
-            # Precompute all F scores
-            for j, job in enumerate(self.job_pools[i]):
-                self.model.score_candidates(F[j,:], self.candidate_pools[i], job, 
-                                            self.job_ranks[i][j], self.school_info)
-
-            for j in xrange(self.num_orders):
-                available = [] 
-                for k in xrange(F.shape[0]):
-                    current = self.hiring_orders[i][j][-(k+1)]
-                    available.append(current)
-                    self.log_pr_y_ri[j] += np.log(F[current][current] / np.sum(F[current][available])) 
-
-        # log of sum trick
-        log_likelihood = self.log_pr_y_ri[0] + np.log(np.sum(np.exp(self.log_pr_y_ri - self.log_pr_y_ri[0])))
-
-        if self.regularization > 0.:
-            penalty = np.dot(self.model.weights[1:], self.model.weights[1:]) * self.regularization  # L2
-        else:
-            penalty = 0.0
-      
-        if verbose:
-            print weights, -log_likelihood + penalty, '\t', -log_likelihood + penalty
-
-        return -log_likelihood + penalty
+            self.log_pr_y_ri += order_log_likelihoods(self.pool_score_matrix(i), self.hiring_orders[i])
+        return self.log_pr_y_ri
 
 
-    def calculate_regvec_neg_log_likelihood(self, weights=None, verbose=True):
+    def calculate_neg_log_likelihood(self, weights=None, verbose=True):
         if weights is not None:
             self.model.weights = weights
 
-        log_likelihood = 0.0
-
-        # log(Pr(Y,Ri)) = log(Pr(Y|Ri)) + log(Pr(R))
-        self.log_pr_y_ri[:] = self.log_pr_ri
+        key = self.cache_key('neg_log_likelihood')
+        if key is not None and key in self.cache:
+            return self.cache[key]
 
-        for i in xrange(self.num_pools):
-            F = np.zeros((self.pool_sizes[i], self.pool_sizes[i]), dtype=float)
-            # Precompute all F scores
-            for j, job in enumerate(self.job_pools[i]):
-                self.model.score_candidates(F[j,:], self.candidate_pools[i], job, 
-                                            self.job_ranks[i][j], self.school_info)
-
-            for j in xrange(self.num_orders):
-                available = [] 
-                for k in xrange(F.shape[0]):
-                    current = self.hiring_orders[i][j][-(k+1)]
-                    available.append(current)
-                    self.log_pr_y_ri[j] += np.log(F[current][current] / np.sum(F[current][available])) 
-
-        # log of sum trick
-        log_likelihood = self.log_pr_y_ri[0] + np.log(np.sum(np.exp(self.log_pr_y_ri - self.log_pr_y_ri[0])))
+        log_likelihood = log_sum_exp(self.calculate_log_pr_y_ri())
 
         if self.regularization > 0.:
             penalty = np.dot(self.model.weights[1:], self.model.weights[1:]) * self.regularization  # L2
@@ -219,42 +339,174 @@ class SimulationEngine:
         if verbose:
             print weights, -log_likelihood + penalty, '\t', -log_likelihood + penalty
 
+        if key is not None:
+            self.cache[key] = -log_likelihood + penalty
         return -log_likelihood + penalty
 
 
-    def calculate_self_hiring_rate(self, weights=None, verbose=True):
+    def calculate_neg_log_likelihood_batch(self, weights, verbose=False):
+        """ calculate_neg_log_likelihood (plus L2 penalty) for every row of a
+            stack of weight vectors, as an array.  Each pool's design columns
+            are built once for all rows, and the hiring-order kernel and the
+            log-sum-exp over orders run on all rows at once, MAX_ORDER_BLOCK
+            scores' worth of rows at a time.  The model's weights are not changed. """ 
+        weights = np.atleast_2d(np.asarray(weights, dtype=float))
+        if not hasattr(self.model, 'score_matrix_batch'):
+            return np.array([self.calculate_neg_log_likelihood(w, verbose) for w in weights])
+
+        largest = max(len(self.job_pools[i]) * len(self.candidate_pools[i]) for i in xrange(self.num_pools))
+        rows = max(1, MAX_ORDER_BLOCK // max(1, largest))
+        values = np.empty(len(weights), dtype=float)
+        for start in xrange(0, len(weights), rows):
+            W = weights[start:start+rows]
+            log_pr_y_ri = np.tile(self.log_pr_ri, (len(W), 1))
+            for i in xrange(self.num_pools):
+                F = self.model.score_matrix_batch(self.candidate_pools[i], self.job_pools[i], 
+                                                  self.job_ranks[i], self.school_info, W,
+                                                  features=self.pool_features[i], 
+                                                  region_codes=self.get_region_codes(i))
+                log_pr_y_ri += order_log_likelihoods(F, self.hiring_orders[i])
+            values[start:start+rows] = -log_sum_exp(log_pr_y_ri, axis=1)
+
+        if self.regularization > 0.:
+            values += np.sum(weights[:,1:]**2, axis=1) * self.regularization  # L2
+
+        if verbose:
+            for w, value in zip(weights, values):
+                print w, value, '\t', value
+        return values
+
+
+    def calculate_neg_log_likelihood_and_gradient(self, weights=None, verbose=True):
+        """ Negated log-likelihood (plus L2 penalty) and its exact gradient
+            with respect to the weights.  Returns (value, gradient), which 
+            can be handed to scipy.optimize.minimize with jac=True. """ 
         if weights is not None:
             self.model.weights = weights
+        weights = np.asarray(self.model.weights, dtype=float)
 
-        log_likelihood = 0.0
-
-        # log(Pr(Y,Ri)) = log(Pr(Y|Ri)) + log(Pr(R))
-        self.log_pr_y_ri[:] = self.log_pr_ri
+        key = self.cache_key('neg_log_likelihood_and_gradient')
+        if key is not None and key in self.cache:
+            value, gradient = self.cache[key]
+            return value, gradient.copy()
 
+        log_pr_y_ri = np.array(self.log_pr_ri, dtype=float)
+        order_gradients = np.zeros((self.num_orders, len(weights)), dtype=float)
         for i in xrange(self.num_pools):
-            F = np.zeros((self.pool_sizes[i], self.pool_sizes[i]), dtype=float)
-            # Precompute all F scores
-            for j, job in enumerate(self.job_pools[i]):
-                self.model.score_candidates(F[j,:], self.candidate_pools[i], job, 
-                                            self.job_ranks[i][j], self.school_info)
-
-            for j in xrange(self.num_orders):
-                available = [] 
-                for k in xrange(F.shape[0]):
-                    current = self.hiring_orders[i][j][-(k+1)]
-                    available.append(current)
-                    self.log_pr_y_ri[j] += np.log(F[current][current] / np.sum(F[current][available])) 
-
-        # log of sum trick
-        log_likelihood = self.log_pr_y_ri[0] + np.log(np.sum(np.exp(self.log_pr_y_ri - self.log_pr_y_ri[0])))
-
+            F, dF = self.model.score_matrix_gradients(self.candidate_pools[i], self.job_pools[i], 
+                                                      self.job_ranks[i], self.school_info,
+                                                      features=self.pool_features[i],
+                                                      region_codes=self.get_region_codes(i))
+            log_likelihoods, gradients = order_log_likelihoods(F, self.hiring_orders[i], dF)
+            log_pr_y_ri += log_likelihoods
+            order_gradients += gradients
+
+        # Each order's gradient is weighted by its posterior share
+        log_likelihood = log_sum_exp(log_pr_y_ri)
+        gradient = -np.dot(np.exp(log_pr_y_ri - log_likelihood), order_gradients)
+
+        penalty = 0.0
         if self.regularization > 0.:
-            penalty = np.dot(self.model.weights[1:], self.model.weights[1:]) * self.regularization  # L2
-        else:
-            penalty = 0.0
-      
+            penalty = np.dot(weights[1:], weights[1:]) * self.regularization  # L2
+            gradient[1:] += 2. * self.regularization * weights[1:]
+
         if verbose:
             print weights, -log_likelihood + penalty, '\t', -log_likelihood + penalty
 
-        return -log_likelihood + penalty
+        if key is not None:
+            self.cache[key] = (-log_likelihood + penalty, gradient.copy())
+        return -log_likelihood + penalty, gradient
 
+
+    def calculate_regvec_neg_log_likelihood(self, weights=None, verbose=True):
+        return self.calculate_neg_log_likelihood(weights, verbose)
+
+
+    def calculate_self_hiring_rate(self, weights=None, verbose=True):
+        return self.calculate_neg_log_likelihood(weights, verbose)
+
+
+def log_sum_exp(x, axis=None):
+    """ log(sum(exp(x))) without overflow/underflow (log of sum trick).
+        With `axis', reduces a batch of rows (e.g., one row per weight vector) at once. """ 
+    x = np.asarray(x, dtype=float)
+    top = np.max(x, axis=axis, keepdims=True)
+    top[~np.isfinite(top)] = 0.
+    with np.errstate(divide='ignore'):
+        result = np.log(np.sum(np.exp(x - top), axis=axis, keepdims=True)) + top
+    if axis is None:
+        return result.item()
+    return np.squeeze(result, axis=axis)
+
+
+# Largest (orders x n) block of running sums kept at once by order_log_likelihoods
+MAX_ORDER_BLOCK = 2**22
+
+
+def order_log_likelihoods(F, orders, dF=None):
+    """ log(Pr(Y|Ri)) of one pool for each hiring order Ri.
+
+        F is the (num_jobs x num_candidates) score matrix, where candidate k
+        was actually hired into job k.  orders is a (num_orders x num_jobs)
+        array; orders[r] lists jobs in the order they were filled.  Working
+        back from the last hire, the job filled at step s chose its hire from
+        the candidates hired at steps s, s+1, ..., n-1, so
+
+            log(Pr(Y|Ri)) = sum_s log(F[p_s, p_s] / sum_{t >= s} F[p_s, p_t])
+
+        with p = orders[r].  The denominators are built from the last hire
+        back (see suffix_sums), for a block of orders at a time, in O(n)
+        memory per order.
+
+        F may also be a stack of score matrices (e.g., one per weight vector,
+        see calculate_neg_log_likelihood_batch); the log-likelihoods are
+        then a (num_matrices x num_orders) array.
+
+        If dF (a list of dF/dw_k matrices) is given, the gradient of each
+        order's log-likelihood is returned as well, as a (num_orders x K)
+        array:
+
+            sum_s dF_k[p_s, p_s] / F[p_s, p_s] - 
+                  sum_{t >= s} dF_k[p_s, p_t] / sum_{t >= s} F[p_s, p_t]
+    """ 
+    orders = np.asarray(orders, dtype=int)
+    num_orders, n = orders.shape
+    stack = F.shape[:-2]
+    diag = np.diagonal(F, axis1=-2, axis2=-1)
+    block = max(1, MAX_ORDER_BLOCK // max(1, n * int(np.prod(stack))))
+    log_likelihoods = np.empty(stack + (num_orders,), dtype=float)
+    if dF is not None:
+        gradients = np.empty((num_orders, len(dF)), dtype=float)
+
+    for start in xrange(0, num_orders, block):
+        p = orders[start:start+block]
+        denominators = suffix_sums(F, p)
+        log_likelihoods[...,start:start+block] = np.sum(np.log(diag[...,p] / denominators), axis=-1)
+
+        if dF is not None:
+            for k, D in enumerate(dF):
+                numerators = suffix_sums(D, p)
+                gradients[start:start+block, k] = np.sum(np.diagonal(D)[p] / diag[p] - 
+                                                         numerators / denominators, axis=1)
+
+    if dF is not None:
+        return log_likelihoods, gradients
+    return log_likelihoods
+
+
+def suffix_sums(F, p):
+    """ sum_{t >= s} F[p_s, p_t] for every order p[r], as an (r x s) array
+        (with F's leading dimensions, if F is a stack of matrices).
+        Going back from the last step, each job's running sum over the
+        candidates hired so far gains one column of F per step, so only an
+        (r x num_jobs) array is kept and nothing is subtracted (no cancellation). """ 
+    num_orders, n = p.shape
+    stack = F.shape[:-2]
+    columns = np.ascontiguousarray(np.swapaxes(F, -1, -2))
+    running = np.zeros(stack + (num_orders, F.shape[-2]), dtype=float)
+    sums = np.empty(stack + (num_orders, n), dtype=float)
+    r = np.arange(num_orders)
+    for s in xrange(n - 1, -1, -1):
+        running += columns[...,p[:,s],:]
+        sums[...,s] = running[...,r,p[:,s]]
+    return sums
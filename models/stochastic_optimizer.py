@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Noise-aware stochastic optimization of the simulated placement error.
+
+    SimulationEngine.simulate is a Monte Carlo estimate; SPSA (simultaneous
+    perturbation stochastic approximation) is built for such objectives.  Each
+    step estimates the gradient from the error at two points, w +/- c*delta,
+    for a random direction delta of +/-1's, whatever the number of weights.
+
+    A replicate is one simulate() call (engine.iterations Monte Carlo
+    iterations) on its own random stream, i.e., with its own crn_seed.  Both
+    points of a step share their streams (common random numbers), so most of
+    the noise cancels in their difference.  Replicates are added, doubling,
+    only until the difference is clearly nonzero (|mean| > z * standard error):
+    far from the optimum, where differences are large, a couple of replicates
+    do; near it, more are spent.
+
+    The estimate is the average of the last iterates (Polyak-Ruppert
+    averaging), which is much less noisy than the last iterate.  It is
+    returned with a confidence interval for its error, from final_replicates
+    more replicates, and bounds for each weight from batch means of the
+    averaged iterates.
+
+    Example:
+        >>> engine = SimulationEngine(..., iters=10, batch=True)
+        >>> spsa = SPSA(engine, seed=0)
+        >>> result = spsa.minimize(w0, maxiter=200)
+        >>> spsa.close()
+        >>> print result['weights'], result['value'], (result['value_low'], result['value_high'])
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.stats import t as t_distribution
+
+
+class SPSA:
+    def __init__(self, engine, step=1., perturbation=1., alpha=0.602, gamma=0.101, stability=None,
+                 min_replicates=2, max_replicates=32, z=2., final_replicates=30, level=0.95,
+                 average=0.5, batches=5, seed=None, log=None, fields=None):
+        """ step: length of the first step (it sets the gain a); perturbation: c,
+            the size of the first perturbations; alpha, gamma: decay of the
+            gains, a_k = a / (k + 1 + stability)^alpha and c_k = c / (k + 1)^gamma
+            (stability defaults to 10% of maxiter).  The last `average'
+            fraction of iterates is averaged, in `batches' batches for bounds.
+            With a RunLog, every error estimate is logged as an 'eval' record
+            (with the extra fields of the fields dictionary and its number
+            of replicates). """
+        self.engine = engine.subset(xrange(engine.num_pools))  # Own view, to vary crn_seed (close() it)
+        self.engine.cache = None
+        self.step = step
+        self.perturbation = perturbation
+        self.alpha = alpha
+        self.gamma = gamma
+        self.stability = stability
+        self.min_replicates = min_replicates
+        self.max_replicates = max_replicates
+        self.z = z
+        self.final_replicates = final_replicates
+        self.level = level
+        self.average = average
+        self.batches = batches
+        self.rng = np.random.RandomState(seed)
+        self.log = log
+        self.fields = fields or {}
+        self.replicates = 0  # simulate() calls so far
+
+
+    def close(self):
+        """ Release the worker processes of the engine view, if any """
+        self.engine.close()
+
+
+    def seeds(self, n):
+        """ n fresh random stream seeds """
+        return self.rng.randint(2**31 - 1, size=n)
+
+
+    def errors(self, weights, seeds):
+        """ Error at weights for every replicate (random stream seed) """
+        values = np.empty(len(seeds))
+        for r, seed in enumerate(seeds):
+            self.engine.crn_seed = int(seed)
+            values[r] = self.engine.simulate(weights=np.array(weights, dtype=float), quiet=True)
+        self.replicates += len(seeds)
+        if self.log is not None:
+            self.log.append(dict(self.fields, type='eval', objective='simulate', replicates=len(seeds),
+                                 weights=np.array(weights, dtype=float), value=float(values.mean())))
+        return values
+
+
+    def gradient(self, weights, c):
+        """ SPSA gradient estimate at weights with perturbation size c.
+            Returns (gradient, replicates used per point). """
+        delta = self.rng.randint(2, size=len(weights)) * 2. - 1.
+        diffs = np.zeros(0)
+        n = self.min_replicates
+        while True:
+            seeds = self.seeds(n - len(diffs))
+            diffs = np.concatenate([diffs, self.errors(weights + c * delta, seeds) -
+                                           self.errors(weights - c * delta, seeds)])
+            mean, se = diffs.mean(), diffs.std(ddof=1) / np.sqrt(len(diffs))
+            if len(diffs) >= self.max_replicates or abs(mean) > self.z * se:
+                break
+            n = min(2 * n, self.max_replicates)
+        return mean / (2. * c * delta), len(diffs)
+
+
+    def minimize(self, w0, maxiter=100):
+        """ Run maxiter SPSA steps from w0.  Returns a Series: the weights,
+            their error (value) with a confidence interval (value_low,
+            value_high), per-weight bounds (weights_low, weights_high), the
+            replicates used by each step and the total number of simulate() calls. """
+        weights = np.array(w0, dtype=float)
+        stability = 0.1 * maxiter if self.stability is None else self.stability
+        a = None
+        iterates, replicates = [], []
+        for k in xrange(maxiter):
+            c = self.perturbation / (k + 1.)**self.gamma
+            gradient, n = self.gradient(weights, c)
+            if a is None:  # First step has length ~ step (per weight)
+                scale = np.mean(np.abs(gradient))
+                a = self.step * (stability + 1.)**self.alpha / scale if scale > 0 else self.step
+            weights = weights - a / (k + 1. + stability)**self.alpha * gradient
+            iterates.append(weights.copy())
+            replicates.append(n)
+
+        iterates = np.array(iterates).reshape(-1, len(weights))
+        tail = iterates[int(len(iterates) * (1. - self.average)):] if len(iterates) else weights[None, :]
+        averaged = tail.mean(axis=0)
+        weights_low, weights_high = averaged.copy(), averaged.copy()
+        if len(tail) >= self.batches > 1:
+            batch_means = np.array([b.mean(axis=0) for b in np.array_split(tail, self.batches)])
+            half_width = t_distribution.ppf(0.5 + self.level / 2., self.batches - 1) * \
+                         batch_means.std(axis=0, ddof=1) / np.sqrt(self.batches)
+            weights_low, weights_high = averaged - half_width, averaged + half_width
+
+        values = self.errors(averaged, self.seeds(self.final_replicates))
+        value = values.mean()
+        half_width = t_distribution.ppf(0.5 + self.level / 2., len(values) - 1) * \
+                     values.std(ddof=1) / np.sqrt(len(values)) if len(values) > 1 else 0.
+        return pd.Series({'weights': averaged, 'value': value,
+                          'value_low': value - half_width, 'value_high': value + half_width,
+                          'weights_low': weights_low, 'weights_high': weights_high,
+                          'step_replicates': np.array(replicates),
+                          'evaluations': self.replicates, 'iterations': maxiter})
+
+
+def spsa_search(engine, w0, options=None, log=None, **fields):
+    """ SPSA as a local_search method.  options holds maxiter and any SPSA
+        settings.  Returns (weights, value, evaluations, success, message). """
+    options = dict(options or {})
+    maxiter = options.pop('maxiter', 100)
+    spsa = SPSA(engine, log=log, fields=fields, **options)
+    try:
+        result = spsa.minimize(w0, maxiter)
+    finally:
+        spsa.close()
+    message = '%.6g in [%.6g, %.6g]' % (result['value'], result['value_low'], result['value_high'])
+    return result['weights'], float(result['value']), result['evaluations'], True, message
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for cross-validation over years. """
+
+from faculty_hiring.models.cross_validation import cross_validate, year_folds, held_out_fold, summarize
+from faculty_hiring.models.optimizer import uniform_starts
+from faculty_hiring.models.simulation_engine import SimulationEngine
+from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.models.tests.test_simulation_engine import get_test_institutions, get_test_pools
+from faculty_hiring.misc.hiring_orders import prepare_hiring_orders
+from unittest import TestCase, main
+import numpy as np
+
+
+class tests(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.inst = get_test_institutions()
+        self.pools = get_test_pools(self.inst, num_pools=6, pool_size=8)
+        self.orders, self.log_probs = prepare_hiring_orders(self.pools[1], self.pools[2], 4)
+        self.model = SigmoidModel(prob_function='rd_pr')
+        self.engine = SimulationEngine(*(self.pools + (self.inst, self.model)), reg=0.01,
+                                       hiring_orders=self.orders, hiring_log_probs=self.log_probs)
+
+    def test_folds(self):
+        years = np.arange(1970, 1981)
+        folds = year_folds(years, 3)
+        self.assertEqual([list(fold) for fold in folds], [range(0, 4), range(4, 8), range(8, 11)])
+        shuffled = year_folds(years, 4, shuffle=True, rng=np.random.RandomState(0))
+        self.assertEqual(sorted(np.concatenate(shuffled)), range(11))
+        self.assertEqual(list(held_out_fold(years, [1972, 1980, 1990])[0]), [2, 10])
+
+    def test_subset(self):
+        w = np.array([0.5, 2., -0.3])
+        pools = [4, 1, 2]
+        subset = self.engine.subset(pools, reg=0.)
+        fresh = SimulationEngine([self.pools[0][i] for i in pools], [self.pools[1][i] for i in pools],
+                                 [self.pools[2][i] for i in pools], self.inst, self.model,
+                                 hiring_orders=[self.orders[i] for i in pools], 
+                                 hiring_log_probs=[self.log_probs[i] for i in pools])
+        self.assertAlmostEqual(subset.calculate_neg_log_likelihood(w, verbose=False),
+                               fresh.calculate_neg_log_likelihood(w, verbose=False))
+        self.assertEqual(subset.num_jobs, fresh.num_jobs)
+        self.assertEqual(self.engine.num_pools, 6)  # The original is untouched
+        self.assertEqual(self.engine.regularization, 0.01)
+
+    def test_cross_validate(self):
+        folds = year_folds(range(6), 3)
+        starts = uniform_starts(4, self.model.num_weights(), -3., 3., np.random.RandomState(2))
+        tables = [cross_validate(self.engine, folds, starts, processes, range(1990, 1996), 
+                                 objective='calculate_neg_log_likelihood', options={'maxiter': 100})
+                  for processes in (1, 3)]
+        results = tables[0]
+        self.assertEqual(list(results['test_years']), [[1990, 1991], [1992, 1993], [1994, 1995]])
+        self.assertTrue(np.allclose(results['test_error'], tables[1]['test_error']))
+        for k, fold in enumerate(folds):
+            test = self.engine.subset(fold, reg=0.)
+            self.assertAlmostEqual(results['test_error'][k], 
+                                   test.calculate_neg_log_likelihood(results['weights'][k], verbose=False))
+        summary = summarize(results)
+        self.assertAlmostEqual(summary['test_error'], results['test_error'].mean())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for the multi-start optimizer. """
+
+from faculty_hiring.models.optimizer import MultiStartOptimizer, uniform_starts, evaluate, local_search
+from faculty_hiring.models.simulation_engine import SimulationEngine
+from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.models.tests.test_simulation_engine import get_test_institutions, get_test_pools
+from faculty_hiring.misc.hiring_orders import prepare_hiring_orders
+from faculty_hiring.misc.run_log import RunLog
+from unittest import TestCase, main
+import numpy as np
+import tempfile
+import os
+
+
+class tests(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        inst = get_test_institutions()
+        candidate_pools, job_pools, job_ranks = get_test_pools(inst)
+        orders, log_probs = prepare_hiring_orders(job_pools, job_ranks, 4)
+        self.model = SigmoidModel(prob_function='rd_pr')
+        self.engine = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, self.model, reg=0.01,
+                                       hiring_orders=orders, hiring_log_probs=log_probs)
+        self.starts = uniform_starts(6, self.model.num_weights(), -5., 5., np.random.RandomState(1))
+
+    def test_multi_start(self):
+        tables = []
+        for processes in (1, 2):
+            optimizer = MultiStartOptimizer(self.engine, 'calculate_neg_log_likelihood_and_gradient',
+                                            processes=processes, method='L-BFGS-B')
+            tables.append(optimizer.run(self.starts, num_local=3))
+            optimizer.close()
+
+        results = tables[0]
+        self.assertEqual(len(results), 9)
+        self.assertEqual(sorted(results['stage']), ['local']*3 + ['start']*6)
+        self.assertTrue(np.all(np.diff(results['value']) >= 0))
+
+        starts = results[results['stage'] == 'start'].set_index('start')['value']
+        local = results[results['stage'] == 'local']
+        self.assertEqual(sorted(local['start']), sorted(starts.sort_values().index[:3]))
+        for k, row in local.iterrows():
+            self.assertTrue(row['value'] <= starts[row['start']])
+            self.assertAlmostEqual(row['value'], evaluate(self.engine, 'calculate_neg_log_likelihood',
+                                                          row['weights']))
+
+        # Deterministic objective: same table with or without workers
+        self.assertTrue(np.allclose(tables[0]['value'], tables[1]['value']))
+        self.assertEqual(list(tables[0]['start']), list(tables[1]['start']))
+
+    def test_batch_screen(self):
+        log = RunLog(tempfile.mktemp())
+        try:
+            optimizer = MultiStartOptimizer(self.engine, 'calculate_neg_log_likelihood', log=log)
+            values = optimizer.screen(self.starts, [4, 1, 2])
+            for k, value in zip([4, 1, 2], values):
+                self.assertAlmostEqual(value, evaluate(self.engine, 'calculate_neg_log_likelihood', 
+                                                       self.starts[k]))
+            self.assertEqual([r['start'] for r in log.query('eval', stage='start')], [4, 1, 2])
+        finally:
+            os.remove(log.filename)
+        self.assertRaises(ValueError, evaluate, self.engine, 'calculate_neg_likelihood', self.starts[0])
+
+    def test_resume(self):
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(filename)
+        objective = 'calculate_neg_log_likelihood'
+        try:
+            # Interrupted run: two starts screened and part of a local search done
+            log = RunLog(filename)
+            optimizer = MultiStartOptimizer(self.engine, objective, log=log, options={'maxiter': 200})
+            optimizer.resume(self.starts)
+            optimizer.screen(self.starts, [0, 1])
+            local_search(self.engine, objective, self.starts[1], options={'maxiter': 5}, log=log, 
+                         stage='local', start=1)  # Killed before its 'local' record
+            num_evals = len(log.query('eval'))
+            log.close()
+
+            log = RunLog(filename)
+            self.assertEqual(len(log.query('eval', stage='start')), 2)
+            optimizer = MultiStartOptimizer(self.engine, objective, log=log, options={'maxiter': 200})
+            results = optimizer.run(self.starts + 1., num_local=2)  # Logged starts win
+            self.assertEqual(len(log.query('eval', stage='start')), 6)  # Only the rest were screened
+            self.assertEqual(len(log.query('local')), 2)
+            starts = results[results['stage'] == 'start'].sort_values('start')
+            self.assertTrue(np.allclose(np.vstack(starts['weights']), self.starts))
+
+            best = RunLog(filename, readonly=True).best(1)[0]
+            self.assertAlmostEqual(best['value'], results['value'][0])
+            self.assertTrue(len(log.query('eval')) > num_evals)
+            log.close()
+
+            # Any other setting, model or shape of starts can't resume the run
+            other = SimulationEngine(self.engine.candidate_pools, self.engine.job_pools, self.engine.job_ranks,
+                                     self.engine.school_info, SigmoidModel(prob_function='rd'))
+            for engine, objective, options, tol, starts in [
+                    (self.engine, 'simulate', {'maxiter': 200}, None, self.starts),
+                    (self.engine, objective, {'maxiter': 5}, None, self.starts),
+                    (self.engine, objective, {'maxiter': 200}, 1e-3, self.starts),
+                    (self.engine, objective, {'maxiter': 200}, None, self.starts[:,:2]),
+                    (other, objective, {'maxiter': 200}, None, self.starts)]:
+                optimizer = MultiStartOptimizer(engine, objective, log=RunLog(filename, readonly=True),
+                                                options=options, tol=tol)
+                self.assertRaises(ValueError, optimizer.run, starts)
+        finally:
+            os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for the regularization path solver. """
+
+from faculty_hiring.models.regularization_path import RegularizationPath, reg_grid, path_weights
+from faculty_hiring.models.optimizer import local_search
+from faculty_hiring.models.simulation_engine import SimulationEngine
+from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.models.tests.test_simulation_engine import get_test_institutions, get_test_pools
+from faculty_hiring.misc.hiring_orders import prepare_hiring_orders
+from unittest import TestCase, main
+import numpy as np
+
+
+class tests(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.inst = get_test_institutions()
+        self.pools = get_test_pools(self.inst)
+        self.orders, self.log_probs = prepare_hiring_orders(self.pools[1], self.pools[2], 4)
+        self.model = SigmoidModel(prob_function='rd_pr')
+
+    def get_engine(self, reg):
+        return SimulationEngine(*(self.pools + (self.inst, self.model)), reg=reg, 
+                                hiring_orders=self.orders, hiring_log_probs=self.log_probs)
+
+    def test_grid(self):
+        regs = reg_grid(0.01, 10., 4)
+        self.assertTrue(np.allclose(regs, [10., 1., 0.1, 0.01]))
+
+    def test_path(self):
+        objective = 'calculate_neg_log_likelihood_and_gradient'
+        engine = self.get_engine(0.)
+        path = RegularizationPath(engine, objective, method='BFGS', options={'gtol': 1e-8})
+        results = path.solve([0.01, 1., 0.1, 10.], test_engine=engine, test_objective='calculate_neg_log_likelihood')
+        self.assertEqual(list(results['reg']), [10., 1., 0.1, 0.01])
+        self.assertEqual(engine.regularization, 0.)
+        W = path_weights(results)
+        self.assertEqual(W.shape, (4, self.model.num_weights()))
+
+        # Weaker regularization, larger (penalized) weights and better fit
+        norms = np.sum(W[:,1:]**2, axis=1)
+        self.assertTrue(np.all(np.diff(norms) > 0))
+        self.assertTrue(np.all(np.diff(results['data_value']) < 1e-8))
+        self.assertTrue(np.allclose(results['data_value'], results['test_value']))
+
+        # Same optima as cold-started fits with the regularized engines (the
+        # unpenalized first weight is left out: the likelihood is flat along it here)
+        for k, reg in enumerate(results['reg']):
+            weights, value = local_search(self.get_engine(reg), objective, np.zeros(self.model.num_weights()),
+                                          method='BFGS', options={'gtol': 1e-8})[:2]
+            self.assertAlmostEqual(results['value'][k], value, places=5)
+            self.assertTrue(np.allclose(W[k,1:], weights[1:], atol=1e-4))
+
+    def test_reuse(self):
+        path = RegularizationPath(self.get_engine(0.), 'calculate_neg_log_likelihood',
+                                  options={'maxiter': 200})
+        first = path.solve([1.])
+        cache = path.engine.cache
+        misses = cache.misses
+        second = path.solve([1.])  # Same fit again: nothing new to evaluate
+        self.assertEqual(cache.misses, misses)
+        self.assertTrue(np.allclose(first['weights'][0], second['weights'][0]))
+
+
+if __name__ == '__main__':
+    main()
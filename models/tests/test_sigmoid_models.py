@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for the sigmoid hiring models. """
+
+from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.models.sigmoid_prob_functions import CandidateFeatures, prob_functions, default_weights
+from faculty_hiring.misc.util import Struct
+from scipy.special import expit as sigmoid
+from unittest import TestCase, main
+import numpy as np
+
+
+def get_test_candidates():
+    """ Five candidates as (profile, phd_rank) tuples """ 
+    return [(Struct(dblp_z=0.5, has_postdoc=True, is_female=False, phd_region='West'), 1.0),
+            (Struct(dblp_z=-1.0, has_postdoc=False, is_female=True, phd_region='Northeast'), 0.8),
+            (Struct(dblp_z=2.0, has_postdoc=False, is_female=False, phd_region='West'), 0.5),
+            (Struct(dblp_z=0.0, has_postdoc=True, is_female=True, phd_region='South'), 0.3),
+            (Struct(dblp_z=1.5, has_postdoc=False, is_female=False, phd_region='Northeast'), 0.1)]
+
+
+def get_test_school_info():
+    return {'Stanford University': {'Region': 'West', 'pi': 1.0},
+            'MIT': {'Region': 'Northeast', 'pi': 2.0},
+            'UNKNOWN': {'Region': 'Earth', 'pi': 3.0}}
+
+
+def loop_prob_all(candidates, cand_available, inst, inst_rank, school_info, weights):
+    """ Reference (one candidate at a time) version of the `all' function """ 
+    job_region = school_info[inst]['Region']
+    cand_p = np.zeros(len(candidates), dtype=float)
+    for i, (candidate, candidate_rank) in enumerate(candidates):
+        if cand_available[i]:
+            cand_p[i] = sigmoid(np.dot(weights, [1, 
+                                                 inst_rank-candidate_rank,
+                                                 inst_rank,
+                                                 int(candidate.has_postdoc),
+                                                 candidate.dblp_z,
+                                                 int(job_region == candidate.phd_region),
+                                                 int(candidate.is_female)]))
+    return cand_p
+
+
+class tests(TestCase):
+    def setUp(self):
+        self.candidates = get_test_candidates()
+        self.school_info = get_test_school_info()
+
+    def test_features(self):
+        features = CandidateFeatures(self.candidates)
+        self.assertEqual(features.size, 5)
+        self.assertEqual(list(features['rank']), [1.0, 0.8, 0.5, 0.3, 0.1])
+        self.assertEqual(list(features['has_postdoc']), [1., 0., 0., 1., 0.])
+        self.assertEqual(features.region_code('West'), features.region[2])
+        self.assertEqual(features.region_code('Earth'), -1)
+
+    def test_missing_attribute(self):
+        candidates = [(Struct(has_postdoc=True, is_female=False, phd_region='West'), 1.0),
+                      (Struct(has_postdoc=False, is_female=True, phd_region='South'), 0.5)]
+        features = CandidateFeatures(candidates)
+        self.assertEqual(list(features.matrix(('pd',))[:,0]), [1., 0.])  # Models not using dblp_z still work
+        self.assertRaises(AttributeError, features.matrix, ('pr',))
+        self.assertEqual(features.get('dblp_z'), None)
+
+    def test_vectorized_scores(self):
+        weights = np.array([0.1, -2., 0.5, 1., 0.3, 0.7, -0.4])
+        available = np.array([True, False, True, True, False])
+        features = CandidateFeatures(self.candidates)
+        for inst in self.school_info:
+            expected = loop_prob_all(self.candidates, available, inst, 0.6, self.school_info, weights)
+            actual = prob_functions['all'](self.candidates, available, inst, 0.6, self.school_info,
+                                           weights, features=features)
+            self.assertTrue(np.allclose(expected, actual))
+
+    def test_step(self):
+        available = np.array([True, True, False, True, True])
+        cand_p = prob_functions['step'](self.candidates, available, 'MIT', 0.5, self.school_info, [])
+        self.assertEqual(list(cand_p), [1., 1., 1., 1e-9, 1e-9])
+
+    def test_simulate_hiring(self):
+        positions = ['MIT', 'Stanford University', 'MIT', 'UNKNOWN', 'MIT']
+        position_ranks = [0.9, 1.0, 0.7, 0.2, 0.4]
+        for name in prob_functions:
+            if name.startswith('step'):
+                continue
+            model = SigmoidModel(prob_function=name)
+            hires = model.simulate_hiring(self.candidates, positions, position_ranks, self.school_info)
+            self.assertEqual(len(hires), len(positions))
+            self.assertEqual(len(set(id(f) for f, place in hires)), len(self.candidates))
+            self.assertEqual(sorted(place for f, place in hires), sorted(positions))
+            self.assertEqual(model.num_weights(), len(default_weights[name]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for the simulation engine. """
+
+from faculty_hiring.models import simulation_engine
+from faculty_hiring.models.simulation_engine import SimulationEngine, order_log_likelihoods, log_sum_exp
+from faculty_hiring.models.parallel_engine import ParallelBackend
+from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.misc.hiring_orders import prepare_hiring_orders
+from faculty_hiring.misc.util import Struct
+from faculty_hiring.misc.objective_cache import ObjectiveCache
+from unittest import TestCase, main
+import numpy as np
+
+
+REGIONS = ['West', 'Northeast', 'South', 'Midwest']
+
+
+class test_record(Struct):
+    """ Just enough of a faculty record for the models and scoring """ 
+    def phd(self):
+        return self.phd_location, 1990
+
+    def first_asst_prof(self):
+        return self.first_asst_job_location, 1995
+
+
+def get_test_institutions(num_schools=20):
+    inst = {}
+    for k in xrange(num_schools):
+        inst['U%d' % k] = {'pi': k + 1., 'pi_rescaled': 1. - k / (num_schools + 1.), 
+                           'Region': REGIONS[k % len(REGIONS)]}
+    inst['UNKNOWN'] = {'pi': float(num_schools), 'pi_rescaled': 1. / (num_schools + 1.), 'Region': 'Earth'}
+    return inst
+
+
+def get_test_pools(inst, num_pools=3, pool_size=12, seed=0):
+    """ Random candidate/job pools drawn from the test institutions """
+    rs = np.random.RandomState(seed)
+    schools = sorted(s for s in inst if s != 'UNKNOWN')
+    candidate_pools, job_pools, job_ranks = [], [], []
+    for i in xrange(num_pools):
+        candidates, jobs, ranks = [], [], []
+        for k in xrange(pool_size):
+            phd, job = schools[rs.randint(len(schools))], schools[rs.randint(len(schools))]
+            f = test_record(phd_location=phd, first_asst_job_location=job, phd_region=inst[phd]['Region'],
+                            dblp_z=rs.randn(), has_postdoc=rs.rand() < 0.5, is_female=rs.rand() < 0.3)
+            candidates.append((f, inst[phd]['pi_rescaled']))
+            jobs.append(job)
+            ranks.append(inst[job]['pi_rescaled'])
+        candidate_pools.append(candidates)
+        job_pools.append(jobs)
+        job_ranks.append(ranks)
+    return candidate_pools, job_pools, job_ranks
+
+
+class tests(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.inst = get_test_institutions()
+        self.candidate_pools, self.job_pools, self.job_ranks = get_test_pools(self.inst)
+        self.model = SigmoidModel(prob_function='rd_pr_gg')
+        self.weights = np.array([0., 5., 0.2, 0.3])
+
+    def test_batch_hires(self):
+        hired = self.model.simulate_hiring_batch(self.candidate_pools[0], self.job_pools[0], self.job_ranks[0],
+                                                 self.inst, 50, weights=self.weights)
+        self.assertEqual(hired.shape, (50, len(self.job_pools[0])))
+        for row in hired:  # every candidate is hired exactly once
+            self.assertEqual(sorted(row), range(len(self.candidate_pools[0])))
+
+    def test_batch_matches_serial(self):
+        errors = []
+        for batch in (False, True):
+            simulator = SimulationEngine(self.candidate_pools, self.job_pools, self.job_ranks, self.inst,
+                                         self.model, iters=400, batch=batch)
+            errors.append(simulator.simulate(weights=self.weights, quiet=True))
+        self.assertAlmostEqual(errors[0] / errors[1], 1., delta=0.1)
+
+    def test_parallel_reproducible(self):
+        simulator = SimulationEngine(self.candidate_pools, self.job_pools, self.job_ranks, self.inst,
+                                     self.model, iters=7, processes=2)
+        self.model.weights = self.weights
+        backend = simulator.get_backend()
+        serial = ParallelBackend(simulator.pool_features, self.job_ranks, 
+                                 [pool['job_region_codes'] for pool in backend.pools], processes=1)
+        for seed in (1, 2):
+            hired_parallel = backend.simulate(7, seed, 'rd_pr_gg', self.weights)
+            hired_serial = serial.simulate(7, seed, 'rd_pr_gg', self.weights)
+            for a, b in zip(hired_parallel, hired_serial):
+                self.assertTrue(np.array_equal(a, b))
+        simulator.close()
+
+    def test_crn_same_for_any_processes(self):
+        errors = []
+        for processes, batch in ((1, False), (1, True), (2, False), (3, True)):
+            simulator = SimulationEngine(self.candidate_pools, self.job_pools, self.job_ranks, self.inst,
+                                         self.model, iters=6, batch=batch, processes=processes, crn_seed=7)
+            errors.append(simulator.simulate(weights=self.weights, quiet=True))
+            simulator.close()
+        self.assertEqual(len(set(errors)), 1)
+
+    def test_order_log_likelihoods(self):
+        rs = np.random.RandomState(1)
+        F = rs.rand(6, 6)
+        orders = np.array([rs.permutation(6) for r in xrange(4)])
+        expected = np.zeros(len(orders))
+        for r, order in enumerate(orders):
+            available = []
+            for k in xrange(6):
+                current = order[-(k+1)]
+                available.append(current)
+                expected[r] += np.log(F[current][current] / np.sum(F[current][available]))
+        self.assertTrue(np.allclose(order_log_likelihoods(F, orders), expected))
+
+    def test_likelihood_gradient(self):
+        orders, log_probs = prepare_hiring_orders(self.job_pools, self.job_ranks, 4)
+        model = SigmoidModel(prob_function='all')
+        simulator = SimulationEngine(self.candidate_pools, self.job_pools, self.job_ranks, self.inst, model,
+                                     reg=0.1, hiring_orders=orders, hiring_log_probs=log_probs)
+        w = np.array([0.2, 3., -1., 0.5, 0.3, 1., -0.2])
+        value, gradient = simulator.calculate_neg_log_likelihood_and_gradient(w, verbose=False)
+        self.assertAlmostEqual(value, simulator.calculate_neg_log_likelihood(w, verbose=False))
+
+        h = 1e-6
+        for k in xrange(len(w)):
+            step = np.zeros(len(w))
+            step[k] = h
+            numeric = (simulator.calculate_neg_log_likelihood(w + step, verbose=False) - 
+                       simulator.calculate_neg_log_likelihood(w - step, verbose=False)) / (2 * h)
+            self.assertAlmostEqual(gradient[k], numeric, places=5)
+
+    def test_common_random_numbers(self):
+        for batch in (False, True):
+            simulator = SimulationEngine(self.candidate_pools, self.job_pools, self.job_ranks, self.inst,
+                                         self.model, iters=5, batch=batch, crn_seed=42)
+            first = simulator.simulate(weights=self.weights, quiet=True)
+            np.random.random()  # global stream should not matter
+            self.assertEqual(first, simulator.simulate(weights=self.weights, quiet=True))
+
+    def test_log_sum_exp(self):
+        x = np.array([[-1000., -1001., -1002.], [1., 2., 3.]])
+        self.assertAlmostEqual(log_sum_exp(x[1]), np.log(np.sum(np.exp(x[1]))))
+        self.assertAlmostEqual(log_sum_exp(x[0]), -1000. + np.log(1. + np.exp(-1.) + np.exp(-2.)))
+        self.assertTrue(np.allclose(log_sum_exp(x, axis=1), [log_sum_exp(x[0]), log_sum_exp(x[1])]))
+        self.assertEqual(log_sum_exp([-np.inf, -np.inf]), -np.inf)
+
+    def test_neg_likelihood(self):
+        orders, log_probs = prepare_hiring_orders(self.job_pools, self.job_ranks, 3)
+        simulator = SimulationEngine(self.candidate_pools, self.job_pools, self.job_ranks, self.inst, 
+                                     self.model, hiring_orders=orders, hiring_log_probs=log_probs)
+        neg_log_likelihood = simulator.calculate_neg_log_likelihood(self.weights, verbose=False)
+        neg_likelihood = simulator.calculate_neg_likelihood(self.weights, verbose=False)
+        self.assertAlmostEqual(np.log(-neg_likelihood), -neg_log_likelihood)
+
+    def test_neg_log_likelihood_batch(self):
+        orders, log_probs = prepare_hiring_orders(self.job_pools, self.job_ranks, 5)
+        W = np.random.RandomState(2).randn(6, 7)
+        for name in ('all', 'rd_pr', 'step'):
+            model = SigmoidModel(prob_function=name)
+            W_model = W[:,:model.num_weights()]
+            simulator = SimulationEngine(self.candidate_pools, self.job_pools, self.job_ranks, self.inst, model,
+                                         reg=0.1, hiring_orders=orders, hiring_log_probs=log_probs)
+            expected = [simulator.calculate_neg_log_likelihood(w, verbose=False) for w in W_model]
+            self.assertTrue(np.allclose(simulator.calculate_neg_log_likelihood_batch(W_model), expected))
+
+            block = simulation_engine.MAX_ORDER_BLOCK
+            simulation_engine.MAX_ORDER_BLOCK = 200  # A few rows at a time
+            try:
+                self.assertTrue(np.allclose(simulator.calculate_neg_log_likelihood_batch(W_model), expected))
+            finally:
+                simulation_engine.MAX_ORDER_BLOCK = block
+
+    def test_objective_cache(self):
+        cache = ObjectiveCache()
+        simulator = SimulationEngine(self.candidate_pools, self.job_pools, self.job_ranks, self.inst,
+                                     self.model, iters=5, cache=cache)
+        first = simulator.simulate(weights=self.weights, quiet=True)
+        self.assertEqual(first, simulator.simulate(weights=self.weights.copy(), quiet=True))
+        self.assertEqual(cache.hits, 1)
+        simulator.simulate(weights=self.weights, quiet=True, ranking='pi_rescaled')
+        self.assertEqual(len(cache), 2)
+
+        # Different data, different key
+        other = SimulationEngine(self.candidate_pools[:2], self.job_pools[:2], self.job_ranks[:2], 
+                                 self.inst, self.model, iters=5, cache=cache)
+        self.assertNotEqual(other.cache_key('simulate', 'pi'), simulator.cache_key('simulate', 'pi'))
+
+        # processes and batch don't change the error under common random numbers, so they share entries
+        keys, errors = [], []
+        for processes, batch in ((1, False), (2, True)):
+            simulator = SimulationEngine(self.candidate_pools, self.job_pools, self.job_ranks, self.inst,
+                                         self.model, iters=5, batch=batch, processes=processes, crn_seed=3,
+                                         cache=ObjectiveCache())
+            errors.append(simulator.simulate(weights=self.weights, quiet=True))
+            keys.append(simulator.cache_key('simulate', 'pi'))
+            simulator.close()
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(errors[0], errors[1])
+
+
+if __name__ == '__main__':
+    main()
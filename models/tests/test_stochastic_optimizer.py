@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for the SPSA optimizer. """
+
+from faculty_hiring.models.stochastic_optimizer import SPSA
+from faculty_hiring.models.optimizer import MultiStartOptimizer, local_search
+from faculty_hiring.models.simulation_engine import SimulationEngine
+from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.models.tests.test_simulation_engine import get_test_institutions, get_test_pools
+from faculty_hiring.misc.run_log import RunLog
+from unittest import TestCase, main
+import numpy as np
+import multiprocessing
+import tempfile
+import os
+
+
+class NoisyQuadratic:
+    """ Stand-in engine: |w - optimum|^2 plus noise from crn_seed's stream, 
+        part of which (like a simulation's) doesn't cancel between nearby weights """ 
+    def __init__(self, optimum, noise=0.5):
+        self.optimum = np.asarray(optimum, dtype=float)
+        self.noise = noise
+        self.num_pools = 1
+        self.crn_seed = None
+        self.cache = None
+
+    def subset(self, pools):
+        return NoisyQuadratic(self.optimum, self.noise)
+
+    def close(self):
+        pass
+
+    def simulate(self, weights, quiet=False):
+        rng = np.random.RandomState(self.crn_seed)
+        offset = weights - self.optimum
+        return np.sum(offset**2) + self.noise * (rng.randn() + np.dot(rng.randn(len(offset)), offset))
+
+
+class tests(TestCase):
+    def test_quadratic(self):
+        optimum = np.array([1., -2., 0.5])
+        result = SPSA(NoisyQuadratic(optimum), step=0.5, seed=0).minimize(np.zeros(3), maxiter=200)
+        self.assertTrue(np.allclose(result['weights'], optimum, atol=0.2))
+        self.assertTrue(result['value_low'] < result['value'] < result['value_high'])
+        self.assertTrue(result['value_low'] < 0.1)
+        self.assertTrue(np.all(result['weights_low'] <= result['weights']))
+        self.assertTrue(np.all(result['weights'] <= result['weights_high']))
+
+        # Few replicates while far from the optimum, more near it
+        steps = result['step_replicates']
+        self.assertTrue(steps[:10].mean() < steps[-50:].mean())
+        self.assertEqual(result['evaluations'], 2 * steps.sum() + 30)
+
+    def test_multi_start(self):
+        np.random.seed(0)
+        inst = get_test_institutions()
+        model = SigmoidModel(prob_function='rd_pr')
+        engine = SimulationEngine(*(get_test_pools(inst) + (inst, model)), iters=2, batch=True)
+        log = RunLog(tempfile.mktemp())
+        try:
+            optimizer = MultiStartOptimizer(engine, 'simulate', method='SPSA', log=log,
+                                            options={'maxiter': 5, 'final_replicates': 4, 'seed': 1})
+            results = optimizer.run(np.zeros((2, model.num_weights())), num_local=1)
+            local = results[results['stage'] == 'local'].iloc[0]
+            self.assertEqual(len(local['weights']), model.num_weights())
+            self.assertTrue(local['message'].startswith('%.6g in [' % local['value']))
+            self.assertEqual(sum(r['replicates'] for r in log.query('eval', stage='local')), 
+                             local['evaluations'])
+            # A multi-process engine's workers are shut down after the search
+            engine.processes = 2
+            local_search(engine, 'simulate', np.zeros(model.num_weights()), method='SPSA',
+                         options={'maxiter': 2, 'final_replicates': 2})
+            self.assertEqual(multiprocessing.active_children(), [])
+            self.assertTrue(engine.backend is None or engine.backend.worker_pool is None)
+
+            self.assertRaises(ValueError, local_search, engine, 'calculate_neg_log_likelihood', np.zeros(3),
+                              method='SPSA')
+        finally:
+            log.close()
+            os.remove(log.filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" On-disk cache of parsed institution files, faculty records and pools.
+
+    Entries are keyed by the md5 of the input files' contents plus the loader
+    arguments and a format version, so they are invalidated as soon as an
+    input, or the layout of what is cached, changes.  File digests are
+    themselves remembered by (path, size, mtime), so a warm load doesn't even
+    re-read the text files.
+
+    Example:
+        >>> cache = DataCache()  # $FACULTY_HIRING_CACHE or ~/.cache/faculty_hiring
+        >>> inst = cache.institutions('inst.txt')
+        >>> candidate_pools, job_pools, job_ranks, year_range = \\
+        ...     cache.assistant_prof_pools('faculty.txt', 'inst.txt', ranking='pi_rescaled')
+"""
+
+import os
+import gc
+import glob
+import hashlib
+import tempfile
+from faculty_hiring.parse.load import load_assistant_prof_pools, load_assistant_profs
+from faculty_hiring.parse.faculty_parser import parse_faculty_records
+from faculty_hiring.parse.institution_parser import parse_institution_records
+try:
+   import cPickle as pickle
+except:
+   import pickle
+
+
+DEFAULT_CACHE_DIR = os.environ.get('FACULTY_HIRING_CACHE',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'faculty_hiring'))
+DIGEST_INDEX = 'file_digests.pkl'
+HASH_BLOCK_SIZE = 2**22
+# Part of every entry's key.  Bump it whenever cached values change shape:
+# faculty_record's RECORD_SLOTS (records are pickled positionally) or the
+# output of a loader.
+FORMAT_VERSION = 1
+
+
+def file_digest(filename):
+    """ md5 of a file's contents """
+    digest = hashlib.md5()
+    with open(filename, 'rb') as fp:
+        for block in iter(lambda: fp.read(HASH_BLOCK_SIZE), ''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DataCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.digests = None
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+
+    def path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+
+    def load_digest_index(self):
+        if self.digests is None:
+            self.digests = {}
+            try:
+                self.digests = self.read(DIGEST_INDEX)
+            except (IOError, EOFError, pickle.UnpicklingError):
+                pass
+        return self.digests
+
+
+    def digest(self, filename):
+        """ Content digest of filename, recomputed only if its size or mtime changed """
+        filename = os.path.abspath(filename)
+        info = os.stat(filename)
+        stamp = (info.st_size, info.st_mtime)
+        digests = self.load_digest_index()
+        if filename in digests and digests[filename][0] == stamp:
+            return digests[filename][1]
+
+        digest = file_digest(filename)
+        digests[filename] = (stamp, digest)
+        self.write(DIGEST_INDEX, digests)
+        return digest
+
+
+    def read(self, name):
+        """ Unpickle a cache entry.  The garbage collector is paused meanwhile,
+            since it would otherwise be triggered over and over by the many 
+            small objects (records, entries) being created. """
+        with open(self.path(name), 'rb') as fp:
+            data = fp.read()
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return pickle.loads(data)
+        finally:
+            if enabled:
+                gc.enable()
+
+
+    def write(self, name, value):
+        """ Pickle value to the cache directory (atomically) """
+        fd, temp_filename = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, 'wb') as fp:
+            pickle.dump(value, fp, pickle.HIGHEST_PROTOCOL)
+        os.rename(temp_filename, self.path(name))
+
+
+    def get(self, kind, filenames, args, compute):
+        """ Return compute() -- from the cache if filenames, args and the
+            FORMAT_VERSION are unchanged.  Older entries for the same files
+            and args (including those of older versions) are removed. """
+        source = hashlib.md5(repr((map(os.path.abspath, filenames), args))).hexdigest()
+        content = hashlib.md5(repr((FORMAT_VERSION, [self.digest(filename) for filename in filenames])))
+        content = content.hexdigest()
+        name = '%s-%s-%s.pkl' % (kind, source, content)
+
+        try:
+            return self.read(name)
+        except (IOError, EOFError, pickle.UnpicklingError):
+            pass
+
+        value = compute()
+        for stale in glob.glob(self.path('%s-%s-*.pkl' % (kind, source))):
+            os.remove(stale)
+        self.write(name, value)
+        return value
+
+
+    def clear(self):
+        for filename in glob.glob(self.path('*.pkl')):
+            os.remove(filename)
+        self.digests = None
+
+
+    def institutions(self, inst_file):
+        """ Cached parse_institution_records """
+        return self.get('institutions', [inst_file], (),
+                        lambda: parse_institution_records(open(inst_file, 'rU')))
+
+
+    def faculty_records(self, fac_file, inst_file=None, ranking='pi_rescaled'):
+        """ Cached list(parse_faculty_records(...)), with school_info from inst_file """
+        filenames = [fac_file] if inst_file is None else [fac_file, inst_file]
+        def compute():
+            school_info = None if inst_file is None else self.institutions(inst_file)
+            return list(parse_faculty_records(open(fac_file, 'rU'), school_info, ranking))
+        return self.get('faculty_records', filenames, (ranking,), compute)
+
+
+    def assistant_profs(self, fac_file, inst_file, ranking='pi_rescaled', year_start=1970, year_stop=2012,
+                        processes=1):
+        """ Cached load_assistant_profs """
+        return self.get('assistant_profs', [fac_file, inst_file], (ranking, year_start, year_stop),
+                        lambda: load_assistant_profs(open(fac_file, 'rU'), self.institutions(inst_file),
+                                                     ranking, year_start, year_stop, processes))
+
+
+    def assistant_prof_pools(self, fac_file, inst_file, ranking='pi_rescaled', year_start=1970, year_stop=2012,
+                             year_step=1, processes=1, window=None):
+        """ Cached load_assistant_prof_pools """
+        return self.get('assistant_prof_pools', [fac_file, inst_file],
+                        (ranking, year_start, year_stop, year_step, window),
+                        lambda: load_assistant_prof_pools(open(fac_file, 'rU'), self.institutions(inst_file),
+                                                          ranking, year_start, year_stop, year_step, processes,
+                                                          window))
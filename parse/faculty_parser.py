@@ -55,6 +55,7 @@ Where "EXAMPLE.TXT" contains:
 
 from faculty_hiring.misc.util import Struct
 import numpy as np
+import re
 
 NEW_RECORD_SYMBOL = ">>>"
 INDIVIDUAL_FIELDS = ['facultyName', 'email', 'sex', 'department', 
@@ -64,158 +65,401 @@ EDUCATION_FIELDS = ['degree', 'place', 'field', 'years']
 FACULTY_FIELDS = ['rank', 'place', 'years']
 EDUCATION_FLAG = '[Education]'
 FACULTY_FLAG = '[Faculty]'
+EDUCATION_INDEX = dict((key, i) for i, key in enumerate(EDUCATION_FIELDS))
+FACULTY_INDEX = dict((key, i) for i, key in enumerate(FACULTY_FIELDS))
+
+BLOCK_SIZE = 2**22  # Bytes read at a time by parse_faculty_records
+# Tokens of a record in the usual layout, one match per individual field or
+# per whole [Education]/[Faculty] entry (its fields in file-format order):
+# (education flag, 4 values, faculty flag, 3 values, key, value, other).
+# Any other non-blank line (a malformed record, or entries in another order
+# or with blank lines) is matched by `other' and the record is left to the
+# line-based parser.
+ENTRY_LINE = r'\n[^\S\n]*# %s[^\S\n]*:([^\n]*)'
+RECORD_TOKEN = re.compile(r'^[^\S\n]*# (?:(\[Education\])[^\S\n]*' + 
+                          ''.join(ENTRY_LINE % key for key in EDUCATION_FIELDS) + 
+                          r'|(\[Faculty\])[^\S\n]*' + 
+                          ''.join(ENTRY_LINE % key for key in FACULTY_FIELDS) + 
+                          r'|([^:\n]*):([^\n]*))|^[^\S\n]*(\S[^\n]*)', re.M)
+INDIVIDUAL_FIELD_SET = frozenset(INDIVIDUAL_FIELDS)
+
+
+EXP_YEAR_FIELDS = ['start_year', 'end_year']
+DERIVED_FIELDS = ['education', 'faculty', 'phd_location', 'phd_year', 
+                  'first_job_location', 'first_job_year', 'first_asst_job_location', 
+                  'first_asst_job_year', 'num_asst_jobs', 'num_asst_jobs_kd', 
+                  'has_postdoc', 'is_female', 'phd_rank', 'phd_region', 
+                  'first_asst_job_rank', 'first_asst_job_region']
+RECORD_FIELDS = frozenset(INDIVIDUAL_FIELDS + DERIVED_FIELDS)
+RECORD_SLOTS = tuple(sorted(RECORD_FIELDS))  # Changing these? Bump data_cache.FORMAT_VERSION
+INTERNED_FIELDS = frozenset(['degree', 'place', 'field', 'rank'])  # Values repeat across records
+
+
+class exp_entry(tuple):
+    """ Compact, read-only education/faculty entry.  A plain tuple of
+        values that can also be indexed by field name, like the dicts
+        previously used:  entry['place'], entry[1], 'years' in entry """ 
+    __slots__ = ()
+    FIELDS = ()
+    INDEX = {}
 
+    def __getitem__(self, key):
+        if isinstance(key, basestring):
+            return tuple.__getitem__(self, self.INDEX[key])
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return key in self.INDEX
+
+    def get(self, key, default=None):
+        if key in self.INDEX:
+            return tuple.__getitem__(self, self.INDEX[key])
+        return default
+
+    def keys(self):
+        return list(self.FIELDS)
+
+    def items(self):
+        return zip(self.FIELDS, self)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, 
+                           ', '.join('%s=%r' % item for item in self.items()))
+
+    def __reduce__(self):
+        return self.__class__, (tuple(self),)
+
+
+class education_entry(exp_entry):
+    __slots__ = ()
+    FIELDS = tuple(EDUCATION_FIELDS + EXP_YEAR_FIELDS)
+    INDEX = dict((key, i) for i, key in enumerate(FIELDS))
+    INTERNED = [key in INTERNED_FIELDS for key in EDUCATION_FIELDS]
+
+
+class faculty_entry(exp_entry):
+    __slots__ = ()
+    FIELDS = tuple(FACULTY_FIELDS + EXP_YEAR_FIELDS)
+    INDEX = dict((key, i) for i, key in enumerate(FIELDS))
+    INTERNED = [key in INTERNED_FIELDS for key in FACULTY_FIELDS]
+
+
+def parse_year(year):
+    try:
+        return int(year)
+    except:
+        return None
+
+
+YEAR_SPANS = {}  # 'years' value -> (start_year, end_year); few distinct values
+
+
+def year_span(years):
+    """ (start_year, end_year) of a 'years' value, e.g. '2002-2006' """ 
+    span = YEAR_SPANS.get(years)
+    if span is None:
+        start, end = years.split('-')
+        span = YEAR_SPANS[years] = (parse_year(start), parse_year(end))
+    return span
+
+
+class memo(dict):
+    """ memo(function)[key] is function(key), computed on first use """ 
+    def __init__(self, function):
+        self.function = function
+
+    def __missing__(self, key):
+        value = self[key] = self.function(key)
+        return value
 
-def finalize_exp_entry(entry):
-    if 'years' in entry:
-        start, end = entry['years'].split('-')
-        try:
-            start_year = int(start)
-            entry['start_year'] = start_year
-        except:
-            entry['start_year'] = None
-        try:
-            end_year = int(end)
-            entry['end_year'] = end_year
-        except:
-            entry['end_year'] = None
 
-    for key in entry:
-        if entry[key] == '.':
-            entry[key] = None
+def entry_value(raw):
+    """ A (degree, place, ...) value of a RECORD_TOKEN entry, as finalize_exp_entry stores it """ 
+    value = raw.replace(':', '').strip()
+    return None if value == '.' else intern(value)
 
-    return entry
 
+def entry_years(raw):
+    """ (years, start_year, end_year) of a RECORD_TOKEN entry """ 
+    years = raw.replace(':', '').strip()
+    return (years,) + year_span(years)
 
-class faculty_record:
-    def __setitem__(self, key, value):
-        self.__dict__[key]= value
+
+# Raw token -> entry value(s); values repeat across records (places, degrees, ...)
+ENTRY_VALUES = memo(entry_value)
+ENTRY_YEARS = memo(entry_years)
+
+
+def finalize_exp_entry(entry_type, values):
+    """ Build an entry from the raw field values (ordered as in the file
+        format's field list, which entry_type.FIELDS extends with the years) """ 
+    span = year_span(values[entry_type.INDEX['years']])
+    values = [None if value == '.' else intern(value) if interned else value
+              for value, interned in zip(values, entry_type.INTERNED)]
+    return entry_type(tuple(values) + span)
+
+
+set_slot = object.__setattr__  # Set a record slot, bypassing faculty_record.__setattr__ (parsing hot path)
+
+
+class unset_field:
+    """ Placeholder for slots that aren't set (pickles by reference) """ 
+
+
+def rebuild_record(values, extra):
+    """ Inverse of faculty_record.__reduce__ """ 
+    f = faculty_record.__new__(faculty_record)
+    set_slot(f, 'extra', extra)
+    for key, value in zip(RECORD_SLOTS, values):
+        if value is not unset_field:
+            set_slot(f, key, value)
+    return f
+
+
+class lazy_field(object):
+    """ Placeholder for a field whose value is function(*args), computed
+        each time the field is read (see load_all_publications) """ 
+    __slots__ = ('function', 'args')
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+
+    def load(self):
+        return self.function(*self.args)
+
+    def __reduce__(self):
+        return lazy_field, (self.function,) + self.args
+
+
+class faculty_record(object):
+    """ Slotted record of one person.  Fields that aren't part of the file 
+        format (e.g., gs_pubs) are kept in the `extra` mapping, which is only 
+        created when needed.  Either way, fields are available as attributes, 
+        items (f['key']) and through `'key' in f`.  Extension fields may be
+        lazy_fields, which are loaded when read. """ 
+    __slots__ = RECORD_SLOTS + ('extra',)
+
+    def __setattr__(self, key, value):
+        # Parsing sets slots with set_slot; this is for extension fields
+        if key in RECORD_FIELDS or key == 'extra':
+            set_slot(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    __setitem__ = __setattr__
+
+    def __getattr__(self, key):
+        # Only reached for unset slots and extension fields
+        if key != 'extra' and self.extra is not None and key in self.extra:
+            return self.extra_value(key)
+        raise AttributeError(key)
 
     def __getitem__(self, key):
-        return self.__dict__[key]
+        if key in RECORD_FIELDS:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self.extra is not None and key in self.extra:
+            return self.extra_value(key)
+        raise KeyError(key)
+
+    def extra_value(self, key):
+        value = self.extra[key]
+        if isinstance(value, lazy_field):
+            return value.load()
+        return value
 
     def __contains__(self, key):
-        return key in self.__dict__
+        if key in RECORD_FIELDS:
+            return hasattr(self, key)
+        return self.extra is not None and key in self.extra
+
+    def fields(self):
+        """ Dictionary of every field set on this record """ 
+        values = {}
+        for key in RECORD_SLOTS:
+            try:
+                values[key] = object.__getattribute__(self, key)
+            except AttributeError:
+                pass  # Not set for this person
+        if self.extra is not None:
+            for key in self.extra:
+                values[key] = self.extra_value(key)
+        return values
+
+    def __reduce__(self):
+        # A flat tuple of slot values is much faster to (un)pickle than a dict 
+        # (records cross process boundaries in parallel parsing)
+        values = []
+        for key in RECORD_SLOTS:
+            try:
+                values.append(object.__getattribute__(self, key))
+            except AttributeError:
+                values.append(unset_field)
+        return rebuild_record, (tuple(values), self.extra)
 
     def __init__(self, lines, school_info=None, ranking='pi_rescaled'):
-        self.education = []
-        self.faculty = []
-
-        status = 'ready'
+        contents = []
         for line in lines:
             if not line.startswith('# '):
                 raise ValueError('File does not appear to be a '
                                  'valid faculty record file!')
-            line = line[2:]  # remove the leading pound+space
+            contents.append(line[2:])  # remove the leading pound+space
+        self.read_fields(contents)
+        self.set_derived_fields(school_info, ranking)
+
+
+    @classmethod
+    def from_text(cls, text, school_info=None, ranking='pi_rescaled'):
+        """ Build a record from the text following its ">>>" line """ 
+        f = cls.__new__(cls)
+        if not f.read_tokens(RECORD_TOKEN.findall(text)):
+            # Let the line-based parser report the problem
+            lines = [line.strip() for line in text.split('\n') if line.strip()]
+            return cls(lines, school_info, ranking)
+        f.set_derived_fields(school_info, ranking)
+        return f
+
+
+    def read_tokens(self, tokens):
+        """ Same as read_fields(), but from RECORD_TOKEN matches.
+            Returns False for records that aren't in the usual layout
+            (left for the line-based constructor). """ 
+        education, faculty = [], []
+        set_slot(self, 'extra', None)
+        set_slot(self, 'education', education)
+        set_slot(self, 'faculty', faculty)
+
+        for (is_education, degree, place, field, years, is_faculty, rank, job_place, job_years, 
+             key, value, other) in tokens:
+            if is_education:
+                education.append(education_entry((ENTRY_VALUES[degree], ENTRY_VALUES[place], 
+                                                  ENTRY_VALUES[field]) + ENTRY_YEARS[years]))
+            elif is_faculty:
+                faculty.append(faculty_entry((ENTRY_VALUES[rank], ENTRY_VALUES[job_place]) + 
+                                             ENTRY_YEARS[job_years]))
+            elif other:
+                return False
+            else:
+                key = key.strip()
+                if key in INDIVIDUAL_FIELD_SET:
+                    value = value.strip()
+                    if key == 'topic_dist':
+                        value = np.array([float(x) for x in value.split(',')])
+                    elif key == 'dblp_z':
+                        value = float(value)
+                    set_slot(self, key, value)
+        return True
 
+
+    def read_fields(self, contents):
+        """ Individual fields and education/faculty entries, from the 
+            (stripped) record lines without their leading "# " """ 
+        set_slot(self, 'extra', None)
+        set_slot(self, 'education', [])
+        set_slot(self, 'faculty', [])
+
+        status = 'ready'
+        for line in contents:
             if status == 'ready':
                 if line == EDUCATION_FLAG:
                     status = 'education'
-                    values = [None]*len(EDUCATION_FIELDS)
+                    entry_type, fields, index = education_entry, EDUCATION_FIELDS, EDUCATION_INDEX
+                    entries = self.education
+                    values = [None]*len(fields)
+                    missing = len(fields)
 
                 elif line == FACULTY_FLAG:
                     status = 'faculty'
-                    values = [None]*len(FACULTY_FIELDS)
+                    entry_type, fields, index = faculty_entry, FACULTY_FIELDS, FACULTY_INDEX
+                    entries = self.faculty
+                    values = [None]*len(fields)
+                    missing = len(fields)
 
                 else:
                     key, value = [p.strip() for p in line.split(':',1)]
                     if key in INDIVIDUAL_FIELDS:
-                        setattr(self, key, value)
+                        set_slot(self, key, value)
                     if key == 'topic_dist':
                         topic_dist = np.array([float(x) for x in value.split(',')])
-                        setattr(self, key, topic_dist)
+                        set_slot(self, key, topic_dist)
                     if key == 'dblp_z':
-                        setattr(self, key, float(value))
+                        set_slot(self, key, float(value))
 
-            elif status == 'education':
+            else:
                 pieces = line.split(':')
                 key = pieces[0].strip()
                 value = ''.join(pieces[1:]).strip()
-                if key not in EDUCATION_FIELDS:
-                    raise ValueError('Unexpected education field!')
+                if key not in index:
+                    raise ValueError('Unexpected %s field!' % status)
 
-                i = EDUCATION_FIELDS.index(key)
+                i = index[key]
+                if values[i] is None:
+                    missing -= 1
                 values[i] = value 
 
-                if None not in values:
-                    entry = dict(zip(EDUCATION_FIELDS, values))
-                    entry = finalize_exp_entry(entry)
-                    self.education.append(entry)
+                if not missing:
+                    entries.append(finalize_exp_entry(entry_type, values))
                     status = 'ready'
 
-            elif status == 'faculty':
-                pieces = line.split(':')
-                key = pieces[0].strip()
-                value = ''.join(pieces[1:]).strip()
-                if key not in FACULTY_FIELDS:
-                    raise ValueError('Unexpected faculty field!')
-
-                i = FACULTY_FIELDS.index(key)
-                values[i] = value 
-
-                if None not in values:
-                    entry = dict(zip(FACULTY_FIELDS, values))
-                    entry = finalize_exp_entry(entry)
-                    self.faculty.append(entry)
-                    status = 'ready'
 
+    def set_derived_fields(self, school_info=None, ranking='pi_rescaled'):
+        """ PhD, first job, postdoc, etc. from the parsed entries """ 
         # Set PhD info
-        self.phd_location = None
-        self.phd_year = None
-        for record in self.education:
-            if record['degree'] == 'PhD':
-                self.phd_location = record['place']
-                self.phd_year = record['end_year']
+        phd_location, phd_year = None, None
+        for degree, place, field, years, start_year, end_year in self.education:
+            if degree == 'PhD':
+                phd_location, phd_year = place, end_year
+        set_slot(self, 'phd_location', phd_location)
+        set_slot(self, 'phd_year', phd_year)
 
         # Set first job info - ASSUMES ORDERED RECORDS
-        self.first_job_location = None
-        self.first_job_year = None
-        for record in self.faculty:
-            if record['rank'] != 'PostDoc':
-                self.first_job_location = record['place']
-                self.first_job_year = record['end_year']
+        first_job_location, first_job_year = None, None
+        for rank, place, years, start_year, end_year in self.faculty:
+            if rank != 'PostDoc':
+                first_job_location, first_job_year = place, end_year
                 break 
+        set_slot(self, 'first_job_location', first_job_location)
+        set_slot(self, 'first_job_year', first_job_year)
 
         # Set Assistant Professor info
-        self.first_asst_job_location = None
-        self.first_asst_job_year = None
+        first_asst_job_location, first_asst_job_year = None, None
         year = np.inf
-        self.num_asst_jobs = 0     # Number of assistant jobs
-        self.num_asst_jobs_kd = 0  # With a known date
-        for record in self.faculty:
-            if record['rank'] == 'Assistant Professor':
-                self.num_asst_jobs += 1
-                if record['start_year']:
-                    self.num_asst_jobs_kd += 1
-                    if record['start_year'] < year:
-                        self.first_asst_job_location = record['place']
-                        self.first_asst_job_year = record['start_year']
-                        year = self.first_asst_job_year
-
-        # Do they have a post-doc? 
-        self.has_postdoc = False
-        for record in self.faculty:
-            if record['rank'] == 'PostDoc':
-                self.has_postdoc = True
+        num_asst_jobs = 0     # Number of assistant jobs
+        num_asst_jobs_kd = 0  # With a known date
+        has_postdoc = False   # Do they have a post-doc? 
+        for rank, place, years, start_year, end_year in self.faculty:
+            if rank == 'Assistant Professor':
+                num_asst_jobs += 1
+                if start_year:
+                    num_asst_jobs_kd += 1
+                    if start_year < year:
+                        first_asst_job_location, first_asst_job_year = place, start_year
+                        year = start_year
+            elif rank == 'PostDoc':
+                has_postdoc = True
+        set_slot(self, 'first_asst_job_location', first_asst_job_location)
+        set_slot(self, 'first_asst_job_year', first_asst_job_year)
+        set_slot(self, 'num_asst_jobs', num_asst_jobs)
+        set_slot(self, 'num_asst_jobs_kd', num_asst_jobs_kd)
+        set_slot(self, 'has_postdoc', has_postdoc)
 
         # Are they female? 
-        self.is_female = self['sex'] == 'F'
+        set_slot(self, 'is_female', self['sex'] == 'F')
 
         # Set ranking/geography info, if supplied
         if school_info is not None:
-            if self.phd_location in school_info:
-                self.phd_rank = school_info[self.phd_location][ranking]
-                self.phd_region = school_info[self.phd_location]['Region']
-            else:
-                self.phd_rank = school_info['UNKNOWN'][ranking]
-                self.phd_region = school_info['UNKNOWN']['Region']
+            phd = school_info[phd_location if phd_location in school_info else 'UNKNOWN']
+            set_slot(self, 'phd_rank', phd[ranking])
+            set_slot(self, 'phd_region', phd['Region'])
 
-            if self.first_asst_job_location in school_info:
-                self.first_asst_job_rank = school_info[self.first_asst_job_location][ranking]
-                self.first_asst_job_region = school_info[self.first_asst_job_location]['Region']
-            else:
-                self.first_asst_job_rank = school_info['UNKNOWN'][ranking]
-                self.first_asst_job_region = school_info['UNKNOWN']['Region']
+            job = school_info[first_asst_job_location if first_asst_job_location in school_info else 'UNKNOWN']
+            set_slot(self, 'first_asst_job_rank', job[ranking])
+            set_slot(self, 'first_asst_job_region', job['Region'])
 
 
     def phd(self):
@@ -267,7 +511,65 @@ class faculty_record:
         return None, None
 
 
-def parse_faculty_records(fp, school_info=None, ranking='pi_rescaled'):
+def record_starts(text):
+    """ (line, body) for each record in text: where its ">>>" line starts
+        and where the text after that line starts.  Found with plain string
+        searches for ">>>", which is much faster than a multi-line regex. """ 
+    starts = []
+    pos = text.find(NEW_RECORD_SYMBOL)
+    while pos >= 0:
+        line = text.rfind('\n', 0, pos) + 1
+        body = text.find('\n', pos) + 1 or len(text)
+        if not text[line:pos].strip():  # ">>>" starts the line
+            starts.append((line, body))
+        pos = text.find(NEW_RECORD_SYMBOL, body)
+    return starts
+
+
+def read_record_blocks(fp, block_size=BLOCK_SIZE):
+    """ Yield (offset, text) for each record: the text is everything after
+        its ">>>" line, the offset is the position of that line (from the
+        start of the file, for a file opened at position 0).  fp is read in 
+        large blocks rather than line by line. """ 
+    pending = ''
+    pending_offset = fp.tell()  # Position of pending[0]
+    preamble = True
+    while True:
+        block = fp.read(block_size)
+        text = pending + block
+        text_offset = pending_offset
+        starts = record_starts(text)
+        if block:
+            if not starts or starts[-1][0] == 0:
+                pending = text  # No complete record yet
+                continue
+            # The last record may continue into the next block
+            last = starts.pop()[0]
+            complete, pending = text[:last], text[last:]
+            pending_offset = text_offset + last
+        else:
+            complete, pending = text, ''
+
+        if preamble:
+            if complete[:starts[0][0] if starts else len(complete)].strip():
+                raise ValueError('File does not appear to be a '
+                                 'valid faculty record file!')
+            preamble = False
+        for k, (line, body) in enumerate(starts):
+            stop = starts[k+1][0] if k + 1 < len(starts) else len(complete)
+            yield text_offset + line, complete[body:stop]
+
+        if not block:
+            break
+
+
+def read_record_texts(fp, block_size=BLOCK_SIZE):
+    """ Yield the text of each record (everything after its ">>>" line) """ 
+    for offset, text in read_record_blocks(fp, block_size):
+        yield text
+
+
+def parse_faculty_records(fp, school_info=None, ranking='pi_rescaled', block_size=BLOCK_SIZE):
     """ Parse a faculty record file.
         This is a generator function which yields
         one record at a time, as they appear in the 
@@ -280,6 +582,24 @@ def parse_faculty_records(fp, school_info=None, ranking='pi_rescaled'):
         Yields:
           + faculty profile object
     """
+    for text in read_record_texts(fp, block_size):
+        yield faculty_record.from_text(text, school_info, ranking)
+
+
+def parse_faculty_records_by_line(fp, school_info=None, ranking='pi_rescaled'):
+    """ Parse a faculty record file, one line at a time.
+        Reference implementation for parse_faculty_records().
+        This is a generator function which yields
+        one record at a time, as they appear in the 
+        file being parsed.
+
+        Inputs:
+          + fp - an *open* file pointer containing 
+                 faculty records.  
+        
+        Yields:
+          + faculty profile object
+    """
     partial_record = False
 
     for line in fp:
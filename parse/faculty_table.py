@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+"""
+Columnar (struct-of-arrays) storage of faculty records.
+
+A FacultyTable keeps the attributes the models and scoring functions use as
+NumPy arrays, one entry per person, with institution names interned to
+integer ids.  Full `faculty_record` objects are only built on demand by
+re-reading the person's entry from the (seekable) source file.
+
+    >>> table = load_faculty_table(open('EXAMPLE.TXT', 'rU'), school_info=inst)
+    >>> print table.place_name(table.phd_place[0]), table.phd_year[0]
+        University of New Mexico 2006
+    >>> print table.record(0).facultyName
+        Aaron Clauset
+
+Missing values: institution ids and years are -1, dblp_z and ranks are NaN,
+rows of topic_dist are all zero where has_topic_dist is False.
+"""
+
+import numpy as np
+from faculty_hiring.parse.faculty_parser import faculty_record, read_record_blocks
+
+
+MISSING = -1
+ID_TYPE = np.int32
+YEAR_TYPE = np.int16
+COUNT_TYPE = np.int16
+RECORD_READ_SIZE = 2**14  # Bytes read at a time when re-reading one record
+
+
+class FacultyTable:
+    def __init__(self, fp=None, school_info=None, ranking='pi_rescaled'):
+        self.fp = fp
+        self.school_info = school_info
+        self.ranking = ranking
+        self.places = []     # id -> institution name
+        self.place_ids = {}  # institution name -> id
+        self.num_records = 0
+
+        self.offset = np.zeros(0, dtype=np.int64)
+        self.phd_place = np.zeros(0, dtype=ID_TYPE)
+        self.phd_year = np.zeros(0, dtype=YEAR_TYPE)
+        self.first_asst_job_place = np.zeros(0, dtype=ID_TYPE)
+        self.first_asst_job_year = np.zeros(0, dtype=YEAR_TYPE)
+        self.current_place = np.zeros(0, dtype=ID_TYPE)
+        self.num_asst_jobs = np.zeros(0, dtype=COUNT_TYPE)
+        self.num_asst_jobs_kd = np.zeros(0, dtype=COUNT_TYPE)
+        self.sex = np.zeros(0, dtype='S1')
+        self.is_female = np.zeros(0, dtype=bool)
+        self.has_postdoc = np.zeros(0, dtype=bool)
+        self.dblp_z = np.zeros(0, dtype=float)
+        self.has_topic_dist = np.zeros(0, dtype=bool)
+        self.topic_dist = np.zeros((0, 0), dtype=float)
+
+
+    def __len__(self):
+        return self.num_records
+
+
+    def intern(self, place):
+        """ Integer id for an institution name (MISSING for None) """
+        if place is None:
+            return MISSING
+        if place not in self.place_ids:
+            self.place_ids[place] = len(self.places)
+            self.places.append(place)
+        return self.place_ids[place]
+
+
+    def place_name(self, place_id):
+        """ Institution name for an id (None for MISSING) """
+        if place_id == MISSING:
+            return None
+        return self.places[place_id]
+
+
+    def place_values(self, key, default_key='UNKNOWN'):
+        """ Array of school_info[place][key] indexed by place id, with one extra
+            trailing entry (used for MISSING ids) taken from school_info['UNKNOWN'] """
+        values = [self.school_info[place][key] if place in self.school_info
+                  else self.school_info[default_key][key] for place in self.places]
+        values.append(self.school_info[default_key][key])
+        return np.array(values)
+
+
+    def in_sample(self, place_ids):
+        """ True where the institution is in school_info """
+        known = np.array([place in self.school_info for place in self.places] + [False], dtype=bool)
+        return known[place_ids]
+
+
+    @property
+    def phd_rank(self):
+        return self.place_values(self.ranking).astype(float)[self.phd_place]
+
+
+    @property
+    def first_asst_job_rank(self):
+        return self.place_values(self.ranking).astype(float)[self.first_asst_job_place]
+
+
+    @property
+    def phd_region(self):
+        return self.place_values('Region')[self.phd_place]
+
+
+    def load(self, fp):
+        """ Parse all records in fp into the columns """
+        self.fp = fp
+        columns = dict((name, []) for name in ['offset', 'phd_place', 'phd_year', 'first_asst_job_place',
+                                               'first_asst_job_year', 'current_place', 'num_asst_jobs',
+                                               'num_asst_jobs_kd', 'sex', 'has_postdoc', 'dblp_z'])
+        topic_rows = {}
+
+        for k, (offset, text) in enumerate(read_record_blocks(fp)):
+            f = faculty_record.from_text(text)
+            columns['offset'].append(offset)
+            columns['phd_place'].append(self.intern(f.phd_location))
+            columns['phd_year'].append(MISSING if f.phd_year is None else f.phd_year)
+            columns['first_asst_job_place'].append(self.intern(f.first_asst_job_location))
+            columns['first_asst_job_year'].append(MISSING if f.first_asst_job_year is None
+                                                  else f.first_asst_job_year)
+            columns['current_place'].append(self.intern(f['place'] if 'place' in f else None))
+            columns['num_asst_jobs'].append(f.num_asst_jobs)
+            columns['num_asst_jobs_kd'].append(f.num_asst_jobs_kd)
+            columns['sex'].append(f['sex'] if 'sex' in f and f['sex'] else '')
+            columns['has_postdoc'].append(f.has_postdoc)
+            columns['dblp_z'].append(f['dblp_z'] if 'dblp_z' in f else np.nan)
+            if 'topic_dist' in f:
+                topic_rows[k] = f['topic_dist']
+
+        self.num_records = len(columns['offset'])
+        self.offset = np.array(columns['offset'], dtype=np.int64)
+        for name in ['phd_place', 'first_asst_job_place', 'current_place']:
+            setattr(self, name, np.array(columns[name], dtype=ID_TYPE))
+        for name in ['phd_year', 'first_asst_job_year']:
+            setattr(self, name, np.array(columns[name], dtype=YEAR_TYPE))
+        for name in ['num_asst_jobs', 'num_asst_jobs_kd']:
+            setattr(self, name, np.array(columns[name], dtype=COUNT_TYPE))
+        self.sex = np.array(columns['sex'], dtype='S1')
+        self.is_female = self.sex == 'F'
+        self.has_postdoc = np.array(columns['has_postdoc'], dtype=bool)
+        self.dblp_z = np.array(columns['dblp_z'], dtype=float)
+
+        num_topics = max([len(row) for row in topic_rows.itervalues()] + [0])
+        self.topic_dist = np.zeros((self.num_records, num_topics), dtype=float)
+        self.has_topic_dist = np.zeros(self.num_records, dtype=bool)
+        for k, row in topic_rows.iteritems():
+            self.topic_dist[k, :len(row)] = row
+            self.has_topic_dist[k] = True
+        return self
+
+
+    def record(self, k):
+        """ Build the full faculty_record for person k (re-reads the source file) """
+        if self.fp is None:
+            raise ValueError('No source file to read records from')
+        self.fp.seek(self.offset[k])
+        offset, text = next(read_record_blocks(self.fp, RECORD_READ_SIZE))
+        return faculty_record.from_text(text, self.school_info, self.ranking)
+
+
+    def records(self, indices=None):
+        """ Generator of full faculty_records (all, or those in indices) """
+        if indices is None:
+            indices = xrange(self.num_records)
+        elif np.asarray(indices).dtype == bool:
+            indices = np.flatnonzero(indices)
+        for k in indices:
+            yield self.record(k)
+
+
+    def assistant_profs(self, year_start=1970, year_stop=2012):
+        """ Boolean mask of the people load_assistant_profs() would keep """
+        year = self.first_asst_job_year
+        return ((year != MISSING) & (year >= year_start) & (year < year_stop) &
+                self.in_sample(self.phd_place) & self.in_sample(self.first_asst_job_place) &
+                (self.num_asst_jobs == self.num_asst_jobs_kd))
+
+
+def load_faculty_table(fp, school_info=None, ranking='pi_rescaled'):
+    """ Parse a faculty record file into a FacultyTable.
+        fp must stay open (and seekable) for table.record() to work. """
+    return FacultyTable(school_info=school_info, ranking=ranking).load(fp)
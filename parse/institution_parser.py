@@ -100,3 +100,115 @@ def parse_institution_records(fp):
 
     return institutions 
 
+
+UNKNOWN = 'UNKNOWN'
+
+
+class InstitutionIndex:
+    """ Institution records with dense integer ids and array-backed attributes.
+
+        Institutions are numbered in sorted order, with UNKNOWN last, and every
+        attribute (pi, pi_inv, pi_rescaled, Region, ...) is stored as an array
+        indexed by id.  Institutions lacking an attribute get UNKNOWN's value.
+        Without an UNKNOWN record, `unknown' is None and names that aren't in
+        the index can only be looked up with an explicit `missing' id.
+        Still behaves like the school_info dict it was built from, so it can be
+        passed anywhere a school_info is expected.
+
+        Example:
+            >>> index = InstitutionIndex(parse_institution_records(X))
+            >>> ids = index.lookup(['Yale University', 'Nowhere U.'])
+            >>> print index.pi[ids]  # Nowhere U. falls back on UNKNOWN
+                [ 9.42  77.5 ]
+    """
+    def __init__(self, institutions):
+        self.records = institutions
+        self.names = sorted(name for name in institutions if name != UNKNOWN)
+        if UNKNOWN in institutions:
+            self.names.append(UNKNOWN)
+        self.name_ids = dict((name, i) for i, name in enumerate(self.names))
+        self.unknown = self.name_ids.get(UNKNOWN)
+
+        default = institutions.get(UNKNOWN, {})
+        keys = set()
+        for record in institutions.itervalues():
+            keys.update(record)
+        self.columns = {}
+        for key in keys:
+            values = [institutions[name].get(key, default.get(key)) for name in self.names]
+            numeric = all(isinstance(v, (int, long, float)) and not isinstance(v, bool) for v in values)
+            self.columns[key] = np.array(values, dtype=float if numeric else object)
+
+        self.pi = self.columns.get('pi')
+        self.pi_inv = self.columns.get('pi_inv')
+        self.pi_rescaled = self.columns.get('pi_rescaled')
+        self.Region = self.columns.get('Region')
+
+
+    # Mapping interface (same as the school_info dict)
+    def __getitem__(self, name):
+        return self.records[name]
+
+    def __contains__(self, name):
+        return name in self.records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, name, default=None):
+        return self.records.get(name, default)
+
+    def keys(self):
+        return self.records.keys()
+
+    def items(self):
+        return self.records.items()
+
+
+    def id(self, name):
+        """ Integer id of an institution (UNKNOWN's id if not in the index) """
+        return self.lookup([name])[0]
+
+
+    def lookup(self, names, missing=None):
+        """ Array of ids for a sequence of institution names.  Names not in
+            the index get `missing' (default: the UNKNOWN id).  Raises
+            KeyError for such names if there is neither. """
+        if missing is None:
+            missing = self.unknown
+        name_ids = self.name_ids
+        if missing is None:
+            absent = sorted(set(name for name in names if name not in name_ids))
+            if absent:
+                raise KeyError('Not in the institution index (which has no %s record): %s' % 
+                               (UNKNOWN, ', '.join(map(str, absent))))
+        return np.array([name_ids.get(name, missing) for name in names], dtype=int)
+
+
+    def known(self, ids):
+        """ True where an id is a real institution (not UNKNOWN or missing) """
+        ids = np.asarray(ids)
+        known = ids >= 0
+        if self.unknown is not None:
+            known &= ids != self.unknown
+        return known
+
+
+    def column(self, key):
+        """ Attribute array, indexed by id """
+        return self.columns[key]
+
+
+    def rank(self, ids, ranking='pi'):
+        """ Ranks (under the given ranking) of an array of ids """
+        return self.columns[ranking][ids]
+
+
+def institution_index(school_info):
+    """ InstitutionIndex for a school_info dict (returned as is if already indexed) """
+    if school_info is None or isinstance(school_info, InstitutionIndex):
+        return school_info
+    return InstitutionIndex(school_info)
@@ -9,11 +9,15 @@ __status__ = "Development"
 
 
 import os
+import functools
 import numpy as np
 import pandas as pd
-from faculty_hiring.parse.faculty_parser import parse_faculty_records
+from faculty_hiring.parse.faculty_parser import parse_faculty_records, lazy_field
+from faculty_hiring.parse.parallel_parser import parse_faculty_records_parallel
 from faculty_hiring.parse.dblp import parse_dblp_publications
 from faculty_hiring.parse.google_scholar import parse_gs_publications
+from faculty_hiring.parse.pub_store import PublicationStore
+from faculty_hiring.misc.lru_cache import LRUCache
 try:
    import cPickle as pickle
 except:
@@ -22,65 +26,159 @@ except:
 
 GS_PKL = 'GSP_%s.pkl'
 DBLP_PKL = 'DBLP_%s.pkl'
+GS_STORE = 'GSP.pubs'
+DBLP_STORE = 'DBLP.pubs'
+PUBLICATION_SOURCES = {'gs':   (GS_PKL, GS_STORE, ('gs_pubs', 'gs_stats')),
+                       'dblp': (DBLP_PKL, DBLP_STORE, ('dblp_pubs', 'dblp_stats'))}
+PUBLICATION_CACHE_SIZE = 1000  # Authors whose lazily loaded publications are kept
+
+_publication_stores = {}     # (size, mtime) and open PublicationStore, by filename
+_publication_cache = None    # LRU of lazily loaded (publications, stats), by author
 
 
 def load_assistant_prof_pools(faculty_fp, school_info=None, ranking='pi_rescaled',
-                              year_start=1970, year_stop=2012, year_step=1):
-    """ Load all assistant professors, format as pools for simulation models """ 
-    assistant_professors = load_assistant_profs(faculty_fp, school_info, ranking, year_start, year_stop)
-    return split_faculty_by_year(assistant_professors, year_start, year_stop, year_step)
-
-
-def load_assistant_profs(faculty_fp, school_info, ranking='pi_rescaled', year_start=1970, year_stop=2012):
-    """ Return a list of the assistant professors """
-    assistant_professors = []
-    for f in parse_faculty_records(faculty_fp, school_info, ranking):
-        year = f.first_asst_job_year
-        if (year is not None and                          # We know their start year
+                              year_start=1970, year_stop=2012, year_step=1, processes=1, window=None):
+    """ Load all assistant professors, format as pools for simulation models 
+        (see split_faculty_by_year for year_step and window) """ 
+    assistant_professors = load_assistant_profs(faculty_fp, school_info, ranking, year_start, year_stop, processes)
+    return split_faculty_by_year(assistant_professors, year_start, year_stop, year_step, window)
+
+
+def is_assistant_prof(f, school_info, year_start=1970, year_stop=2012):
+    """ Should f be one of the assistant professors in the pools? """ 
+    year = f.first_asst_job_year
+    return (year is not None and                          # We know their start year
             year >= year_start and                        # It's in the range we want
             year < year_stop and 
             f.phd_location in school_info and             # Their PhD location is in-sample
             f.first_asst_job_location in school_info and  # Their hiring location is in-sample
-            f.num_asst_jobs == f.num_asst_jobs_kd):       # It's clear which is the first gig
-            assistant_professors.append(f)
-    return assistant_professors
-
-
-def split_faculty_by_year(faculty, year_start, year_stop, year_step=1):
+            f.num_asst_jobs == f.num_asst_jobs_kd)        # It's clear which is the first gig
+
+
+def load_assistant_profs(faculty_fp, school_info, ranking='pi_rescaled', year_start=1970, year_stop=2012, 
+                         processes=1):
+    """ Return a list of the assistant professors.
+        With processes > 1 (or None, every CPU), the file (faculty_fp.name)
+        is parsed in parallel. """
+    keep = functools.partial(is_assistant_prof, school_info=school_info, 
+                             year_start=year_start, year_stop=year_stop)
+    if processes is None or processes > 1:
+        return parse_faculty_records_parallel(faculty_fp.name, school_info, ranking, processes, keep)
+    return [f for f in parse_faculty_records(faculty_fp, school_info, ranking) if keep(f)]
+
+
+def year_bins(year_start, year_stop, year_step=1, window=None):
+    """ (start, stop) year bins beginning every year_step years from year_start.
+        Each bin is `window' years wide (default: year_step, i.e., a partition
+        of the years); wider windows give overlapping, sliding bins. Bins are
+        clipped to year_stop. """ 
+    if window is None:
+        window = year_step
+    if year_step < 1 or window < 1:
+        raise ValueError('year_step and window must be positive')
+    return [(start, min(start + window, year_stop)) for start in xrange(year_start, year_stop, year_step)]
+
+
+def split_faculty_by_year(faculty, year_start, year_stop, year_step=1, window=None, bins=None):
     """ Similar to load_hires_by_year, but instead it takes in a list
-        of faculty and splits into candidate/job pools. """ 
-    year_range = np.arange(year_start, year_stop)
-    num_steps = len(year_range)
-    candidate_pools = [[] for year in xrange(num_steps)]
-    job_pools = [[] for year in xrange(num_steps)]
-    job_ranks = [[] for year in xrange(num_steps)]
-
-    for f in faculty:
-        year = f.first_asst_job_year
-        if year >= year_start and year < year_stop:
-            i = np.where(year_range == year)[0]
-            job_pools[i].append(f.first_asst_job_location)
-            job_ranks[i].append(f.first_asst_job_rank)
-            candidate_pools[i].append((f, f.phd_rank))
+        of faculty and splits into candidate/job pools. 
+
+        Pools cover year_bins(year_start, year_stop, year_step, window), or
+        the given list of (start, stop) bins (an arbitrary, possibly
+        overlapping partition).  Within a pool, faculty keep their order in
+        the input list.  year_range holds the first year of every bin. """ 
+    if bins is None:
+        bins = year_bins(year_start, year_stop, year_step, window)
+    year_range = np.array([start for start, stop in bins], dtype=int)
+
+    # Group once: sort by start year, then every bin is a contiguous slice
+    years = np.array([-1 if f.first_asst_job_year is None else f.first_asst_job_year 
+                      for f in faculty], dtype=int)
+    order = np.argsort(years, kind='mergesort')
+    sorted_years = years[order]
+
+    candidate_pools, job_pools, job_ranks = [], [], []
+    for start, stop in bins:
+        lo, hi = np.searchsorted(sorted_years, [start, stop])
+        members = [faculty[k] for k in np.sort(order[lo:hi])]
+        job_pools.append([f.first_asst_job_location for f in members])
+        job_ranks.append([f.first_asst_job_rank for f in members])
+        candidate_pools.append([(f, f.phd_rank) for f in members])
         
     return candidate_pools, job_pools, job_ranks, year_range
 
 
-def load_all_publications(faculty, dblp_dir=None, gs_dir=None):
-    """ Load all publication data into faculty records """ 
-    for f in faculty:
-        if gs_dir and 'gs' in f:
-            filename = os.path.join(gs_dir, GS_PKL % f['gs'])
-            with open(filename,'rb') as fp:
-                f['gs_pubs'] = pickle.load(fp)
-                f['gs_stats'] = pickle.load(fp)
-                
-        if dblp_dir and 'dblp' in f:
-            filename = os.path.join(dblp_dir, DBLP_PKL % f['dblp'])
-            with open(filename,'rb') as fp:
-                f['dblp_pubs'] = pickle.load(fp)
-                f['dblp_stats'] = pickle.load(fp)
-
+def open_publication_store(directory, store_name):
+    """ The directory's consolidated PublicationStore, if it has one.
+        Stores stay open (per process) until the file changes. """ 
+    filename = os.path.join(directory, store_name)
+    try:
+        info = os.stat(filename)
+    except OSError:
+        return None
+    stamp = (info.st_size, info.st_mtime)
+    if filename not in _publication_stores or _publication_stores[filename][0] != stamp:
+        _publication_stores[filename] = (stamp, PublicationStore(filename))
+    return _publication_stores[filename][1]
+
+
+def read_publications(directory, source, key):
+    """ (publications, stats) for one author of a source ('gs' or 'dblp'),
+        from the directory's store if it holds the author, from the
+        author's pickle otherwise (e.g., scraped after consolidation) """ 
+    pkl, store_name, fields = PUBLICATION_SOURCES[source]
+    store = open_publication_store(directory, store_name)
+    if store is not None and key in store:
+        return store[key]
+    with open(os.path.join(directory, pkl % key), 'rb') as fp:
+        publications = pickle.load(fp)
+        return publications, pickle.load(fp)
+
+
+def set_publication_cache_size(max_authors):
+    """ Bound the number of authors whose lazily loaded publications are
+        kept in memory (per process) """ 
+    global _publication_cache
+    _publication_cache = LRUCache(max_size=max_authors)
+
+
+def cached_publication_field(directory, source, key, position):
+    """ Value of a lazy publication field: position 0 is the publication
+        list, 1 the stats.  Authors are loaded on a miss and the least 
+        recently used are evicted beyond the cache size. """ 
+    if _publication_cache is None:
+        set_publication_cache_size(PUBLICATION_CACHE_SIZE)
+    cache_key = (directory, source, key)
+    if cache_key in _publication_cache:
+        return _publication_cache[cache_key][position]
+    value = read_publications(directory, source, key)
+    _publication_cache[cache_key] = value
+    return value[position]
+
+
+def load_all_publications(faculty, dblp_dir=None, gs_dir=None, lazy=False):
+    """ Load all publication data into faculty records.
+        Reads each directory's consolidated store (see pub_store) if
+        there is one, and the per-person pickles otherwise. 
+
+        With lazy=True, nothing is read yet: the fields (gs_pubs, dblp_stats,
+        ...) are loaded when first accessed and kept in a bounded, per-process
+        cache (see set_publication_cache_size).  Faculty must then be
+        faculty_records.  A lazily loaded list is only guaranteed to be the 
+        same object across reads while its author stays in the cache, so 
+        modify copies. """ 
+    for directory, source in [(gs_dir, 'gs'), (dblp_dir, 'dblp')]:
+        if not directory:
+            continue
+        pubs_field, stats_field = PUBLICATION_SOURCES[source][2]
+        for f in faculty:
+            if source not in f:
+                continue
+            if lazy:
+                f[pubs_field] = lazy_field(cached_publication_field, directory, source, f[source], 0)
+                f[stats_field] = lazy_field(cached_publication_field, directory, source, f[source], 1)
+            else:
+                f[pubs_field], f[stats_field] = read_publications(directory, source, f[source])
 
 
 def convert_faculty_list_to_df(faculty, discipline=None):
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Multi-process parsing of faculty record files.
+
+    The file is split into byte ranges that each start on a ">>>" line, so
+    every range holds whole records.  Worker processes parse their ranges
+    with parse_faculty_records (including the school_info/ranking
+    enrichment) and the results are merged back in file order.  Ranges are
+    read in binary mode, for exact offsets, and their line endings are then
+    converted as reading in 'rU' mode would (see universal_newlines).
+
+    Example:
+        >>> records = parse_faculty_records_parallel('faculty.txt', inst, processes=8)
+"""
+
+import multiprocessing
+from cStringIO import StringIO
+from faculty_hiring.parse.faculty_parser import parse_faculty_records, NEW_RECORD_SYMBOL
+
+
+CHUNKS_PER_PROCESS = 4  # Byte ranges per worker, for load balancing
+
+_worker_args = None  # Set by _init_worker in each worker process
+
+
+def align_to_record(fp, offset):
+    """ Offset of the first record that starts at or after offset """
+    if offset <= 0:
+        return 0
+    fp.seek(offset - 1)
+    fp.readline()  # Finish the line we landed in
+    while True:
+        position = fp.tell()
+        line = fp.readline()
+        if not line or line.lstrip().startswith(NEW_RECORD_SYMBOL):
+            return position
+
+
+def record_ranges(filename, num_chunks):
+    """ Split a faculty file into (at most) num_chunks (start, stop) byte
+        ranges that begin on record boundaries """
+    with open(filename, 'rb') as fp:
+        fp.seek(0, 2)
+        size = fp.tell()
+        offsets = set(align_to_record(fp, k * size // num_chunks) for k in xrange(num_chunks))
+    offsets = sorted(offsets) + [size]
+    return [(start, stop) for start, stop in zip(offsets[:-1], offsets[1:]) if stop > start]
+
+
+def universal_newlines(text):
+    """ text with CRLF and CR line endings turned into LF, like a file read in 'rU' mode """
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def parse_byte_range(filename, start, stop, school_info=None, ranking='pi_rescaled', keep=None):
+    """ Parse the records in one byte range of a faculty file.
+        If given, only records for which keep(f) is True are returned. """
+    with open(filename, 'rb') as fp:
+        fp.seek(start)
+        text = universal_newlines(fp.read(stop - start))
+    records = parse_faculty_records(StringIO(text), school_info, ranking)
+    if keep is None:
+        return list(records)
+    return [f for f in records if keep(f)]
+
+
+def _init_worker(filename, school_info, ranking, keep):
+    global _worker_args
+    _worker_args = (filename, school_info, ranking, keep)
+
+
+def _parse_range(byte_range):
+    filename, school_info, ranking, keep = _worker_args
+    start, stop = byte_range
+    return parse_byte_range(filename, start, stop, school_info, ranking, keep)
+
+
+def parse_faculty_records_parallel(filename, school_info=None, ranking='pi_rescaled',
+                                   processes=None, keep=None, chunks_per_process=CHUNKS_PER_PROCESS):
+    """ Parse a faculty file (by name) using several processes.
+        Returns the list of records, in file order, that parse_faculty_records
+        would yield (filtered by keep(f), a picklable function, if given).
+        processes=None uses every CPU; processes <= 1 parses in this process. """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, processes)
+    ranges = record_ranges(filename, processes * chunks_per_process)
+
+    if processes == 1:
+        chunks = [parse_byte_range(filename, start, stop, school_info, ranking, keep)
+                  for start, stop in ranges]
+    else:
+        worker_pool = multiprocessing.Pool(processes, _init_worker, (filename, school_info, ranking, keep))
+        try:
+            chunks = worker_pool.map(_parse_range, ranges, chunksize=1)
+        finally:
+            worker_pool.close()
+            worker_pool.join()
+
+    records = []
+    for chunk in chunks:
+        records.extend(chunk)
+    return records
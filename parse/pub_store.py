@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Consolidated, memory-mapped publication store.
+
+    One file holds the publications of every author (a DBLP or Google Scholar
+    id), replacing the per-person GSP_*.pkl / DBLP_*.pkl pickles.  Publications
+    are stored column-wise: year, pub_type, author_role and venue as integer
+    arrays (the strings interned in small vocabularies), titles in a shared
+    string heap, and whatever other fields a publication has (authors, notes,
+    ...) as a small pickle per publication.  Each author's publications are a
+    contiguous slice of those arrays.
+
+    The file is opened with mmap, so only the header (author keys, offsets,
+    vocabularies and stats) is read up front; publication data is paged in by
+    the OS for the authors actually accessed.
+
+    Example:
+        >>> write_publication_store('DBLP.pubs', [(key, pubs, stats), ...])
+        >>> store = PublicationStore('DBLP.pubs')
+        >>> pubs, stats = store[f['dblp']]      # Same lists of dicts as the pickles
+        >>> years = store.column(f['dblp'], 'year')  # Array view, nothing decoded
+"""
+
+import os
+import mmap
+import struct
+import tempfile
+import numpy as np
+try:
+   import cPickle as pickle
+except:
+   import pickle
+
+
+MAGIC = 'FHPUBS01'
+ALIGNMENT = 8
+MISSING = -1          # Code for a field a publication doesn't have
+MISSING_YEAR = np.iinfo(np.int32).min
+CODED_FIELDS = ('pub_type', 'author_role', 'venue')  # Strings stored as vocabulary codes
+COLUMN_FIELDS = ('title', 'year') + CODED_FIELDS
+
+
+def encode_text(text):
+    return text.encode('utf-8') if isinstance(text, unicode) else text
+
+
+def write_publication_store(filename, authors):
+    """ Write (key, publications, stats) triples to a store file.
+        publications is a list of dicts, as returned by parse_dblp_page
+        or parse_gs_page.  The file is replaced atomically. """
+    keys, stats, starts = [], [], [0]
+    vocabularies = dict((field, []) for field in CODED_FIELDS)
+    vocabulary_ids = dict((field, {}) for field in CODED_FIELDS)
+    years, titles, title_types, extras = [], [], [], []
+    codes = dict((field, []) for field in CODED_FIELDS)
+
+    for key, publications, author_stats in authors:
+        keys.append(key)
+        stats.append(author_stats)
+        for pub in publications:
+            years.append(pub.get('year', MISSING_YEAR))
+            title = pub.get('title', '')
+            title_types.append(isinstance(title, unicode))
+            titles.append(encode_text(title))
+            for field in CODED_FIELDS:
+                if field not in pub:
+                    codes[field].append(MISSING)
+                    continue
+                value = pub[field]
+                if value not in vocabulary_ids[field]:
+                    vocabulary_ids[field][value] = len(vocabularies[field])
+                    vocabularies[field].append(value)
+                codes[field].append(vocabulary_ids[field][value])
+            extra = dict((k, v) for k, v in pub.iteritems() if k not in COLUMN_FIELDS)
+            extras.append(pickle.dumps(extra, pickle.HIGHEST_PROTOCOL) if extra else '')
+        starts.append(len(years))
+
+    arrays = [('starts', np.array(starts, dtype=np.int64)),
+              ('year', np.array(years, dtype=np.int32)),
+              ('title_unicode', np.array(title_types, dtype=bool))]
+    arrays += [(field, np.array(codes[field], dtype=np.int32)) for field in CODED_FIELDS]
+    for name, strings in [('title', titles), ('extra', extras)]:
+        lengths = np.array([len(s) for s in strings], dtype=np.int64)
+        arrays.append((name + '_offsets', np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)))
+        heap = ''.join(strings)
+        arrays.append((name + '_heap', np.frombuffer(heap, dtype=np.uint8) if heap else np.zeros(0, np.uint8)))
+
+    # Header: where every array lives (relative to the end of the header)
+    layout, position = [], 0
+    for name, array in arrays:
+        position += -position % ALIGNMENT
+        layout.append((name, array.dtype.str, len(array), position))
+        position += array.nbytes
+    header = pickle.dumps({'keys': keys, 'stats': stats, 'vocabularies': vocabularies, 'layout': layout},
+                          pickle.HIGHEST_PROTOCOL)
+    header += ' ' * (-(len(header) + len(MAGIC) + 8) % ALIGNMENT)
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_filename = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'wb') as fp:
+        fp.write(MAGIC)
+        fp.write(struct.pack('<Q', len(header)))
+        fp.write(header)
+        start = fp.tell()
+        for (name, array), (name, dtype, count, offset) in zip(arrays, layout):
+            fp.write('\0' * (start + offset - fp.tell()))
+            fp.write(array.tostring())
+    os.rename(temp_filename, filename)
+
+
+class PublicationStore:
+    def __init__(self, filename):
+        self.filename = filename
+        self.fp = open(filename, 'rb')
+        if self.fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError('%s is not a publication store' % filename)
+        header_size, = struct.unpack('<Q', self.fp.read(8))
+        header = pickle.loads(self.fp.read(header_size))
+        data_start = self.fp.tell()
+
+        self.keys = header['keys']
+        self.stats = header['stats']
+        self.vocabularies = header['vocabularies']
+        self.key_ids = dict((key, k) for k, key in enumerate(self.keys))
+
+        self.mm = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.arrays = {}
+        for name, dtype, count, offset in header['layout']:
+            self.arrays[name] = np.frombuffer(self.mm, dtype=dtype, count=count, offset=data_start + offset)
+
+
+    def __len__(self):
+        return len(self.keys)
+
+
+    def __contains__(self, key):
+        return key in self.key_ids
+
+
+    def __getitem__(self, key):
+        """ (publications, stats) for an author, like the old per-person pickles """
+        return self.publications(key), self.author_stats(key)
+
+
+    def span(self, key):
+        """ [start, stop) of an author's publications in the column arrays """
+        k = self.key_ids[key]
+        starts = self.arrays['starts']
+        return int(starts[k]), int(starts[k+1])
+
+
+    def column(self, key, field):
+        """ Array view of one column (year, pub_type, author_role or venue)
+            for an author.  Coded fields are vocabulary ids, MISSING if absent. """
+        start, stop = self.span(key)
+        return self.arrays[field][start:stop]
+
+
+    def strings(self, name, start, stop):
+        offsets = self.arrays[name + '_offsets'][start:stop+1]
+        heap = self.arrays[name + '_heap']
+        return [heap[offsets[k]:offsets[k+1]].tostring() for k in xrange(stop - start)]
+
+
+    def titles(self, key):
+        start, stop = self.span(key)
+        is_unicode = self.arrays['title_unicode'][start:stop]
+        return [title.decode('utf-8') if u else title
+                for title, u in zip(self.strings('title', start, stop), is_unicode)]
+
+
+    def author_stats(self, key):
+        return self.stats[self.key_ids[key]]
+
+
+    def publications(self, key):
+        """ An author's publications as a list of dicts """
+        start, stop = self.span(key)
+        years = self.arrays['year'][start:stop]
+        codes = [(field, self.arrays[field][start:stop], self.vocabularies[field]) for field in CODED_FIELDS]
+        publications = []
+        for k, (title, extra) in enumerate(zip(self.titles(key), self.strings('extra', start, stop))):
+            pub = pickle.loads(extra) if extra else {}
+            pub['title'] = title
+            if years[k] != MISSING_YEAR:
+                pub['year'] = int(years[k])
+            for field, values, vocabulary in codes:
+                if values[k] != MISSING:
+                    pub[field] = vocabulary[values[k]]
+            publications.append(pub)
+        return publications
+
+
+    def close(self):
+        self.arrays = {}
+        try:
+            self.mm.close()
+        except BufferError:
+            pass  # Views are still held elsewhere; the map goes when they do
+        self.fp.close()
+
+
+def consolidate_publications(filename, directory, pkl_pattern, keys):
+    """ Gather the per-person pickles (pkl_pattern % key, holding the
+        publication list then the stats) in directory into one store """
+    def authors():
+        seen = set()
+        for key in keys:
+            if key in seen:
+                continue
+            seen.add(key)
+            pkl_file = os.path.join(directory, pkl_pattern % key)
+            if os.path.isfile(pkl_file):
+                with open(pkl_file, 'rb') as fp:
+                    publications = pickle.load(fp)
+                    yield key, publications, pickle.load(fp)
+    write_publication_store(filename, authors())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for the parsed-data cache. """
+
+from faculty_hiring.parse.data_cache import DataCache
+from faculty_hiring.parse import data_cache
+from test_parsing import get_test_records, get_test_universities
+from unittest import TestCase, main
+import tempfile
+import shutil
+import os
+
+
+class tests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.inst_file = os.path.join(self.dir, 'inst.txt')
+        self.fac_file = os.path.join(self.dir, 'faculty.txt')
+        with open(self.inst_file, 'w') as fp:
+            fp.write(get_test_universities().getvalue())
+        with open(self.fac_file, 'w') as fp:
+            fp.write(get_test_records().getvalue())
+        self.cache = DataCache(os.path.join(self.dir, 'cache'))
+        self.calls = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_reuse_and_invalidate(self):
+        self.assertEqual(self.cache.get('test', [self.inst_file], (1,), self.compute), 1)
+        self.assertEqual(DataCache(self.cache.cache_dir).get('test', [self.inst_file], (1,), self.compute), 1)
+        self.assertEqual(self.cache.get('test', [self.inst_file], (2,), self.compute), 2)  # New args
+
+        with open(self.inst_file, 'a') as fp:
+            fp.write('\n')
+        os.utime(self.inst_file, (0, 0))
+        self.assertEqual(self.cache.get('test', [self.inst_file], (1,), self.compute), 3)
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 3)  # Stale entry removed, plus digests
+
+        data_cache.FORMAT_VERSION += 1  # e.g., faculty_record's slots changed
+        try:
+            self.assertEqual(self.cache.get('test', [self.inst_file], (1,), self.compute), 4)
+            self.assertEqual(len(os.listdir(self.cache.cache_dir)), 3)
+        finally:
+            data_cache.FORMAT_VERSION -= 1
+
+    def test_loaders(self):
+        inst = self.cache.institutions(self.inst_file)
+        self.assertEqual(inst['MIT']['Region'], 'Northeast')
+        records = self.cache.faculty_records(self.fac_file, self.inst_file)
+        records = self.cache.faculty_records(self.fac_file, self.inst_file)
+        self.assertEqual(records[0].facultyName, 'Joe Shmoe')
+        self.assertEqual(records[0].phd_rank, inst['Stanford University']['pi_rescaled'])
+        candidate_pools, job_pools, job_ranks, year_range = \
+            self.cache.assistant_prof_pools(self.fac_file, self.inst_file, year_start=1990, year_stop=2010)
+        self.assertEqual(sum(len(pool) for pool in job_pools), 1)
+        self.assertEqual(job_pools[year_range.tolist().index(2000)], ['MIT'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for the columnar faculty table. """
+
+from faculty_hiring.parse.faculty_table import load_faculty_table, MISSING
+from faculty_hiring.parse.faculty_parser import parse_faculty_records
+from faculty_hiring.parse.institution_parser import parse_institution_records
+from test_parsing import get_test_records, get_test_universities
+from unittest import TestCase, main
+import numpy as np
+
+
+class tests(TestCase):
+    def setUp(self):
+        self.inst = parse_institution_records(get_test_universities())
+        self.inst['UNKNOWN'] = {'pi': 10., 'pi_rescaled': 0., 'Region': 'Earth'}
+        self.table = load_faculty_table(get_test_records(), self.inst)
+        self.records = list(parse_faculty_records(get_test_records(), self.inst))
+
+    def test_columns(self):
+        table = self.table
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.place_name(table.phd_place[0]), 'Stanford University')
+        self.assertEqual(table.place_name(table.first_asst_job_place[0]), 'MIT')
+        self.assertEqual(table.first_asst_job_year[0], 2000)
+        self.assertEqual(table.phd_year[1], MISSING)
+        self.assertEqual(table.first_asst_job_place[1], MISSING)
+        self.assertTrue(table.has_postdoc[0])
+        self.assertFalse(table.is_female.any())
+        self.assertTrue(np.isnan(table.dblp_z).all())
+        self.assertEqual(table.phd_rank[0], self.inst['Stanford University']['pi_rescaled'])
+        self.assertEqual(table.first_asst_job_rank[1], self.inst['UNKNOWN']['pi_rescaled'])
+        self.assertEqual(table.assistant_profs().tolist(), [True, False])
+
+    def test_records_on_demand(self):
+        for f, g in zip(self.records, self.table.records()):
+            self.assertEqual(f.facultyName, g.facultyName)
+            self.assertEqual(f.education, g.education)
+            self.assertEqual(f.faculty, g.faculty)
+            self.assertEqual(f.phd_rank, g.phd_rank)
+        self.assertEqual(self.table.record(1).facultyName, 'Bob Roberts')
+
+
+if __name__ == '__main__':
+    main()
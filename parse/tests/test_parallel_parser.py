@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for parallel parsing of faculty record files. """
+
+from faculty_hiring.parse.parallel_parser import parse_faculty_records_parallel, record_ranges
+from faculty_hiring.parse.faculty_parser import parse_faculty_records
+from faculty_hiring.parse.institution_parser import parse_institution_records
+from test_parsing import get_test_records, get_test_universities
+from unittest import TestCase, main
+import tempfile
+import os
+
+
+class tests(TestCase):
+    def setUp(self):
+        self.inst = parse_institution_records(get_test_universities())
+        text = get_test_records().getvalue()
+        fd, self.filename = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as fp:
+            for k in xrange(25):
+                fp.write(text.replace('Joe Shmoe', 'Joe Shmoe %d' % k))
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_record_ranges(self):
+        ranges = record_ranges(self.filename, 7)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.filename))
+        with open(self.filename, 'rb') as fp:
+            for (start, stop), (next_start, next_stop) in zip(ranges[:-1], ranges[1:]):
+                self.assertEqual(stop, next_start)
+                fp.seek(next_start)
+                self.assertTrue(fp.readline().startswith('>>>'))
+
+    def test_same_records(self):
+        expected = [f.fields() for f in parse_faculty_records(open(self.filename, 'rU'), self.inst)]
+        for processes in (0, -1, 1, 2):  # Non-positive counts parse in this process
+            records = parse_faculty_records_parallel(self.filename, self.inst, processes=processes,
+                                                     chunks_per_process=3)
+            self.assertEqual([f.fields() for f in records], expected)
+
+    def test_line_endings(self):
+        text = open(self.filename, 'rb').read()
+        for newline in ('\r\n', '\r'):
+            with open(self.filename, 'wb') as fp:
+                fp.write(text.replace('\n', newline))
+            expected = [f.fields() for f in parse_faculty_records(open(self.filename, 'rU'), self.inst)]
+            self.assertEqual(len(expected), 50)
+            for processes in (1, 2):
+                records = parse_faculty_records_parallel(self.filename, self.inst, processes=processes,
+                                                         chunks_per_process=3)
+                self.assertEqual([f.fields() for f in records], expected)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,10 +9,14 @@ __status__ = "Development"
 
 """ Unit tests for faculty network parsing. """
 
-from faculty_hiring.parse.faculty_parser import parse_faculty_records
-from faculty_hiring.parse.institution_parser import parse_institution_records
+from faculty_hiring.parse.faculty_parser import parse_faculty_records, parse_faculty_records_by_line, \
+    read_record_blocks
+from faculty_hiring.parse.institution_parser import parse_institution_records, InstitutionIndex, \
+    institution_index
+from faculty_hiring.misc.scoring import rank_table
 from faculty_hiring.parse.pub_parser import parse_pub_records
 from StringIO import StringIO
+import pickle
 from unittest import TestCase, main
 
 def get_test_records():
@@ -68,6 +72,104 @@ def get_test_records():
 # recordDate  : 10/6/2011""")
 
 
+def get_varied_records():
+    """ Records off the usual layout: spacing, fields out of order, blank
+        lines and colons inside entries, '.' values, unknown fields and an
+        incomplete entry """ 
+    return StringIO(
+"""
+>>> record 3
+#   facultyName :  Ann  Lee  
+# email : al@x.edu
+# sex : F
+# nickname : Annie
+# dblp_z : -0.5
+# place : Somewhere: Campus
+# current : Assistant Professor
+# [Education]
+# place : MIT
+# degree : PhD
+# years : 1990-1995
+# field : Physics: Theory
+# [Faculty]
+# rank : Assistant Professor
+
+# place : .
+# years : 1996-2001
+# [Faculty]
+# rank : PostDoc
+# place : Caltech
+# years : 1995-1996
+# [Faculty]
+# rank : Associate Professor
+  >>> record 4
+# facultyName : Raj Patel
+# sex : M
+# [Education]
+# degree      : MS
+# place       : .
+# field       : Math: Applied
+# years       : 1980-????
+# [Education]
+# degree      : PhD
+# place       :   UC Berkeley   
+# field       : Math
+# years       : 1982-1987
+# [Faculty]
+# rank        : Assistant Professor
+# place       : UC Berkeley
+# years       : 1987-1990
+# [Faculty]
+# rank        : Assistant Professor
+# place       : Stanford University
+# years       : 1986-1987
+# dblp_z      : 1.25
+# recordDate  : 1/2/2011""")
+
+
+# What the original line-based parser made of get_varied_records()
+VARIED_RECORDS = [
+    {'current': 'Assistant Professor', 'dblp_z': -0.5, 'email': 'al@x.edu', 'facultyName': 'Ann  Lee',
+     'place': 'Somewhere: Campus', 'sex': 'F',
+     'education': [{'degree': 'PhD', 'place': 'MIT', 'field': 'Physics Theory', 'years': '1990-1995',
+                    'start_year': 1990, 'end_year': 1995}],
+     'faculty': [{'rank': 'Assistant Professor', 'place': None, 'years': '1996-2001',
+                  'start_year': 1996, 'end_year': 2001},
+                 {'rank': 'PostDoc', 'place': 'Caltech', 'years': '1995-1996',
+                  'start_year': 1995, 'end_year': 1996}],
+     'first_asst_job_location': None, 'first_asst_job_year': 1996, 'first_job_location': None,
+     'first_job_year': 2001, 'has_postdoc': True, 'is_female': True, 'num_asst_jobs': 1, 
+     'num_asst_jobs_kd': 1, 'phd_location': 'MIT', 'phd_year': 1995},
+    {'dblp_z': 1.25, 'facultyName': 'Raj Patel', 'recordDate': '1/2/2011', 'sex': 'M',
+     'education': [{'degree': 'MS', 'place': None, 'field': 'Math Applied', 'years': '1980-????',
+                    'start_year': 1980, 'end_year': None},
+                   {'degree': 'PhD', 'place': 'UC Berkeley', 'field': 'Math', 'years': '1982-1987',
+                    'start_year': 1982, 'end_year': 1987}],
+     'faculty': [{'rank': 'Assistant Professor', 'place': 'UC Berkeley', 'years': '1987-1990',
+                  'start_year': 1987, 'end_year': 1990},
+                 {'rank': 'Assistant Professor', 'place': 'Stanford University', 'years': '1986-1987',
+                  'start_year': 1986, 'end_year': 1987}],
+     'first_asst_job_location': 'Stanford University', 'first_asst_job_year': 1986, 
+     'first_job_location': 'UC Berkeley', 'first_job_year': 1990, 'has_postdoc': False, 'is_female': False,
+     'num_asst_jobs': 2, 'num_asst_jobs_kd': 2, 'phd_location': 'UC Berkeley', 'phd_year': 1987}]
+
+
+def institution_rank(inst, place, ranking='pi'):
+    """ Rank of an institution, falling back on UNKNOWN (as the scoring code did) """ 
+    try:
+        return inst[place][ranking]
+    except:
+        return inst['UNKNOWN'][ranking]
+
+
+def record_values(f):
+    """ Fields of a record, with entries as dictionaries """ 
+    values = f.fields()
+    for key in ('education', 'faculty'):
+        values[key] = [dict(entry.items()) for entry in values[key]]
+    return values
+
+
 def get_test_universities():
     return StringIO(
 """
@@ -120,6 +222,50 @@ class parsing_tests(TestCase):
         self.assertEqual(second_record.education[0]['place'], 'University of New Mexico') 
         self.assertEqual(second_record.faculty[1]['rank'], 'Emeritus') 
 
+    def test_record_fields(self):
+        f = parse_faculty_records(get_test_records()).next()
+        self.assertTrue('email' in f)
+        self.assertFalse('gs' in f)
+        self.assertRaises(KeyError, f.__getitem__, 'gs')
+        self.assertEqual(f.faculty[1][1], 'MIT')
+        self.assertEqual(f.faculty[1].get('field'), None)
+
+        f['gs_pubs'] = []  # Ad-hoc fields go in the extension mapping
+        f.first_asst_job_papers = 3
+        self.assertTrue('gs_pubs' in f)
+        self.assertEqual(f.first_asst_job_papers, 3)
+        self.assertEqual(f['first_asst_job_papers'], 3)
+
+        for protocol in (0, pickle.HIGHEST_PROTOCOL):
+            g = pickle.loads(pickle.dumps(f, protocol))
+            self.assertEqual(g.education, f.education)
+            self.assertEqual(g.phd(), f.phd())
+            self.assertEqual(g['gs_pubs'], [])
+
+    def test_block_parser(self):
+        varied = get_varied_records().getvalue()
+        for block_size in (5, 64, 2**20):
+            records = parse_faculty_records(StringIO(varied), block_size=block_size)
+            self.assertEqual([record_values(f) for f in records], VARIED_RECORDS)
+        records = parse_faculty_records_by_line(StringIO(varied))
+        self.assertEqual([record_values(f) for f in records], VARIED_RECORDS)
+
+        text = get_test_records().getvalue()
+        messy = text.replace('\n# ', '\n  # ').replace('>>>', ' >>>').replace('\n', ' \r\n\n')
+        expected = [record_values(f) for f in parse_faculty_records(StringIO(text))]  # See test_parse
+        for source in (text, messy):
+            for block_size in (5, 64, 2**20):
+                records = parse_faculty_records(StringIO(source), block_size=block_size)
+                self.assertEqual([record_values(f) for f in records], expected)
+
+            for block_size in (5, 2**20):
+                for offset, record_text in read_record_blocks(StringIO(source), block_size):
+                    self.assertEqual(source[offset:].lstrip(' ')[:3], '>>>')
+                    self.assertTrue(source[offset:].split('\n', 1)[1].startswith(record_text))
+
+        bad = text.replace('# email', 'email')
+        self.assertRaises(ValueError, list, parse_faculty_records(StringIO(bad)))
+
     def test_uni_parse(self):
         X = get_test_universities()
         institutions = parse_institution_records(X)
@@ -131,6 +277,35 @@ class parsing_tests(TestCase):
         self.assertEqual(institutions['Stanford University']['pi_rescaled'], 1.)
         self.assertEqual(institutions['MIT']['u'], 3)
 
+    def test_institution_index(self):
+        institutions = parse_institution_records(get_test_universities())
+        index = InstitutionIndex(institutions)
+        self.assertEqual(len(index), len(institutions))
+        self.assertEqual(index.names[index.unknown], 'UNKNOWN')
+        self.assertEqual(index['Yale University'], institutions['Yale University'])
+        self.assertTrue('MIT' in index and 'Nowhere' not in index)
+
+        names = ['Yale University', 'Nowhere', 'Harvard University', 'UNKNOWN']
+        ids = index.lookup(names)
+        self.assertEqual(ids[1], index.unknown)
+        self.assertEqual(index.lookup(names, missing=-1)[1], -1)
+        self.assertEqual(list(index.known(ids)), [True, False, True, False])
+        for ranking in ['pi', 'pi_inv', 'pi_rescaled']:
+            expected = [institution_rank(institutions, name, ranking) for name in names]
+            self.assertEqual(list(index.rank(ids, ranking)), expected)
+        self.assertEqual(list(index.Region[ids]), ['Northeast', 'Earth', 'Northeast', 'Earth'])
+        self.assertTrue(institution_index(index) is index)
+
+        # Without an UNKNOWN record, missing names need an explicit id
+        del institutions['UNKNOWN']
+        index = InstitutionIndex(institutions)
+        self.assertEqual(index.unknown, None)
+        self.assertEqual(list(index.known(index.lookup(names[:3], missing=-1))), [True, False, True])
+        self.assertRaises(KeyError, index.lookup, names[:3])
+        self.assertRaises(KeyError, index.id, 'Nowhere')
+        self.assertRaises(ValueError, rank_table, index)
+        self.assertEqual(rank_table(index, worst_rank=100.)[-1], 100.)
+
     def test_pub_parse(self):
         records = parse_pub_records('./pub_test/faclist.txt', './pub_test/')
         self.assertEqual(records['Per Son'][0]['Title'], 'TESTING_TITLE0')
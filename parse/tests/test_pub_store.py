@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for the consolidated publication store. """
+
+from faculty_hiring.parse.pub_store import PublicationStore, write_publication_store, \
+    consolidate_publications, MISSING
+from faculty_hiring.parse.load import load_all_publications, set_publication_cache_size, DBLP_PKL, DBLP_STORE
+from faculty_hiring.parse.faculty_parser import faculty_record
+import faculty_hiring.parse.load as load
+from faculty_hiring.parse.dblp import parse_dblp_page
+from faculty_hiring.parse.google_scholar import parse_gs_page
+from unittest import TestCase, main
+import tempfile
+import shutil
+import pickle
+import os
+
+
+class tests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dblp = parse_dblp_page(open('./dblp/test.html').read())
+        self.gs = parse_gs_page(open('./gs/test.html').read())
+        for k, pub in enumerate(self.dblp[0]):
+            pub['author_role'] = ['FAP', 'MAP', 'LAP'][k % 3]
+        del self.dblp[0][1]['venue']
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        filename = os.path.join(self.temp_dir, 'test.pubs')
+        write_publication_store(filename, [('dblp', self.dblp[0], self.dblp[1]), ('none', [], None),
+                                           ('gs', self.gs[0], self.gs[1])])
+        store = PublicationStore(filename)
+        self.assertEqual(len(store), 3)
+        self.assertTrue('gs' in store and 'other' not in store)
+        self.assertEqual(store['dblp'], self.dblp)
+        self.assertEqual(store['gs'], self.gs)
+        self.assertEqual(store['none'], ([], None))
+
+        self.assertEqual(list(store.column('gs', 'year')), [pub['year'] for pub in self.gs[0]])
+        self.assertEqual(store.titles('dblp'), [pub['title'] for pub in self.dblp[0]])
+        venues = store.column('dblp', 'venue')
+        self.assertEqual(venues[1], MISSING)
+        self.assertEqual(store.vocabularies['venue'][venues[0]], self.dblp[0][0]['venue'])
+        self.assertTrue(all(store.column('gs', 'pub_type') == MISSING))
+        store.close()
+
+    def test_load_all_publications(self):
+        faculty = [{'dblp': 'a'}, {'dblp': 'b'}, {}]
+        for key, pubs in [('a', self.dblp[0]), ('b', self.dblp[0][:3])]:
+            with open(os.path.join(self.temp_dir, DBLP_PKL % key), 'wb') as fp:
+                pickle.dump(pubs, fp)
+                pickle.dump({'key': key}, fp)
+        load_all_publications(faculty, dblp_dir=self.temp_dir)
+        expected = [dict(f) for f in faculty]
+
+        consolidate_publications(os.path.join(self.temp_dir, DBLP_STORE), self.temp_dir, DBLP_PKL, 'aba')
+        for name in os.listdir(self.temp_dir):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.temp_dir, name))
+        faculty = [{'dblp': 'a'}, {'dblp': 'b'}, {}]
+        load_all_publications(faculty, dblp_dir=self.temp_dir)
+        self.assertEqual(faculty, expected)
+
+        # Authors scraped after consolidation still come from their pickles
+        with open(os.path.join(self.temp_dir, DBLP_PKL % 'c'), 'wb') as fp:
+            pickle.dump(self.dblp[0][:2], fp)
+            pickle.dump({'key': 'c'}, fp)
+        faculty = [{'dblp': 'a'}, {'dblp': 'c'}]
+        load_all_publications(faculty, dblp_dir=self.temp_dir)
+        self.assertEqual(faculty[0], expected[0])
+        self.assertEqual(faculty[1]['dblp_pubs'], self.dblp[0][:2])
+
+    def test_lazy_loading(self):
+        for key, pubs in [('a', self.dblp[0]), ('b', self.dblp[0][:3])]:
+            with open(os.path.join(self.temp_dir, DBLP_PKL % key), 'wb') as fp:
+                pickle.dump(pubs, fp)
+                pickle.dump({'key': key}, fp)
+        faculty = []
+        for key in 'ab':
+            f = faculty_record.__new__(faculty_record)
+            f.extra = None
+            f['dblp'] = key
+            faculty.append(f)
+
+        set_publication_cache_size(1)
+        load_all_publications(faculty, dblp_dir=self.temp_dir, lazy=True)
+        self.assertEqual(len(load._publication_cache), 0)  # Nothing read yet
+        self.assertTrue('dblp_pubs' in faculty[0] and 'gs_pubs' not in faculty[0])
+
+        self.assertEqual(faculty[1]['dblp_pubs'], self.dblp[0][:3])
+        self.assertEqual(faculty[0].dblp_pubs, self.dblp[0])
+        self.assertEqual(faculty[0].dblp_stats, {'key': 'a'})
+        self.assertEqual(len(load._publication_cache), 1)  # 'b' was evicted
+        self.assertEqual(faculty[1].fields()['dblp_stats'], {'key': 'b'})
+
+        g = pickle.loads(pickle.dumps(faculty[0], pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(g['dblp_pubs'], self.dblp[0])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Unit tests for splitting faculty into year pools. """
+
+from faculty_hiring.parse.load import split_faculty_by_year, year_bins
+from faculty_hiring.misc.util import Struct
+from unittest import TestCase, main
+import numpy as np
+
+
+class tests(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.faculty = [Struct(first_asst_job_year=int(year), first_asst_job_location='U%d' % k,
+                               first_asst_job_rank=float(k), phd_rank=float(k) / 2)
+                        for k, year in enumerate(rng.randint(1965, 2015, size=200))]
+        self.faculty[3].first_asst_job_year = None
+
+    def expected_pool(self, start, stop):
+        return [f for f in self.faculty 
+                if f.first_asst_job_year is not None and start <= f.first_asst_job_year < stop]
+
+    def check_pools(self, pools, bins):
+        candidate_pools, job_pools, job_ranks, year_range = pools
+        self.assertEqual(list(year_range), [start for start, stop in bins])
+        for k, (start, stop) in enumerate(bins):
+            expected = self.expected_pool(start, stop)
+            self.assertEqual([c[0] for c in candidate_pools[k]], expected)
+            self.assertEqual([c[1] for c in candidate_pools[k]], [f.phd_rank for f in expected])
+            self.assertEqual(job_pools[k], [f.first_asst_job_location for f in expected])
+            self.assertEqual(job_ranks[k], [f.first_asst_job_rank for f in expected])
+
+    def test_single_years(self):
+        self.check_pools(split_faculty_by_year(self.faculty, 1970, 2012), 
+                         [(year, year + 1) for year in xrange(1970, 2012)])
+
+    def test_steps_and_windows(self):
+        self.assertEqual(year_bins(1970, 1990, 5), [(1970, 1975), (1975, 1980), (1980, 1985), (1985, 1990)])
+        self.assertEqual(year_bins(1970, 1980, 3, window=5), [(1970, 1975), (1973, 1978), (1976, 1980), 
+                                                              (1979, 1980)])
+        self.check_pools(split_faculty_by_year(self.faculty, 1970, 2012, year_step=5), 
+                         year_bins(1970, 2012, 5))
+        self.check_pools(split_faculty_by_year(self.faculty, 1970, 2012, year_step=2, window=6), 
+                         year_bins(1970, 2012, 2, 6))
+        self.assertRaises(ValueError, year_bins, 1970, 2012, 0)
+
+    def test_custom_bins(self):
+        bins = [(1960, 1980), (1975, 1976), (1990, 2020)]
+        self.check_pools(split_faculty_by_year(self.faculty, None, None, bins=bins), bins)
+
+
+if __name__ == '__main__':
+    main()
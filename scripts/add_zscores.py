@@ -13,9 +13,9 @@ import string
 import re
 import os
 import numpy as np
-from faculty_hiring.parse.load import load_assistant_profs
 from faculty_hiring.parse import faculty_parser, institution_parser
 from faculty_hiring.parse import load
+from faculty_hiring.parse.data_cache import DataCache
 
 
 def interface():
@@ -186,8 +186,9 @@ def add_counts_to_file(faculty, in_file, out_file):
 if __name__=="__main__":
     args = interface()
     
-    inst = institution_parser.parse_institution_records(open(args.inst_file))
-    faculty = load_assistant_profs(open(args.faculty_file, 'rU'), inst)
+    cache = DataCache()
+    inst = cache.institutions(args.inst_file)
+    faculty = cache.assistant_profs(args.faculty_file, args.inst_file)
     load.load_all_publications(faculty, args.dblp_dir, gs_dir=None)
     dists, tots = get_paper_counts_by_topic(faculty)
     means, stds = get_topic_means_stds(dists, tots)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+""" Time each stage of the loading + modeling pipeline.
+
+    Results (seconds, throughput and peak memory per stage) are written as 
+    JSON so runs can be compared across commits.  Pair with 
+    generate_synthetic_data.py to benchmark at arbitrary sizes:
+
+        python generate_synthetic_data.py -f fac.txt -i inst.txt -n 100000 -u 1000
+        python benchmark.py -f fac.txt -i inst.txt -o bench.json
+"""
+
+import os
+import json
+import time
+import platform
+import shutil
+import resource
+import argparse
+import tempfile
+import numpy as np
+from faculty_hiring.parse.load import load_assistant_prof_pools
+from faculty_hiring.parse.faculty_parser import parse_faculty_records, parse_faculty_records_by_line
+from faculty_hiring.parse.parallel_parser import parse_faculty_records_parallel
+from faculty_hiring.parse.institution_parser import parse_institution_records
+from faculty_hiring.parse.data_cache import DataCache
+from faculty_hiring.models.simulation_engine import SimulationEngine
+from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.misc.hiring_orders import prepare_hiring_orders
+
+
+def interface():
+    args = argparse.ArgumentParser()
+    args.add_argument('-f', '--fac-file', help='Faculty file', required=True)
+    args.add_argument('-i', '--inst-file', help='Institutions file', required=True)
+    args.add_argument('-o', '--output-file', help='Output (JSON) file', required=True)
+    args.add_argument('-p', '--prob-function', help='Candidate probability/matching function', default='rd_pr_gg')
+    args.add_argument('-n', '--num-iters', help='Number of simulation iterations', default=10, type=int)
+    args.add_argument('-r', '--num-orders', help='Number of hiring orders for the likelihood', default=10, type=int)
+    args.add_argument('-b', '--batch', help='Run Monte Carlo replicates as one batch', action='store_true')
+    args.add_argument('-j', '--processes', help='Number of worker processes', default=1, type=int)
+    args.add_argument('-s', '--seed', help='Random seed', default=0, type=int)
+    args = args.parse_args()
+    return args
+
+
+def peak_memory_mb():
+    """ Peak resident set size of this process so far (Linux reports KB) """ 
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+
+def run_stage(results, stage, func, count=None, megabytes=None):
+    """ Time func(), log the stage and return func's result.
+        count(result) gives the number of items processed, for throughput. """ 
+    start = time.time()
+    value = func()
+    seconds = time.time() - start
+
+    result = {'stage': stage, 'seconds': seconds, 'peak_rss_mb': peak_memory_mb()}
+    if count is not None:
+        result['items'] = count(value)
+        result['items_per_sec'] = result['items'] / seconds if seconds > 0 else None
+    if megabytes is not None:
+        result['megabytes'] = megabytes
+        result['mb_per_sec'] = megabytes / seconds if seconds > 0 else None
+    results.append(result)
+
+    print '%-30s %10.3fs %12s items/s %8s MB/s %10.1f MB peak' % (stage, seconds, 
+        '%.1f' % result['items_per_sec'] if count and seconds > 0 else '-', 
+        '%.2f' % result['mb_per_sec'] if megabytes and seconds > 0 else '-',
+        result['peak_rss_mb'])
+    return value
+
+
+def faculty_file_mb(fac_file):
+    return os.path.getsize(fac_file) / 2.**20
+
+
+if __name__=="__main__":
+    args = interface()
+    np.random.seed(args.seed)
+    stages = []
+
+    inst = run_stage(stages, 'parse_institution_records',
+                     lambda: parse_institution_records(open(args.inst_file, 'rU')), count=len)
+
+    run_stage(stages, 'parse_faculty_records_by_line',
+              lambda: list(parse_faculty_records_by_line(open(args.fac_file, 'rU'), inst, 'pi_rescaled')), 
+              count=len, megabytes=faculty_file_mb(args.fac_file))
+
+    run_stage(stages, 'parse_faculty_records',
+              lambda: list(parse_faculty_records(open(args.fac_file, 'rU'), inst, 'pi_rescaled')), 
+              count=len, megabytes=faculty_file_mb(args.fac_file))
+
+    run_stage(stages, 'parse_faculty_records_parallel',
+              lambda: parse_faculty_records_parallel(args.fac_file, inst, 'pi_rescaled', processes=args.processes), 
+              count=len, megabytes=faculty_file_mb(args.fac_file))
+
+    candidate_pools, job_pools, job_ranks, year_range = run_stage(stages, 'load_assistant_prof_pools',
+        lambda: load_assistant_prof_pools(open(args.fac_file, 'rU'), school_info=inst, ranking='pi_rescaled',
+                                          year_start=1970, year_stop=2012, year_step=1),
+        count=lambda pools: sum(len(p) for p in pools[0]), megabytes=faculty_file_mb(args.fac_file))
+    num_jobs = sum(len(pool) for pool in job_pools)
+
+    cache_dir = tempfile.mkdtemp()
+    for stage in ['data_cache_cold', 'data_cache_warm']:
+        run_stage(stages, stage, 
+                  lambda: DataCache(cache_dir).assistant_prof_pools(args.fac_file, args.inst_file, ranking='pi_rescaled',
+                                                                    year_start=1970, year_stop=2012, year_step=1),
+                  count=lambda pools: sum(len(p) for p in pools[0]), megabytes=faculty_file_mb(args.fac_file))
+    shutil.rmtree(cache_dir)
+
+    model = SigmoidModel(prob_function=args.prob_function)
+    weights = np.ones(model.num_weights())
+    simulator = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, iters=args.num_iters,
+                                 batch=args.batch, processes=args.processes)
+    run_stage(stages, 'simulate', lambda: simulator.simulate(weights=weights, quiet=True),
+              count=lambda error: args.num_iters * num_jobs)
+    simulator.close()
+
+    hiring_orders, hiring_log_probs = run_stage(stages, 'prepare_hiring_orders',
+        lambda: prepare_hiring_orders(job_pools, job_ranks, args.num_orders),
+        count=lambda orders: args.num_orders * num_jobs)
+
+    simulator = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model,
+                                 hiring_orders=hiring_orders, hiring_log_probs=hiring_log_probs)
+    run_stage(stages, 'neg_log_likelihood', 
+              lambda: simulator.calculate_neg_log_likelihood(weights=weights, verbose=False),
+              count=lambda value: args.num_orders * num_jobs)
+
+    output = {'fac_file': args.fac_file,
+              'inst_file': args.inst_file,
+              'fac_file_mb': faculty_file_mb(args.fac_file),
+              'num_institutions': len(inst) - 1,  # Not counting UNKNOWN
+              'num_pools': len(job_pools),
+              'num_jobs': num_jobs,
+              'prob_function': args.prob_function,
+              'num_iters': args.num_iters,
+              'num_orders': args.num_orders,
+              'batch': args.batch,
+              'processes': args.processes,
+              'python': platform.python_version(),
+              'numpy': np.__version__,
+              'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'stages': stages}
+    with open(args.output_file, 'w') as fp:
+        json.dump(output, fp, indent=2, sort_keys=True)
@@ -12,8 +12,7 @@ import argparse
 import numpy as np
 import cProfile
 from scipy.optimize import minimize
-from faculty_hiring.parse.load import load_assistant_prof_pools
-from faculty_hiring.parse.institution_parser import parse_institution_records
+from faculty_hiring.parse.data_cache import DataCache
 from faculty_hiring.models.simulation_engine import SimulationEngine
 from faculty_hiring.models.null_models import ConfigurationModel, BestFirstModel
 from faculty_hiring.models.sigmoid_models import SigmoidModel
@@ -39,13 +38,13 @@ def interface():
 if __name__=="__main__":
     args = interface()
     
-    inst = parse_institution_records(open(args.inst_file, 'rU'))
-    candidate_pools, job_pools, job_ranks, year_range = load_assistant_prof_pools(open(args.fac_file), 
-                                                                                  school_info=inst, 
-                                                                                  ranking='pi_rescaled',
-                                                                                  year_start=1970, 
-                                                                                  year_stop=2012, 
-                                                                                  year_step=1)
+    cache = DataCache()
+    inst = cache.institutions(args.inst_file)
+    candidate_pools, job_pools, job_ranks, year_range = cache.assistant_prof_pools(args.fac_file, args.inst_file,
+                                                                                   ranking='pi_rescaled',
+                                                                                   year_start=1970, 
+                                                                                   year_stop=2012, 
+                                                                                   year_step=1)
 
     if args.validation:  # if specified years are to be evaluated
         hold_out = [int(year) for year in args.validation.split(',')]
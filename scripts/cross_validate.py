@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+
+import argparse
+import numpy as np
+import pandas as pd
+from faculty_hiring.parse.data_cache import DataCache
+from faculty_hiring.models.simulation_engine import SimulationEngine
+from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.models.sigmoid_prob_functions import SIGMOID_TERMS
+from faculty_hiring.models.cross_validation import cross_validate, year_folds, held_out_fold, summarize
+from faculty_hiring.models.optimizer import normal_starts
+from faculty_hiring.misc.hiring_orders import load_hiring_order_set
+
+
+def interface():
+    args = argparse.ArgumentParser()
+    args.add_argument('-f', '--fac-file', help='Faculty file', required=True)
+    args.add_argument('-i', '--inst-file', help='Institutions file', required=True)
+    args.add_argument('-p', '--prob-functions', help='Comma-separated prob functions to compare (or "all")', 
+                      required=True)
+    args.add_argument('-k', '--num-folds', help='Number of folds (of consecutive years)', default=5, type=int)
+    args.add_argument('-v', '--validation', help='Instead of k folds, hold out only these years', default='')
+    args.add_argument('-x', '--shuffle', help='Folds of randomly chosen years', action='store_true')
+    args.add_argument('-o', '--hiring-orders-file', help='Hiring order set file (pkl); if given, fit the '
+                                                         'likelihood instead of the placement error', default=None)
+    args.add_argument('-n', '--num-iters', help='Number of iterations to est. error', default=100, type=int)
+    args.add_argument('-s', '--num-steps', help='Number of steps allowed', default=50, type=int)
+    args.add_argument('-t', '--num-starts', help='Number of random starts', default=20, type=int)
+    args.add_argument('-l', '--num-local', help='Number of local searches (from the best starts)', 
+                      default=1, type=int)
+    args.add_argument('-r', '--reg', help='Regularization amount', default=1e-6, type=float)
+    args.add_argument('-b', '--batch', help='Run Monte Carlo replicates as one batch', action='store_true')
+    args.add_argument('-c', '--crn-seed', help='Reuse fixed random streams (common random numbers) '
+                                               'with this seed', default=None, type=int)
+    args.add_argument('-j', '--processes', help='Number of folds fit at once', default=1, type=int)
+    args.add_argument('-O', '--output-file', help='Write the per-fold results (csv)', default=None)
+    args = args.parse_args()
+    return args
+
+
+if __name__=="__main__":
+    args = interface()
+
+    cache = DataCache()
+    inst = cache.institutions(args.inst_file)
+    candidate_pools, job_pools, job_ranks, year_range = cache.assistant_prof_pools(args.fac_file, args.inst_file,
+                                                                                   ranking='pi_rescaled',
+                                                                                   year_start=1970, 
+                                                                                   year_stop=2012, 
+                                                                                   year_step=1)
+    hiring_orders, hiring_log_probs = None, None
+    settings = {'objective': 'simulate', 'screen_iters': 20, 'options': {'maxiter': args.num_steps}}
+    if args.hiring_orders_file:
+        hiring_orders, hiring_log_probs = load_hiring_order_set(args.hiring_orders_file)
+        settings = {'objective': 'calculate_neg_log_likelihood', 'options': {'maxiter': args.num_steps}}
+
+    if args.validation:
+        folds = held_out_fold(year_range, [int(year) for year in args.validation.split(',')])
+    else:
+        folds = year_folds(year_range, args.num_folds, args.shuffle)
+
+    if args.prob_functions == 'all':
+        prob_functions = sorted(SIGMOID_TERMS)
+    else:
+        prob_functions = args.prob_functions.split(',')
+
+    all_results, summaries = [], []
+    for prob_function in prob_functions:
+        model = SigmoidModel(prob_function=prob_function)
+        engine = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, power=1, reg=args.reg, 
+                                  iters=args.num_iters, hiring_orders=hiring_orders, hiring_log_probs=hiring_log_probs,
+                                  batch=args.batch, crn_seed=args.crn_seed)
+        starts = normal_starts(args.num_starts, model.num_weights())
+        results = cross_validate(engine, folds, starts, args.processes, year_range, num_local=args.num_local,
+                                 **settings)
+        results.insert(0, 'prob_function', prob_function)
+        all_results.append(results)
+        summary = summarize(results)
+        summary['prob_function'] = prob_function
+        summaries.append(summary)
+        print prob_function, '\t', summary['test_error'], '+/-', summary['test_error_sem']
+
+    summaries = pd.DataFrame(summaries).set_index('prob_function').sort_values('test_error')
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print summaries
+
+    if args.output_file:
+        pd.concat(all_results).to_csv(args.output_file, index=False)
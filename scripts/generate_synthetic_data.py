@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+
+import argparse
+import numpy as np
+from faculty_hiring.misc.synthetic import write_institution_records, write_faculty_records
+
+
+def interface():
+    args = argparse.ArgumentParser()
+    args.add_argument('-f', '--fac-file', help='Faculty file to write', required=True)
+    args.add_argument('-i', '--inst-file', help='Institutions file to write', required=True)
+    args.add_argument('-n', '--num-faculty', help='Number of faculty records', default=10000, type=int)
+    args.add_argument('-u', '--num-institutions', help='Number of institutions', default=200, type=int)
+    args.add_argument('-s', '--seed', help='Random seed', default=0, type=int)
+    args = args.parse_args()
+    return args
+
+
+if __name__=="__main__":
+    args = interface()
+    rng = np.random.RandomState(args.seed)
+
+    with open(args.inst_file, 'w') as fp:
+        write_institution_records(fp, args.num_institutions, rng)
+    with open(args.fac_file, 'w') as fp:
+        write_faculty_records(fp, args.num_institutions, args.num_faculty, rng)
+    print 'Done!'
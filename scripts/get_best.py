@@ -17,18 +17,28 @@ from faculty_hiring.parse.institution_parser import parse_institution_records
 from faculty_hiring.models.simulation_engine import SimulationEngine
 from faculty_hiring.models.null_models import ConfigurationModel, BestFirstModel
 from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.misc.run_log import RunLog, is_run_log
 
 
 def interface():
     args = argparse.ArgumentParser()
-    args.add_argument('-i', '--input-file', help='Optimization output file', required=True)
+    args.add_argument('-i', '--input-file', help='Optimization log (see RunLog) or output file', required=True)
     args.add_argument('-n', '--top-n', help='How many values to print', default=10, type=int)
+    args.add_argument('-l', '--local-only', help='Only final results of local searches (run logs)', 
+                      action='store_true')
     args = args.parse_args()
     return args
 
 
+def get_best_from_log(input_file, how_many, local_only=False):
+    """ Get the best function vals and corresponding weights from a run log """ 
+    log = RunLog(input_file, readonly=True)
+    records = log.best(how_many, 'local' if local_only else 'eval')
+    return [(r['value'], list(r['weights'])) for r in records]
+
+
 def get_best_from_file(input_file, how_many):
-    """ Get the best function vals and corresponding weights from file """ 
+    """ Get the best function vals and corresponding weights from (printed) file """ 
     vals = []
     grab_next = False
     for line in open(input_file, 'rU'):
@@ -62,7 +72,12 @@ if __name__=="__main__":
         top_n = args.top_n
     N = top_n - 2
     
-    for i, v in enumerate(get_best_from_file(args.input_file, top_n)):
+    if is_run_log(args.input_file):
+        best = get_best_from_log(args.input_file, top_n, args.local_only)
+    else:
+        best = get_best_from_file(args.input_file, top_n)
+
+    for i, v in enumerate(best):
         print v[0], '\t', ','.join([str(x) for x in v[1]])
     print 'Done!'
 
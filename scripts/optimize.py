@@ -11,12 +11,13 @@ __status__ = "Development"
 import argparse
 import numpy as np
 import cProfile
-from scipy.optimize import minimize
-from faculty_hiring.parse.load import load_assistant_prof_pools
-from faculty_hiring.parse.institution_parser import parse_institution_records
+from faculty_hiring.parse.data_cache import DataCache
 from faculty_hiring.models.simulation_engine import SimulationEngine
 from faculty_hiring.models.null_models import ConfigurationModel, BestFirstModel
 from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.misc.run_log import RunLog
+from faculty_hiring.models.optimizer import MultiStartOptimizer, uniform_starts, print_results
+from faculty_hiring.misc.objective_cache import ObjectiveCache
 
 
 def interface():
@@ -28,6 +29,21 @@ def interface():
     args.add_argument('-s', '--num-steps', help='Number of steps allowed', default=100, type=int)
     args.add_argument('-r', '--reg', help='Regularization amount', default=1e-10, type=float)
     args.add_argument('-v', '--validation', help='Years to hold out', default='')
+    args.add_argument('-b', '--batch', help='Run Monte Carlo replicates as one batch', action='store_true')
+    args.add_argument('-j', '--processes', help='Number of worker processes', default=1, type=int)
+    args.add_argument('-c', '--crn-seed', help='Reuse fixed random streams (common random numbers) '
+                                               'with this seed', default=None, type=int)
+    args.add_argument('-l', '--num-local', help='Number of local searches (from the best starts)', 
+                      default=1, type=int)
+    args.add_argument('-m', '--method', help='Local search method: Nelder-Mead, or SPSA for the noise-aware '
+                                             'stochastic optimizer (then -n is the number of iterations per '
+                                             'replicate; a few will do)', default='Nelder-Mead', 
+                      choices=['Nelder-Mead', 'SPSA'])
+    args.add_argument('-w', '--workers', help='Number of starts/local searches run at once', default=1, type=int)
+    args.add_argument('-L', '--log-file', help='Log of every evaluation (an existing log resumes its run)', 
+                      default=None)
+    args.add_argument('-e', '--eval-cache', help='File of cached objective evaluations (reused across runs)', 
+                      default=None)
     args = args.parse_args()
     return args
 
@@ -35,13 +51,13 @@ def interface():
 if __name__=="__main__":
     args = interface()
     
-    inst = parse_institution_records(open(args.inst_file, 'rU'))
-    candidate_pools, job_pools, job_ranks, year_range = load_assistant_prof_pools(open(args.fac_file), 
-                                                                                  school_info=inst, 
-                                                                                  ranking='pi_rescaled',
-                                                                                  year_start=1970, 
-                                                                                  year_stop=2012, 
-                                                                                  year_step=1)
+    data_cache = DataCache()
+    inst = data_cache.institutions(args.inst_file)
+    candidate_pools, job_pools, job_ranks, year_range = data_cache.assistant_prof_pools(args.fac_file, args.inst_file,
+                                                                                        ranking='pi_rescaled',
+                                                                                        year_start=1970, 
+                                                                                        year_stop=2012, 
+                                                                                        year_step=1)
 
     if args.validation:  # if specified years are to be left out
         hold_out = [int(year) for year in args.validation.split(',')]
@@ -55,21 +71,24 @@ if __name__=="__main__":
         candidate_pools, job_pools, job_ranks = training_candidates, training_jobs, training_job_ranks
     
     model = SigmoidModel(prob_function=args.prob_function)
+    eval_cache = ObjectiveCache(filename=args.eval_cache) if args.eval_cache else None
 
-    # Find a decent starting place
-    simulator = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, power=1, reg=args.reg, iters=20)
-    w0 = None
-    best_error = np.inf
-    for i in xrange(args.num_steps):
-        wtemp = 200*(np.random.random(model.num_weights()) - 0.5)  # ~[-100, 100]
-        error = simulator.simulate(weights=wtemp)
-        if error < best_error:
-            w0 = wtemp.copy()
-            best_error = error
+    # Screen random starts with few iterations, then optimize from the best ones
+    screen = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, power=1, reg=args.reg, iters=20,
+                              batch=args.batch, processes=args.processes, crn_seed=args.crn_seed, cache=eval_cache)
+    simulator = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, power=1, reg=args.reg, iters=args.num_iters,
+                                 batch=args.batch, processes=args.processes, crn_seed=args.crn_seed, cache=eval_cache)
+    log = RunLog(args.log_file) if args.log_file else None
+    optimizer = MultiStartOptimizer(simulator, 'simulate', screen_engine=screen, processes=args.workers, 
+                                    method=args.method, options={'maxiter':args.num_steps}, log=log)
+    results = optimizer.run(uniform_starts(args.num_steps, model.num_weights()), args.num_local)  # ~[-100, 100]
+    optimizer.close()
+    if log is not None:
+        log.close()
+    screen.close()
+    simulator.close()
+    print_results(results)
 
-    # Optimize from there
-    simulator = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, power=1, reg=args.reg, iters=args.num_iters)
-    opt = {'maxiter':args.num_steps}
-    res = minimize(simulator.simulate, w0, method='Nelder-Mead', options=opt)
-    print res
+    if eval_cache is not None:
+        eval_cache.close()
 
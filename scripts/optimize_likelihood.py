@@ -11,14 +11,19 @@ __status__ = "Development"
 import argparse
 import numpy as np
 import cProfile
-from scipy.optimize import minimize
-from faculty_hiring.parse.load import load_assistant_prof_pools
-from faculty_hiring.parse.institution_parser import parse_institution_records
+from faculty_hiring.parse.data_cache import DataCache
 from faculty_hiring.models.simulation_engine import SimulationEngine
 from faculty_hiring.models.null_models import ConfigurationModel, BestFirstModel
 from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.misc.run_log import RunLog
+from faculty_hiring.models.optimizer import MultiStartOptimizer, uniform_starts, print_results
+from faculty_hiring.misc.objective_cache import ObjectiveCache
 from faculty_hiring.misc.hiring_orders import load_hiring_order_set
 
+
+DERIVATIVE_FREE_METHODS = ['Nelder-Mead', 'Powell', 'COBYLA']
+
+
 def interface():
     args = argparse.ArgumentParser()
     args.add_argument('-f', '--fac-file', help='Faculty file', required=True)
@@ -29,6 +34,16 @@ def interface():
     args.add_argument('-r', '--reg', help='Regularization amount', type=float, default=0.)
     args.add_argument('-v', '--validation', help='Years to hold out', default='')
     args.add_argument('-t', '--tolerance', help='Optimization tolerance', default=10.0, type=float)
+    args.add_argument('-m', '--method', help='scipy.optimize.minimize method (gradient-based methods use '
+                                             'the exact likelihood gradient)', default='Nelder-Mead')
+    args.add_argument('-n', '--num-starts', help='Number of random starts', default=10, type=int)
+    args.add_argument('-l', '--num-local', help='Number of local searches (from the best starts)', 
+                      default=1, type=int)
+    args.add_argument('-w', '--workers', help='Number of starts/local searches run at once', default=1, type=int)
+    args.add_argument('-L', '--log-file', help='Log of every evaluation (an existing log resumes its run)', 
+                      default=None)
+    args.add_argument('-e', '--eval-cache', help='File of cached objective evaluations (reused across runs)', 
+                      default=None)
     args = args.parse_args()
     return args
 
@@ -37,54 +52,53 @@ if __name__=="__main__":
     args = interface()
     
     # Load in all data
-    inst = parse_institution_records(open(args.inst_file, 'rU'))
-    candidate_pools, job_pools, job_ranks, year_range = load_assistant_prof_pools(open(args.fac_file), 
-                                                                                  school_info=inst, 
-                                                                                  ranking='pi_rescaled',
-                                                                                  year_start=1970, 
-                                                                                  year_stop=2012, 
-                                                                                  year_step=1)
-    hiring_orders, hiring_probs = load_hiring_order_set(args.hiring_orders_file)
+    data_cache = DataCache()
+    inst = data_cache.institutions(args.inst_file)
+    candidate_pools, job_pools, job_ranks, year_range = data_cache.assistant_prof_pools(args.fac_file, args.inst_file,
+                                                                                        ranking='pi_rescaled',
+                                                                                        year_start=1970, 
+                                                                                        year_stop=2012, 
+                                                                                        year_step=1)
+    hiring_orders, hiring_log_probs = load_hiring_order_set(args.hiring_orders_file)
 
     # If specified years are to be left out
     if args.validation:  
         hold_out = [int(year) for year in args.validation.split(',')]
         training_candidates, training_jobs, training_job_ranks = [], [], []
-        training_orders, training_probs = [], []
+        training_orders, training_log_probs = [], []
         for i, year in enumerate(year_range):
             if year not in hold_out:
                 training_candidates.append(candidate_pools[i])
                 training_jobs.append(job_pools[i])
                 training_job_ranks.append(job_ranks[i])
                 training_orders.append(hiring_orders[i])
-                training_probs.append(hiring_probs[i])
+                training_log_probs.append(hiring_log_probs[i])
         # Overwrite originals:
         candidate_pools, job_pools, job_ranks = training_candidates, training_jobs, training_job_ranks
-        hiring_orders, hiring_probs = training_orders, training_probs
+        hiring_orders, hiring_log_probs = training_orders, training_log_probs
     
     # Which model?
     model = SigmoidModel(prob_function=args.prob_function)
+    eval_cache = ObjectiveCache(filename=args.eval_cache) if args.eval_cache else None
 
-    # Find a starting place
-    simulator = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, power=1, reg=args.reg,
-                                 hiring_orders=hiring_orders, hiring_probs=hiring_probs)
-
-    w0 = None
-    best_neg_likelihood = np.inf
-    for i in xrange(10): #args.num_steps):
-        #wtemp = 100*np.random.randn(model.num_weights())  # ~[-100, 100]
-        wtemp = 100*(np.random.random(model.num_weights()) - 0.5)  # ~[-100, 100]
-        temp = simulator.calculate_neg_log_likelihood(weights=wtemp)
-        if temp < best_neg_likelihood:
-            w0 = wtemp.copy()
-            best_neg_likelihood = temp
-
-    # Optimize from there
+    # Score random starts, then optimize from the best ones
     simulator = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, power=1, reg=args.reg, 
-                                 hiring_orders=hiring_orders, hiring_probs=hiring_probs)
-    opt = {'maxiter':args.num_steps}
-    method = 'Nelder-Mead'
+                                 hiring_orders=hiring_orders, hiring_log_probs=hiring_log_probs, cache=eval_cache)
+    method = args.method
+    if method in DERIVATIVE_FREE_METHODS:
+        objective = 'calculate_neg_log_likelihood'
+    else:
+        objective = 'calculate_neg_log_likelihood_and_gradient'  # Exact gradient
+    log = RunLog(args.log_file) if args.log_file else None
+    optimizer = MultiStartOptimizer(simulator, objective, processes=args.workers, method=method,
+                                    options={'maxiter':args.num_steps}, tol=args.tolerance,
+                                    screen_objective='calculate_neg_log_likelihood', log=log)
+    results = optimizer.run(uniform_starts(args.num_starts, model.num_weights(), -50., 50.), args.num_local)
+    optimizer.close()
+    if log is not None:
+        log.close()
+    print_results(results)
 
-    res = minimize(simulator.calculate_neg_log_likelihood, w0, method=method, options=opt, tol=args.tolerance)
-    print res
+    if eval_cache is not None:
+        eval_cache.close()
 
@@ -11,8 +11,7 @@ __status__ = "Development"
 import argparse
 import numpy as np
 from faculty_hiring.misc.hiring_orders import prepare_hiring_orders, create_hiring_order_set
-from faculty_hiring.parse.load import load_assistant_prof_pools
-from faculty_hiring.parse.institution_parser import parse_institution_records
+from faculty_hiring.parse.data_cache import DataCache
 
 
 def interface():
@@ -28,13 +27,13 @@ def interface():
 if __name__=="__main__":
     args = interface()
     
-    inst = parse_institution_records(open(args.inst_file, 'rU'))
-    candidate_pools, job_pools, job_ranks, year_range = load_assistant_prof_pools(open(args.fac_file), 
-                                                                                  school_info=inst, 
-                                                                                  ranking='pi_rescaled',
-                                                                                  year_start=1970, 
-                                                                                  year_stop=2012, 
-                                                                                  year_step=1)
+    cache = DataCache()
+    inst = cache.institutions(args.inst_file)
+    candidate_pools, job_pools, job_ranks, year_range = cache.assistant_prof_pools(args.fac_file, args.inst_file,
+                                                                                   ranking='pi_rescaled',
+                                                                                   year_start=1970, 
+                                                                                   year_stop=2012, 
+                                                                                   year_step=1)
 
 
     create_hiring_order_set(args.output_file, job_pools, job_ranks, args.num_samples)
@@ -14,6 +14,8 @@ from faculty_hiring.parse import faculty_parser, institution_parser
 from faculty_hiring.parse.load import load_assistant_profs
 from faculty_hiring.parse.google_scholar import parse_gs_page
 from faculty_hiring.parse.dblp import parse_dblp_page
+from faculty_hiring.parse.pub_store import consolidate_publications
+from faculty_hiring.parse.load import GS_STORE, DBLP_STORE
 from faculty_hiring.misc.util import *
 try:
     import cPickle as pickle
@@ -90,3 +92,11 @@ if __name__=="__main__":
             
         print num_processed, f['facultyName']
         num_processed += 1
+
+    # Gather everyone's pickles into one store per directory (see load_all_publications)
+    if args.gs_dir is not None:
+        consolidate_publications(os.path.join(args.gs_dir, GS_STORE), args.gs_dir, GS_PKL,
+                                 [f['gs'] for f in faculty if 'gs' in f])
+    if args.dblp_dir is not None:
+        consolidate_publications(os.path.join(args.dblp_dir, DBLP_STORE), args.dblp_dir, DBLP_PKL,
+                                 [f['dblp'] for f in faculty if 'dblp' in f])
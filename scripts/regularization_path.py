@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+__author__ = "Sam Way"
+__copyright__ = "Copyright 2014, The Clauset Lab"
+__license__ = "BSD"
+__maintainer__ = "Sam Way"
+__email__ = "samfway@gmail.com"
+__status__ = "Development"
+
+
+import argparse
+import numpy as np
+import pandas as pd
+from faculty_hiring.parse.data_cache import DataCache
+from faculty_hiring.models.simulation_engine import SimulationEngine
+from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.models.regularization_path import RegularizationPath, reg_grid
+from faculty_hiring.models.cross_validation import held_out_fold
+from faculty_hiring.models.optimizer import MultiStartOptimizer, normal_starts
+from faculty_hiring.misc.hiring_orders import load_hiring_order_set
+
+
+DERIVATIVE_FREE_METHODS = ['Nelder-Mead', 'Powell', 'COBYLA']
+
+
+def interface():
+    args = argparse.ArgumentParser()
+    args.add_argument('-f', '--fac-file', help='Faculty file', required=True)
+    args.add_argument('-i', '--inst-file', help='Institutions file', required=True)
+    args.add_argument('-p', '--prob-function', help='Candidate probability/matching function', required=True)
+    args.add_argument('-o', '--hiring-orders-file', help='Hiring order set file (pkl); if given, fit the '
+                                                         'likelihood instead of the placement error', default=None)
+    args.add_argument('-a', '--reg-min', help='Weakest regularization', default=1e-4, type=float)
+    args.add_argument('-z', '--reg-max', help='Strongest regularization', default=10., type=float)
+    args.add_argument('-g', '--num-regs', help='Number of (log-spaced) regularization amounts', 
+                      default=20, type=int)
+    args.add_argument('-v', '--validation', help='Years to hold out (and score each fit on)', default='')
+    args.add_argument('-m', '--method', help='scipy.optimize.minimize method (gradient-based methods use '
+                                             'the exact likelihood gradient)', default='Nelder-Mead')
+    args.add_argument('-s', '--num-steps', help='Number of steps allowed per fit', default=100, type=int)
+    args.add_argument('-t', '--num-starts', help='Number of random starts for the first (strongest) fit', 
+                      default=10, type=int)
+    args.add_argument('-n', '--num-iters', help='Number of iterations to est. error', default=100, type=int)
+    args.add_argument('-c', '--crn-seed', help='Common random numbers seed (placement error only)', 
+                      default=0, type=int)
+    args.add_argument('-O', '--output-file', help='Write the path (csv)', default=None)
+    args = args.parse_args()
+    return args
+
+
+if __name__=="__main__":
+    args = interface()
+
+    cache = DataCache()
+    inst = cache.institutions(args.inst_file)
+    candidate_pools, job_pools, job_ranks, year_range = cache.assistant_prof_pools(args.fac_file, args.inst_file,
+                                                                                   ranking='pi_rescaled',
+                                                                                   year_start=1970, 
+                                                                                   year_stop=2012, 
+                                                                                   year_step=1)
+    model = SigmoidModel(prob_function=args.prob_function)
+    if args.hiring_orders_file:
+        hiring_orders, hiring_log_probs = load_hiring_order_set(args.hiring_orders_file)
+        full = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, power=1, 
+                                hiring_orders=hiring_orders, hiring_log_probs=hiring_log_probs)
+        if args.method in DERIVATIVE_FREE_METHODS:
+            objective = 'calculate_neg_log_likelihood'
+        else:
+            objective = 'calculate_neg_log_likelihood_and_gradient'  # Exact gradient
+    else:
+        # Fixed random streams, so the placement error is a deterministic function of the weights
+        full = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, power=1, 
+                                iters=args.num_iters, batch=True, crn_seed=args.crn_seed)
+        objective = 'simulate'
+
+    training, testing = full, None
+    if args.validation:
+        testing_pools, = held_out_fold(year_range, [int(year) for year in args.validation.split(',')])
+        training = full.subset([i for i in xrange(len(year_range)) if i not in testing_pools])
+        testing = full.subset(testing_pools, reg=0.)
+
+    # Only the strongest regularization gets random starts; the rest of the path is warm-started
+    regs = reg_grid(args.reg_min, args.reg_max, args.num_regs)
+    optimizer = MultiStartOptimizer(training.subset(xrange(training.num_pools), reg=regs[0]), objective,
+                                    method=args.method, options={'maxiter': args.num_steps})
+    starts = optimizer.run(normal_starts(args.num_starts, model.num_weights()))
+    w0 = starts[starts['stage'] == 'local']['weights'].iloc[0]
+
+    path = RegularizationPath(training, objective, method=args.method, options={'maxiter': args.num_steps})
+    results = path.solve(regs, w0, test_engine=testing,
+                         test_objective=objective.replace('_and_gradient', ''), verbose=True)
+    path.close()
+
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print results[['reg', 'value', 'data_value', 'test_value', 'evaluations']]
+    if args.output_file:
+        results.to_csv(args.output_file, index=False)
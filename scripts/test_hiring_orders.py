@@ -36,7 +36,7 @@ if __name__=="__main__":
                                                                                   year_step=1)
 
 
-    hiring_orders, hiring_probs = load_hiring_order_set(args.orders_file)
+    hiring_orders, hiring_log_probs = load_hiring_order_set(args.orders_file)
     if len(hiring_orders) != len(job_pools):
         raise ValueError('Incorrect number of pools!')
 
@@ -11,12 +11,13 @@ __status__ = "Development"
 import argparse
 import numpy as np
 import cProfile
-from scipy.optimize import minimize
-from faculty_hiring.parse.load import load_assistant_prof_pools
-from faculty_hiring.parse.institution_parser import parse_institution_records
+from faculty_hiring.parse.data_cache import DataCache
 from faculty_hiring.models.simulation_engine import SimulationEngine
 from faculty_hiring.models.null_models import ConfigurationModel, BestFirstModel
 from faculty_hiring.models.sigmoid_models import SigmoidModel
+from faculty_hiring.misc.run_log import RunLog
+from faculty_hiring.models.cross_validation import held_out_fold
+from faculty_hiring.models.optimizer import MultiStartOptimizer, normal_starts, print_results
 
 
 def interface():
@@ -30,6 +31,19 @@ def interface():
     args.add_argument('-r', '--reg', help='Regularization amount', default=1e-6, type=float)
     args.add_argument('-v', '--validation', help='Years to hold out', default='1980,1991,1996,2002,2006')
     args.add_argument('-k', '--power', help='Selection power', default=1.0, type=float)
+    args.add_argument('-b', '--batch', help='Run Monte Carlo replicates as one batch', action='store_true')
+    args.add_argument('-j', '--processes', help='Number of worker processes', default=1, type=int)
+    args.add_argument('-l', '--num-local', help='Number of local searches (from the best starts)', 
+                      default=1, type=int)
+    args.add_argument('-m', '--method', help='Local search method: Nelder-Mead, or SPSA for the noise-aware '
+                                             'stochastic optimizer (then -n is the number of iterations per '
+                                             'replicate; a few will do)', default='Nelder-Mead', 
+                      choices=['Nelder-Mead', 'SPSA'])
+    args.add_argument('-w', '--workers', help='Number of starts/local searches run at once', default=1, type=int)
+    args.add_argument('-L', '--log-file', help='Log of every evaluation (an existing log resumes its run)', 
+                      default=None)
+    args.add_argument('-c', '--crn-seed', help='Reuse fixed random streams (common random numbers) '
+                                               'with this seed', default=None, type=int)
     args = args.parse_args()
     return args
 
@@ -37,57 +51,44 @@ def interface():
 if __name__=="__main__":
     args = interface()
     
-    inst = parse_institution_records(open(args.inst_file, 'rU'))
-    candidate_pools, job_pools, job_ranks, year_range = load_assistant_prof_pools(open(args.fac_file), 
-                                                                                  school_info=inst, 
-                                                                                  ranking='pi_rescaled',
-                                                                                  year_start=1970, 
-                                                                                  year_stop=2012, 
-                                                                                  year_step=1)
+    cache = DataCache()
+    inst = cache.institutions(args.inst_file)
+    candidate_pools, job_pools, job_ranks, year_range = cache.assistant_prof_pools(args.fac_file, args.inst_file,
+                                                                                   ranking='pi_rescaled',
+                                                                                   year_start=1970, 
+                                                                                   year_stop=2012, 
+                                                                                   year_step=1)
 
     # Which model to use
     model = SigmoidModel(prob_function=args.prob_function)
 
-    # Create a validation set
+    # Hold out the validation years (as views of the full set of pools)
     hold_out = [int(year) for year in args.validation.split(',')]
-    training_candidates = []
-    training_jobs = []
-    training_job_ranks = []
-    testing_candidates = []
-    testing_jobs = []
-    testing_job_ranks = []
+    testing_pools, = held_out_fold(year_range, hold_out)
+    training_pools = [i for i in xrange(len(year_range)) if i not in testing_pools]
+    full = SimulationEngine(candidate_pools, job_pools, job_ranks, inst, model, power=args.power, reg=args.reg, iters=args.num_iters,
+                            batch=args.batch, processes=args.processes, crn_seed=args.crn_seed)
 
-    for i, year in enumerate(year_range):
-        if year in hold_out:
-            testing_candidates.append(candidate_pools[i])
-            testing_jobs.append(job_pools[i])
-            testing_job_ranks.append(job_ranks[i])
-        else:
-            training_candidates.append(candidate_pools[i])
-            training_jobs.append(job_pools[i])
-            training_job_ranks.append(job_ranks[i])
-
-    # Find a decent starting place (using the training set)
-    simulator = SimulationEngine(training_candidates, training_jobs, training_job_ranks, inst, model, power=args.power, reg=args.reg, iters=20)
-    w0 = None
-    best_error = np.inf
-    for i in xrange(args.num_steps):
-        wtemp = np.random.randn(model.num_weights()) 
-        error = simulator.simulate(weights=wtemp)
-        if error < best_error:
-            w0 = wtemp.copy()
-            best_error = error
-
-    # Optimize from there (for the training set)
-    simulator = SimulationEngine(training_candidates, training_jobs, training_job_ranks, inst, model, power=args.power, reg=args.reg, iters=args.num_iters)
-    opt = {'maxiter':args.num_steps}
-    res = minimize(simulator.simulate, w0, method='Nelder-Mead', options=opt)
-    final_weights = res.x
+    # Screen random starts with few iterations, then optimize from the best ones (on the training set)
+    screen = full.subset(training_pools, iters=20)
+    simulator = full.subset(training_pools)
+    log = RunLog(args.log_file) if args.log_file else None
+    optimizer = MultiStartOptimizer(simulator, 'simulate', screen_engine=screen, processes=args.workers,
+                                    method=args.method, options={'maxiter':args.num_steps}, log=log)
+    results = optimizer.run(normal_starts(args.num_steps, model.num_weights()), args.num_local)
+    optimizer.close()
+    if log is not None:
+        log.close()
+    screen.close()
+    simulator.close()
+    print_results(results)
+    final_weights = results[results['stage'] == 'local']['weights'].iloc[0]
     print 'FINAL_WEIGHTS:', final_weights
 
     # Compute test set error
-    simulator = SimulationEngine(testing_candidates, testing_jobs, testing_job_ranks, inst, model, power=args.power, reg=0., iters=args.num_iters)
+    simulator = full.subset(testing_pools, reg=0.)
     final_error = simulator.simulate(weights=final_weights)
+    simulator.close()
     print 'FINAL_ERROR:', final_error
 
     # Write out the results